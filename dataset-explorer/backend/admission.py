@@ -0,0 +1,203 @@
+"""
+Admission control for routes that wait on HuggingFace or on the impact assessment models.
+
+Each route class has a concurrency limit and a bounded queue. A request that finds the
+queue full, or waits longer than ADMISSION_QUEUE_TIMEOUT for a slot, is turned away at
+once with 503 and a Retry-After estimate instead of piling up behind everything else.
+Each user (or client address, when anonymous) may also hold only so many running or
+queued requests per class, so one client can't take all the capacity; going over that
+share gets a 429. Routes outside these classes, such as /login and /health, are never
+queued.
+
+Limits are read from the environment, e.g. ADMISSION_UPSTREAM_CONCURRENCY=12 or
+ADMISSION_MODEL_PER_USER=2; ADMISSION=0 turns admission control off.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+
+from backend import metrics, security
+
+ADMISSION_ENABLED = os.environ.get("ADMISSION", "1") != "0"
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", "5"))
+
+# (method, route template) -> route class
+ROUTE_CLASSES: Dict[Tuple[str, str], str] = {
+    ("GET", "/datasets"): "upstream",
+    ("POST", "/datasets/batch"): "upstream",
+    ("GET", "/datasets/{hf_id:path}"): "upstream",
+    ("GET", "/datasets/{hf_id:path}/history"): "upstream",
+    ("POST", "/datasets/{hf_id:path}/follow"): "upstream",
+    ("POST", "/impact-assessment"): "model",
+}
+
+class Limits(NamedTuple):
+    concurrency: int  # requests handled at once
+    queue: int  # requests allowed to wait for a slot
+    per_user: int  # running plus queued requests one user may have; 0 for no limit
+
+# Defaults per route class, each overridable as ADMISSION_<CLASS>_<FIELD>. Upstream-bound
+# handlers keep a pooled connection while they await HuggingFace, and a checkout from an
+# exhausted pool blocks the event loop, so together the classes stay well below the
+# engine's default pool of 5 + 10 overflow connections.
+DEFAULT_LIMITS = {
+    "upstream": Limits(concurrency=8, queue=64, per_user=4),
+    "model": Limits(concurrency=2, queue=8, per_user=2),
+}
+
+def limits_from_env(route_class: str, defaults: Limits) -> Limits:
+    return Limits(*(
+        int(os.environ.get(f"ADMISSION_{route_class.upper()}_{field.upper()}", default))
+        for field, default in zip(Limits._fields, defaults)
+    ))
+
+class Rejected(Exception):
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+class Limiter:
+    """Concurrency limit with a bounded FIFO queue and per-user shares, for use on one event loop"""
+
+    def __init__(self, name: str, limits: Limits, queue_timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.name = name
+        self.limits = limits
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._per_user: Dict[str, int] = {}
+        # Moving average of how long admitted requests take, for Retry-After
+        self._service_seconds = 0.1
+        for field, value in limits._asdict().items():
+            metrics.ADMISSION_LIMIT.set(value, route_class=name, limit=field)
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained"""
+        backlog = self.queued + 1
+        return max(1, math.ceil(self._service_seconds * backlog / max(1, self.limits.concurrency)))
+
+    async def acquire(self, user: str) -> None:
+        if self.limits.per_user and self._per_user.get(user, 0) >= self.limits.per_user:
+            raise Rejected(429, "user_quota", 1)
+        if self.in_flight < self.limits.concurrency and not self._waiters:
+            self.in_flight += 1
+            self._hold(user)
+            return
+        if len(self._waiters) >= self.limits.queue:
+            raise Rejected(503, "queue_full", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._hold(user)
+        metrics.ADMISSION_QUEUED.inc(route_class=self.name)
+        start = time.perf_counter()
+        try:
+            # release() hands its slot straight to the waiter, so in_flight doesn't change here
+            await asyncio.wait_for(waiter, timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._unhold(user)
+            # A slot handed over just as the deadline passed has to be passed on
+            if waiter.done() and not waiter.cancelled():
+                self.release(user, held=False)
+            raise Rejected(503, "queue_timeout", self.retry_after())
+        except BaseException:
+            self._unhold(user)
+            if waiter.done() and not waiter.cancelled():
+                self.release(user, held=False)
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            metrics.ADMISSION_QUEUED.dec(route_class=self.name)
+            metrics.ADMISSION_WAIT.observe(time.perf_counter() - start, route_class=self.name)
+
+    def release(self, user: str, held: bool = True, elapsed: Optional[float] = None) -> None:
+        if held:
+            self._unhold(user)
+        if elapsed is not None:
+            self._service_seconds += 0.2 * (elapsed - self._service_seconds)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _hold(self, user: str) -> None:
+        self._per_user[user] = self._per_user.get(user, 0) + 1
+
+    def _unhold(self, user: str) -> None:
+        remaining = self._per_user.get(user, 0) - 1
+        if remaining > 0:
+            self._per_user[user] = remaining
+        else:
+            self._per_user.pop(user, None)
+
+def _client_key(scope) -> str:
+    """The user a request is charged to: the token's subject, or the client address"""
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                try:
+                    subject = security.decode_access_token(token).get("sub")
+                except HTTPException:
+                    break
+                if subject:
+                    return f"user:{subject}"
+            break
+    client = scope.get("client")
+    return f"addr:{client[0]}" if client else "addr:unknown"
+
+class AdmissionMiddleware:
+    """ASGI middleware applying a Limiter per route class in ROUTE_CLASSES"""
+
+    def __init__(self, app, limits: Optional[Dict[str, Limits]] = None, enabled: bool = ADMISSION_ENABLED):
+        self.app = app
+        self.enabled = enabled
+        self.limiters = {
+            name: Limiter(name, limit)
+            for name, limit in (limits or {
+                name: limits_from_env(name, defaults) for name, defaults in DEFAULT_LIMITS.items()
+            }).items()
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            return await self.app(scope, receive, send)
+        route_class = ROUTE_CLASSES.get((scope["method"], metrics.route_template(scope)))
+        limiter = self.limiters.get(route_class)
+        if limiter is None:
+            return await self.app(scope, receive, send)
+
+        user = _client_key(scope)
+        try:
+            await limiter.acquire(user)
+        except Rejected as rejected:
+            metrics.ADMISSION_REJECTED.inc(route_class=route_class, reason=rejected.reason)
+            detail = "Too many requests from this client" if rejected.status_code == 429 else "Server is busy, please retry"
+            response = JSONResponse(
+                {"detail": detail}, status_code=rejected.status_code,
+                headers={"Retry-After": str(rejected.retry_after)}
+            )
+            return await response(scope, receive, send)
+
+        metrics.ADMISSION_IN_FLIGHT.inc(route_class=route_class)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            metrics.ADMISSION_IN_FLIGHT.dec(route_class=route_class)
+            limiter.release(user, elapsed=time.perf_counter() - start)
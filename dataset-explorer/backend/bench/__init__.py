@@ -0,0 +1 @@
+"""Offline load-testing harness: runs the app against a simulated HuggingFace API"""
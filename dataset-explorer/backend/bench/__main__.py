@@ -0,0 +1,84 @@
+import argparse
+import json
+import os
+import sys
+
+from backend.bench import runner
+from backend.bench.simulator import SimulatorConfig
+
+
+def parse_env(pairs):
+    env = {}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise argparse.ArgumentTypeError(f"Expected KEY=VALUE, got {pair!r}")
+        env[key] = value
+    return env
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m backend.bench",
+        description="Load-test the backend against a local HuggingFace API simulator",
+    )
+    parser.add_argument("--mix", choices=sorted(runner.MIXES), default="default", help="traffic mix to drive")
+    parser.add_argument("--levels", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run each level")
+    parser.add_argument("--assessment-method", choices=["naive", "advanced"], default="naive")
+    parser.add_argument("--datasets", type=int, default=500, help="datasets served by the simulator")
+    parser.add_argument("--commits", type=int, default=20, help="commits per simulated dataset")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="mean simulated upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="standard deviation of upstream latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of upstream calls that fail")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra environment for the app process, e.g. DASHBOARD_CACHE_TTL=0")
+    parser.add_argument("--output", default="bench-results.json", help="where to write the JSON results")
+    parser.add_argument("--baseline", help="previous results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed fractional regression in p95 latency or throughput")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline:
+        if os.path.abspath(args.baseline) == os.path.abspath(args.output):
+            parser.error("--output must differ from --baseline, or the baseline would be overwritten")
+        # Read it up front, so a missing baseline fails before a long run
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    simulator_config = SimulatorConfig(
+        datasets=args.datasets,
+        commits=args.commits,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    results = runner.run(
+        levels=[int(level) for level in args.levels.split(",")],
+        duration=args.duration,
+        mix=args.mix,
+        simulator_config=simulator_config,
+        assessment_method=args.assessment_method,
+        app_env=parse_env(args.app_env),
+    )
+
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=2)
+    print(f"Results written to {args.output}")
+
+    if baseline is not None:
+        regressions = runner.compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
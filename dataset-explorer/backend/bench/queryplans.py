@@ -0,0 +1,234 @@
+"""
+Before/after query-plan benchmark for the schema migrations.
+
+Seeds a throwaway SQLite database at the pre-migration schema, times the statement shapes
+main.py issues and records their query plans, then applies the pending migrations and
+measures again:
+
+    python -m backend.bench.queryplans --followers 2000000 --output queryplans.json
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection, Engine
+
+from backend import migrations
+
+# name -> (statement, parameter factory); the shapes mirror the queries in main.py
+Query = Tuple[str, Callable[[random.Random, Dict[str, int]], Dict[str, Any]]]
+
+QUERIES: Dict[str, Query] = {
+    "follower count": (
+        "SELECT count(user_id) FROM dataset_followers WHERE dataset_id = :dataset_id",
+        lambda rng, size: {"dataset_id": rng.randint(1, size["datasets"])},
+    ),
+    "follower counts for a page": (
+        "SELECT dataset_id, count(user_id) FROM dataset_followers "
+        "WHERE dataset_id IN (SELECT value FROM json_each(:dataset_ids)) GROUP BY dataset_id",
+        lambda rng, size: {"dataset_ids": json.dumps(rng.sample(range(1, size["datasets"] + 1), 50))},
+    ),
+    "followed page with counts": (
+        "SELECT datasets.id, datasets.name, "
+        "(SELECT count(f.user_id) FROM dataset_followers AS f WHERE f.dataset_id = datasets.id) AS followers "
+        "FROM datasets JOIN dataset_followers ON dataset_followers.dataset_id = datasets.id "
+        "WHERE dataset_followers.user_id = :user_id ORDER BY datasets.name, datasets.id LIMIT 50",
+        lambda rng, size: {"user_id": rng.randint(1, size["users"])},
+    ),
+    "history by commit": (
+        "SELECT id, commit_id FROM dataset_history "
+        "WHERE dataset_id = :dataset_id AND commit_id IN (:first, :second)",
+        lambda rng, size: {
+            "dataset_id": rng.randint(1, size["datasets"]),
+            "first": f"c{rng.randrange(size['commits'])}",
+            "second": f"c{rng.randrange(size['commits'])}",
+        },
+    ),
+    "combined by owner": (
+        "SELECT id, name FROM combined_datasets WHERE created_by_id = :user_id "
+        "ORDER BY created_at DESC, id DESC LIMIT 50",
+        lambda rng, size: {"user_id": rng.randint(1, size["users"])},
+    ),
+    "combinations of a dataset": (
+        "SELECT parent_id FROM dataset_combinations WHERE dataset_id = :dataset_id",
+        lambda rng, size: {"dataset_id": rng.randint(1, size["datasets"])},
+    ),
+}
+
+def _chunks(rows, size: int = 50_000):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def seed(engine: Engine, size: Dict[str, int], seed: int = 0) -> None:
+    """Create the pre-migration schema and fill it with `size` rows of each kind"""
+    rng = random.Random(seed)
+    migrations.upgrade(engine, target=1)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO users (id, email, hashed_password) VALUES (?, ?, '!')",
+            [(i, f"user{i}@example.com") for i in range(1, size["users"] + 1)]
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO datasets (id, hf_id, name, size_bytes, last_modified) VALUES (?, ?, ?, ?, '2024-01-01 00:00:00')",
+            [(i, f"org/dataset-{i}", f"dataset-{rng.random():.8f}", rng.randint(1, 10**10))
+             for i in range(1, size["datasets"] + 1)]
+        )
+
+        per_user = max(1, min(size["datasets"], size["followers"] // size["users"]))
+        followers = (
+            (user_id, dataset_id)
+            for user_id in range(1, size["users"] + 1)
+            for dataset_id in rng.sample(range(1, size["datasets"] + 1), per_user)
+        )
+        for chunk in _chunks(followers):
+            conn.exec_driver_sql("INSERT INTO dataset_followers (user_id, dataset_id) VALUES (?, ?)", chunk)
+
+        history = (
+            (dataset_id, f"c{commit}", "2024-01-01 00:00:00")
+            for dataset_id in range(1, size["datasets"] + 1)
+            for commit in range(size["commits"])
+        )
+        for chunk in _chunks(history):
+            conn.exec_driver_sql(
+                "INSERT INTO dataset_history (dataset_id, commit_id, timestamp) VALUES (?, ?, ?)", chunk
+            )
+
+        combined = [
+            (user_id * size["combined_per_user"] + n, f"combined-{n}", user_id, f"2024-01-01 {n % 24:02d}:00:00")
+            for user_id in range(1, size["users"] + 1)
+            for n in range(size["combined_per_user"])
+        ]
+        for chunk in _chunks(combined):
+            conn.exec_driver_sql(
+                "INSERT INTO combined_datasets (id, name, created_by_id, created_at) VALUES (?, ?, ?, ?)", chunk
+            )
+        members = (
+            (combined_id, dataset_id)
+            for combined_id, *_ in combined
+            for dataset_id in rng.sample(range(1, size["datasets"] + 1), 3)
+        )
+        for chunk in _chunks(members):
+            conn.exec_driver_sql("INSERT INTO dataset_combinations (parent_id, dataset_id) VALUES (?, ?)", chunk)
+        conn.execute(text("ANALYZE"))
+
+def measure(
+    conn: Connection, size: Dict[str, int], repeat: int, budget: float = 10.0, seed: int = 0
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Plan and latency distribution of every query in QUERIES. A query stops repeating once
+    it has used `budget` seconds, so unindexed plans on a large seed don't take forever.
+    """
+    results = {}
+    for name, (statement, params) in QUERIES.items():
+        rng = random.Random(seed)
+        plan = [row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + statement), params(rng, size))]
+        conn.execute(text(statement), params(rng, size)).all()  # warm the page cache
+        timings = []
+        for _ in range(repeat):
+            bound = params(rng, size)
+            start = time.perf_counter()
+            conn.execute(text(statement), bound).all()
+            timings.append(time.perf_counter() - start)
+            if sum(timings) > budget and len(timings) >= 3:
+                break
+        timings.sort()
+        results[name] = {
+            "plan": plan,
+            "median_ms": round(statistics.median(timings) * 1000, 3),
+            "p95_ms": round(timings[int(0.95 * (len(timings) - 1))] * 1000, 3),
+            "runs": len(timings),
+        }
+    return results
+
+def run(size: Dict[str, int], repeat: int, budget: float = 10.0, progress: Callable[[str], None] = print) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="dataset-explorer-queryplans-")
+    engine = create_engine("sqlite:///" + os.path.join(workdir, "queryplans.db"))
+    try:
+        progress(f"Seeding {size['followers']:,} follower rows")
+        started = time.perf_counter()
+        seed(engine, size)
+        progress(f"  seeded in {time.perf_counter() - started:.1f}s")
+
+        with engine.connect() as conn:
+            before = measure(conn, size, repeat, budget)
+
+        progress("Applying migrations")
+        started = time.perf_counter()
+        applied = migrations.upgrade(engine)
+        migration_seconds = time.perf_counter() - started
+
+        with engine.connect() as conn:
+            after = measure(conn, size, repeat, budget)
+    finally:
+        engine.dispose()
+
+    return {
+        "size": size,
+        "repeat": repeat,
+        "budget_s": budget,
+        "applied_migrations": applied,
+        "migration_s": round(migration_seconds, 2),
+        "queries": {
+            name: {
+                "before": before[name],
+                "after": after[name],
+                "speedup": round(before[name]["median_ms"] / after[name]["median_ms"], 1) if after[name]["median_ms"] else None,
+            }
+            for name in QUERIES
+        },
+    }
+
+def report(results: Dict[str, Any]) -> str:
+    lines = [f"{'query':<28} {'before ms':>10} {'after ms':>10} {'speedup':>8}  plan after"]
+    for name, row in results["queries"].items():
+        lines.append(
+            f"{name:<28} {row['before']['median_ms']:>10} {row['after']['median_ms']:>10} "
+            f"{str(row['speedup']) + 'x':>8}  {' / '.join(row['after']['plan'])}"
+        )
+    lines.append(f"Migrations {results['applied_migrations']} took {results['migration_s']}s")
+    return "\n".join(lines)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m backend.bench.queryplans",
+        description="Compare query plans and latencies before and after the schema migrations",
+    )
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--datasets", type=int, default=5_000)
+    parser.add_argument("--followers", type=int, default=2_000_000, help="total dataset_followers rows")
+    parser.add_argument("--commits", type=int, default=20, help="history rows per dataset")
+    parser.add_argument("--combined-per-user", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=50, help="timed executions per query")
+    parser.add_argument("--budget", type=float, default=10.0, help="seconds each query may spend being repeated")
+    parser.add_argument("--output", default="queryplans.json")
+    args = parser.parse_args(argv)
+
+    size = {
+        "users": args.users,
+        "datasets": args.datasets,
+        "followers": args.followers,
+        "commits": args.commits,
+        "combined_per_user": args.combined_per_user,
+    }
+    results = run(size, args.repeat, args.budget)
+    print(report(results))
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=2)
+    print(f"Results written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Directory holding the backend package, so the app subprocess can import it
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# Relative weights of each operation in a traffic mix
+MIXES: Dict[str, Dict[str, int]] = {
+    "default": {"list": 20, "detail": 30, "follow": 15, "history": 20, "assess": 15},
+    "read": {"list": 40, "detail": 40, "history": 20},
+    "write": {"follow": 60, "detail": 20, "assess": 20},
+    # Floods the upstream- and model-bound routes; health shows whether cheap routes stay fast
+    "overload": {"detail": 45, "history": 15, "assess": 30, "health": 10},
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    values = sorted(latencies)
+    return {
+        "p50": round(percentile(values, 50) * 1000, 2),
+        "p95": round(percentile(values, 95) * 1000, 2),
+        "p99": round(percentile(values, 99) * 1000, 2),
+        "max": round(values[-1] * 1000, 2) if values else 0.0,
+    }
+
+
+class AppProcess:
+    """The backend under test, served by uvicorn in a child process"""
+
+    def __init__(self, port: int, env: Dict[str, str], host: str = "127.0.0.1"):
+        self.url = f"http://{host}:{port}"
+        self.command = [
+            sys.executable, "-m", "uvicorn", "backend.main:app",
+            "--host", host, "--port", str(port), "--log-level", "warning",
+        ]
+        self.env = {**os.environ, **env}
+        self.process: Optional[subprocess.Popen] = None
+
+    def start(self, timeout: float = 120.0) -> None:
+        self.process = subprocess.Popen(self.command, cwd=PROJECT_ROOT, env=self.env)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"App exited during startup with code {self.process.returncode}")
+            try:
+                if httpx.get(f"{self.url}/health", timeout=1).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.25)
+        self.stop()
+        raise RuntimeError("App did not become healthy in time")
+
+    def memory(self) -> Dict[str, float]:
+        """Current and peak resident set size of the app process, in MB"""
+        usage = {"rss_mb": 0.0, "peak_rss_mb": 0.0}
+        try:
+            with open(f"/proc/{self.process.pid}/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        usage["rss_mb"] = round(int(line.split()[1]) / 1024, 1)
+                    elif line.startswith("VmHWM:"):
+                        usage["peak_rss_mb"] = round(int(line.split()[1]) / 1024, 1)
+        except OSError:
+            # Only Linux exposes /proc; report zeros rather than failing the run
+            pass
+        return usage
+
+    def stop(self) -> None:
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+def seed_users(database_url: str, count: int) -> List[str]:
+    """Create benchmark users straight in the database and mint a token for each"""
+    from backend import models, security
+
+    engine = create_engine(database_url, connect_args={"check_same_thread": False})
+    session = sessionmaker(bind=engine)()
+    try:
+        emails = [f"bench-{i}@example.com" for i in range(count)]
+        # Password hashing is irrelevant to the benchmark and far slower than any request
+        session.add_all(models.User(email=email, hashed_password="!") for email in emails)
+        session.commit()
+    finally:
+        session.close()
+        engine.dispose()
+    return [security.create_access_token({"sub": email}) for email in emails]
+
+
+@dataclass
+class Workload:
+    """Shared state for the virtual users driving one benchmark run"""
+    hf_ids: List[str]
+    mix: Dict[str, int]
+    assessment_method: str = "naive"
+    seed: int = 0
+    local_ids: Dict[str, int] = field(default_factory=dict)
+    followed: Dict[int, set] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.rng = random.Random(self.seed)
+        # Skew dataset popularity so a few datasets are hot, like real traffic
+        self.weights = [1 / (rank + 1) for rank in range(len(self.hf_ids))]
+        self.operations = list(self.mix)
+        self.operation_weights = [self.mix[name] for name in self.operations]
+
+    def pick_dataset(self) -> str:
+        return self.rng.choices(self.hf_ids, weights=self.weights)[0]
+
+    def pick_operation(self) -> str:
+        return self.rng.choices(self.operations, weights=self.operation_weights)[0]
+
+    def remember(self, response: httpx.Response) -> None:
+        if response.status_code == 200:
+            body = response.json()
+            self.local_ids[body["hf_id"]] = body["id"]
+
+
+async def op_list(client: httpx.AsyncClient, workload: Workload, user: int) -> httpx.Response:
+    return await client.get("/datasets", params={"limit": 20})
+
+
+async def op_detail(client: httpx.AsyncClient, workload: Workload, user: int) -> httpx.Response:
+    response = await client.get(f"/datasets/{workload.pick_dataset()}")
+    workload.remember(response)
+    return response
+
+
+async def op_history(client: httpx.AsyncClient, workload: Workload, user: int) -> httpx.Response:
+    return await client.get(f"/datasets/{workload.pick_dataset()}/history")
+
+
+async def op_follow(client: httpx.AsyncClient, workload: Workload, user: int) -> httpx.Response:
+    hf_id = workload.pick_dataset()
+    followed = workload.followed.setdefault(user, set())
+    action = "unfollow" if hf_id in followed else "follow"
+    response = await client.post(f"/datasets/{hf_id}/{action}")
+    if response.status_code == 200:
+        followed.symmetric_difference_update({hf_id})
+        workload.remember(response)
+    return response
+
+
+async def op_assess(client: httpx.AsyncClient, workload: Workload, user: int) -> httpx.Response:
+    known = list(workload.local_ids.values())
+    dataset_ids = workload.rng.sample(known, min(len(known), workload.rng.randint(2, 4)))
+    return await client.post(
+        "/impact-assessment",
+        json={"dataset_ids": dataset_ids, "method": workload.assessment_method},
+    )
+
+
+async def op_health(client: httpx.AsyncClient, workload: Workload, user: int) -> httpx.Response:
+    return await client.get("/health")
+
+
+OPERATIONS: Dict[str, Callable] = {
+    "list": op_list,
+    "detail": op_detail,
+    "history": op_history,
+    "follow": op_follow,
+    "assess": op_assess,
+    "health": op_health,
+}
+
+
+async def warm_up(base_url: str, token: str, workload: Workload, count: int = 20) -> None:
+    """Register a handful of datasets locally so assessment traffic has ids to use"""
+    async with httpx.AsyncClient(base_url=base_url, headers={"Authorization": f"Bearer {token}"}, timeout=30) as client:
+        for hf_id in workload.hf_ids[:count]:
+            workload.remember(await client.get(f"/datasets/{hf_id}"))
+
+
+class _Scoped:
+    """Sends requests on a shared client with one virtual user's credentials"""
+
+    def __init__(self, client: httpx.AsyncClient, headers: Dict[str, str]):
+        self.client = client
+        self.headers = headers
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.client.get(url, headers=self.headers, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.client.post(url, headers=self.headers, **kwargs)
+
+
+async def run_level(base_url: str, tokens: List[str], workload: Workload, concurrency: int, duration: float) -> Dict[str, Any]:
+    """Drive the mix with `concurrency` virtual users for `duration` seconds"""
+    latencies: Dict[str, List[float]] = {name: [] for name in workload.operations}
+    statuses: Dict[str, Dict[str, int]] = {name: {} for name in workload.operations}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    deadline = time.perf_counter() + duration
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def virtual_user(user: int) -> None:
+            scoped = _Scoped(client, {"Authorization": f"Bearer {tokens[user]}"})
+            while time.perf_counter() < deadline:
+                name = workload.pick_operation()
+                start = time.perf_counter()
+                try:
+                    response = await OPERATIONS[name](scoped, workload, user)
+                    status = str(response.status_code)
+                except httpx.HTTPError as exc:
+                    status = type(exc).__name__
+                latencies[name].append(time.perf_counter() - start)
+                statuses[name][status] = statuses[name].get(status, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(virtual_user(user) for user in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    errors = sum(
+        count
+        for by_status in statuses.values()
+        for status, count in by_status.items()
+        if not status.isdigit() or int(status) >= 500
+    )
+    # Requests turned away by admission control, also counted in errors when they are 503s
+    shed = sum(by_status.get("503", 0) + by_status.get("429", 0) for by_status in statuses.values())
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 2),
+        "requests": len(all_latencies),
+        "errors": errors,
+        "shed": shed,
+        "throughput_rps": round(len(all_latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": summarize(all_latencies),
+        "operations": {
+            name: {"requests": len(latencies[name]), "statuses": statuses[name], "latency_ms": summarize(latencies[name])}
+            for name in workload.operations
+        },
+    }
+
+
+def run(
+    levels: List[int],
+    duration: float,
+    mix: str,
+    simulator_config,
+    assessment_method: str = "naive",
+    app_env: Optional[Dict[str, str]] = None,
+    progress: Callable[[str], None] = print,
+) -> Dict[str, Any]:
+    """Start the simulator and the app, run every concurrency level and collect the results"""
+    from backend import security
+    from backend.bench.simulator import SimulatorServer
+
+    simulator = SimulatorServer(simulator_config, port=free_port())
+    workdir = tempfile.mkdtemp(prefix="dataset-explorer-bench-")
+    database_url = "sqlite:///" + os.path.join(workdir, "bench.db")
+    app = AppProcess(free_port(), {
+        "DATABASE_URL": database_url,
+        "HUGGINGFACE_API_URL": simulator.url,
+        "JWT_SECRET_KEY": security.SECRET_KEY,
+        **(app_env or {}),
+    })
+
+    simulator.start()
+    try:
+        progress(f"Starting app against simulator at {simulator.url}")
+        app.start()
+        tokens = seed_users(database_url, max(levels))
+        workload = Workload(simulator.catalog.ids, MIXES[mix], assessment_method, seed=simulator_config.seed)
+        asyncio.run(warm_up(app.url, tokens[0], workload))
+        idle = app.memory()
+
+        results = []
+        for concurrency in levels:
+            progress(f"Running {mix} mix at concurrency {concurrency} for {duration:g}s")
+            level = asyncio.run(run_level(app.url, tokens, workload, concurrency, duration))
+            level.update(app.memory())
+            results.append(level)
+            progress(
+                f"  {level['throughput_rps']} req/s, p50 {level['latency_ms']['p50']} ms, "
+                f"p95 {level['latency_ms']['p95']} ms, p99 {level['latency_ms']['p99']} ms, "
+                f"{level['errors']} errors ({level['shed']} shed), RSS {level['rss_mb']} MB"
+            )
+    finally:
+        app.stop()
+        simulator.stop()
+
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {
+            "mix": mix,
+            "weights": MIXES[mix],
+            "duration_s": duration,
+            "levels": levels,
+            "assessment_method": assessment_method,
+            "simulator": vars(simulator_config),
+            "app_env": app_env or {},
+        },
+        "idle_rss_mb": idle["rss_mb"],
+        "levels": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Describe every level whose p95 latency or throughput regressed beyond `tolerance`"""
+    regressions = []
+    previous = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    for level in current["levels"]:
+        before = previous.get(level["concurrency"])
+        if not before:
+            continue
+        p95, old_p95 = level["latency_ms"]["p95"], before["latency_ms"]["p95"]
+        if old_p95 and p95 > old_p95 * (1 + tolerance):
+            regressions.append(f"concurrency {level['concurrency']}: p95 {old_p95} ms -> {p95} ms")
+        rps, old_rps = level["throughput_rps"], before["throughput_rps"]
+        if old_rps and rps < old_rps * (1 - tolerance):
+            regressions.append(f"concurrency {level['concurrency']}: throughput {old_rps} -> {rps} req/s")
+    return regressions
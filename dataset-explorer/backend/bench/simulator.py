@@ -0,0 +1,111 @@
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+
+
+@dataclass
+class SimulatorConfig:
+    """Shape of the fake HuggingFace API"""
+    datasets: int = 500
+    commits: int = 20
+    latency_ms: float = 50.0
+    jitter_ms: float = 10.0
+    error_rate: float = 0.0
+    seed: int = 0
+
+
+class Catalog:
+    """Deterministic dataset and commit fixtures for the simulator"""
+
+    def __init__(self, config: SimulatorConfig):
+        rng = random.Random(config.seed)
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.ids = [f"bench/dataset-{i:05d}" for i in range(config.datasets)]
+        self.datasets: Dict[str, Dict[str, Any]] = {}
+        self.commits: Dict[str, List[Dict[str, Any]]] = {}
+        for i, hf_id in enumerate(self.ids):
+            self.datasets[hf_id] = {
+                "id": hf_id,
+                "description": f"Benchmark dataset {i} covering topic {rng.randint(0, 50)}",
+                "size_bytes": rng.randint(1_000, 5_000_000_000),
+            }
+            self.commits[hf_id] = [
+                {
+                    "id": f"{i:05d}{c:05d}",
+                    "title": f"Update {c}",
+                    "date": (start + timedelta(hours=c)).isoformat().replace("+00:00", "Z"),
+                }
+                for c in range(config.commits)
+            ]
+
+
+def create_app(config: SimulatorConfig) -> FastAPI:
+    """Build an app serving the subset of the HuggingFace API the backend uses"""
+    catalog = Catalog(config)
+    rng = random.Random(config.seed + 1)
+    app = FastAPI(title="HuggingFace API simulator")
+    app.state.catalog = catalog
+
+    async def respond() -> None:
+        delay = max(0.0, rng.gauss(config.latency_ms, config.jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+        if config.error_rate and rng.random() < config.error_rate:
+            raise HTTPException(status_code=503, detail="Simulated upstream failure")
+
+    def lookup(dataset_id: str) -> Dict[str, Any]:
+        if dataset_id not in catalog.datasets:
+            raise HTTPException(status_code=404, detail=f"{dataset_id} not found")
+        return catalog.datasets[dataset_id]
+
+    @app.get("/api/datasets")
+    async def list_datasets(limit: int = 20, offset: int = 0):
+        await respond()
+        return [catalog.datasets[hf_id] for hf_id in catalog.ids[offset:offset + limit]]
+
+    @app.get("/api/datasets/{dataset_id:path}/commits")
+    async def dataset_commits(dataset_id: str):
+        await respond()
+        lookup(dataset_id)
+        return catalog.commits[dataset_id]
+
+    @app.get("/api/datasets/{dataset_id:path}")
+    async def dataset_info(dataset_id: str):
+        await respond()
+        return lookup(dataset_id)
+
+    return app
+
+
+class SimulatorServer:
+    """Runs the simulator on a background thread for the duration of a benchmark"""
+
+    def __init__(self, config: SimulatorConfig, port: int, host: str = "127.0.0.1"):
+        self.app = create_app(config)
+        self.url = f"http://{host}:{port}/api"
+        self._server = uvicorn.Server(uvicorn.Config(self.app, host=host, port=port, log_level="warning"))
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def catalog(self) -> Catalog:
+        return self.app.state.catalog
+
+    def start(self, timeout: float = 10.0) -> None:
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("HuggingFace simulator did not start")
+            time.sleep(0.05)
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        if self._thread:
+            self._thread.join(timeout=10)
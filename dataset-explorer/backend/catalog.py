@@ -0,0 +1,280 @@
+"""
+In-process columnar read model of the local dataset catalog.
+
+Sizes, follower counts and last-modified times live in NumPy arrays next to plain lists
+of ids, names and descriptions, so /datasets can filter and sort the whole catalog with
+vectorized operations instead of a query per request.
+
+The model is refreshed incrementally. Code that writes datasets or followers in this
+process reports it (mark_dirty / follow / unfollow) and the next sync() reloads just
+those rows. Writes made by other processes are picked up by a poll every
+CATALOG_REFRESH_SECONDS, which loads rows with a newer id or last_modified and recounts
+followers. The poll scans every follower row, so callers on the event loop should run
+sync() in the thread pool whenever refresh_due() says a poll is coming.
+"""
+import os
+import time
+from datetime import datetime
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session, lazyload
+
+from backend import models
+from backend.LRU import LRUCache
+
+CATALOG_REFRESH_SECONDS = float(os.environ.get("CATALOG_REFRESH_SECONDS", "30"))
+
+# Sort keys accepted by query(), matching the ones used for followed datasets
+SORT_KEYS = ("name", "size", "followers", "date")
+
+# size_bytes is nullable; -1 keeps missing sizes first in ascending order like SQLite's NULLs
+_NO_SIZE = -1
+
+def _epoch_us(value: Optional[datetime]) -> int:
+    return int(value.timestamp() * 1_000_000) if value else 0
+
+class Catalog:
+    """Columnar copy of models.Dataset plus follower counts, safe to share between threads"""
+
+    def __init__(self, refresh_seconds: float = CATALOG_REFRESH_SECONDS, followed_cache_size: int = 4096):
+        self.refresh_seconds = refresh_seconds
+        self._lock = Lock()
+        # Serializes syncs; their SQL runs without holding _lock, so readers never wait on it
+        self._sync_lock = Lock()
+        # Datasets followed by a user, loaded on first use and kept current by follow/unfollow
+        self._followed = LRUCache(maxsize=followed_cache_size, ttl=refresh_seconds)
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget everything; the next sync() reloads the catalog from scratch"""
+        with self._sync_lock, self._lock:
+            self.ids = np.empty(0, dtype=np.int64)
+            self.sizes = np.empty(0, dtype=np.int64)
+            self.followers = np.empty(0, dtype=np.int64)
+            self.modified = np.empty(0, dtype=np.int64)
+            self.hf_ids: List[str] = []
+            self.names: List[str] = []
+            self.descriptions: List[Optional[str]] = []
+            self.modified_at: List[datetime] = []
+            self._position: Dict[int, int] = {}
+            self._dirty: Set[int] = set()
+            self._loaded = False
+            self._has_new = False
+            self._synced_at = 0.0
+            self._max_id = 0
+            self._watermark: Optional[datetime] = None
+            # Sort key -> row positions in ascending (key, id) order, rebuilt lazily after changes
+            self._orders: Dict[str, np.ndarray] = {}
+        self._followed.clear()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # Change notifications
+
+    def mark_dirty(self, dataset_ids: Iterable[int] = ()) -> None:
+        """Datasets were inserted or updated; reload them on the next sync()"""
+        with self._lock:
+            self._dirty.update(dataset_ids)
+            self._has_new = True
+
+    def follow(self, user_id: int, dataset_id: int) -> None:
+        self._adjust_followers(user_id, dataset_id, 1)
+
+    def unfollow(self, user_id: int, dataset_id: int) -> None:
+        self._adjust_followers(user_id, dataset_id, -1)
+
+    def _adjust_followers(self, user_id: int, dataset_id: int, delta: int) -> None:
+        with self._lock:
+            position = self._position.get(dataset_id)
+            if position is not None:
+                self.followers[position] = max(0, self.followers[position] + delta)
+                self._orders.pop("followers", None)
+            else:
+                self._dirty.add(dataset_id)
+        followed = self._followed.get(user_id)
+        if followed is not None:
+            (followed.add if delta > 0 else followed.discard)(dataset_id)
+
+    # Loading
+
+    def refresh_due(self) -> bool:
+        """Whether the next sync() loads the whole catalog or polls, rather than reloading a few rows"""
+        with self._lock:
+            return not self._loaded or time.monotonic() - self._synced_at >= self.refresh_seconds
+
+    def sync(self, db: Session) -> None:
+        """Bring the model up to date; runs no SQL unless something changed or a poll is due"""
+        with self._sync_lock:
+            with self._lock:
+                poll_due = time.monotonic() - self._synced_at >= self.refresh_seconds
+                if self._loaded and not poll_due and not self._dirty and not self._has_new:
+                    return
+                dirty, self._dirty = self._dirty, set()
+                self._has_new = False
+                full = not self._loaded
+                max_id, watermark = self._max_id, self._watermark
+
+            try:
+                rows, follower_counts = self._load(db, dirty, full, poll_due, max_id, watermark)
+            except Exception:
+                with self._lock:
+                    self._dirty |= dirty
+                    self._has_new = True
+                raise
+
+            with self._lock:
+                self._apply(rows, follower_counts, recount=full or poll_due)
+                self._loaded = True
+                self._synced_at = time.monotonic()
+
+    def _load(
+        self, db: Session, dirty: Set[int], full: bool, poll_due: bool, max_id: int, watermark: Optional[datetime]
+    ) -> Tuple[List[models.Dataset], Dict[int, int]]:
+        query = db.query(models.Dataset).options(lazyload("*"))
+        if not full:
+            changed = [models.Dataset.id > max_id, models.Dataset.id.in_(dirty)]
+            if poll_due and watermark is not None:
+                changed.append(models.Dataset.last_modified > watermark)
+            query = query.filter(or_(*changed))
+        rows = query.order_by(models.Dataset.id).all()
+
+        counts = db.query(models.dataset_followers.c.dataset_id, func.count(models.dataset_followers.c.user_id))\
+            .group_by(models.dataset_followers.c.dataset_id)
+        follower_counts: Dict[int, int] = {}
+        if not (full or poll_due):
+            scope = dirty | {row.id for row in rows}
+            counts = counts.filter(models.dataset_followers.c.dataset_id.in_(scope))
+            # Datasets in scope that lost their last follower don't appear in the grouped result
+            follower_counts = dict.fromkeys(scope, 0)
+        follower_counts.update(counts.all())
+        return rows, follower_counts
+
+    def _apply(self, rows: List[models.Dataset], follower_counts: Dict[int, int], recount: bool) -> None:
+        new_rows = []
+        for row in rows:
+            position = self._position.get(row.id)
+            if position is None:
+                new_rows.append(row)
+                continue
+            self.sizes[position] = _NO_SIZE if row.size_bytes is None else row.size_bytes
+            self.modified[position] = _epoch_us(row.last_modified)
+            self.hf_ids[position] = row.hf_id
+            self.names[position] = row.name
+            self.descriptions[position] = row.description
+            self.modified_at[position] = row.last_modified
+
+        if new_rows:
+            start = len(self.ids)
+            self.ids = np.concatenate([self.ids, np.fromiter((row.id for row in new_rows), np.int64, len(new_rows))])
+            self.sizes = np.concatenate([self.sizes, np.fromiter(
+                (_NO_SIZE if row.size_bytes is None else row.size_bytes for row in new_rows), np.int64, len(new_rows)
+            )])
+            self.modified = np.concatenate([self.modified, np.fromiter(
+                (_epoch_us(row.last_modified) for row in new_rows), np.int64, len(new_rows)
+            )])
+            self.followers = np.concatenate([self.followers, np.zeros(len(new_rows), dtype=np.int64)])
+            for offset, row in enumerate(new_rows):
+                self._position[row.id] = start + offset
+                self.hf_ids.append(row.hf_id)
+                self.names.append(row.name)
+                self.descriptions.append(row.description)
+                self.modified_at.append(row.last_modified)
+
+        if recount:
+            self.followers[:] = 0
+        for dataset_id, count in follower_counts.items():
+            position = self._position.get(dataset_id)
+            if position is not None:
+                self.followers[position] = count
+
+        if follower_counts or recount:
+            self._orders.pop("followers", None)
+        if rows:
+            self._orders.clear()
+            self._max_id = int(self.ids.max())
+            newest = max((row.last_modified for row in rows if row.last_modified), default=None)
+            if newest and (self._watermark is None or newest > self._watermark):
+                self._watermark = newest
+
+    def _order(self, key: str) -> np.ndarray:
+        order = self._orders.get(key)
+        if order is None:
+            if key == "name":
+                # Names sort as Python strings; rank them so lexsort can use them as integers
+                column = np.empty(len(self.names), dtype=np.int64)
+                column[np.argsort(np.array(self.names, dtype=object), kind="stable")] = np.arange(len(self.names))
+            else:
+                column = {"size": self.sizes, "followers": self.followers, "date": self.modified}[key]
+            order = self._orders[key] = np.lexsort((self.ids, column))
+        return order
+
+    def followed_ids(self, db: Session, user_id: int) -> Set[int]:
+        followed = self._followed.get(user_id)
+        if followed is None:
+            followed = {
+                dataset_id for (dataset_id,) in db.query(models.dataset_followers.c.dataset_id)
+                    .filter(models.dataset_followers.c.user_id == user_id)
+            }
+            self._followed.set(user_id, followed)
+        return followed
+
+    # Queries
+
+    def query(
+        self,
+        sort: str = "name",
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        followed: Optional[Set[int]] = None,
+        exclude_followed: bool = False,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """
+        Filter and sort the catalog, returning one page of rows as dicts.
+        `followed` restricts results to those dataset ids, or excludes them with exclude_followed.
+        Ties are broken by id, in the same direction as the sort.
+        """
+        descending = sort.startswith("-")
+        key = sort.lstrip("-")
+        if key not in SORT_KEYS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid sort '{sort}', expected one of: {', '.join(SORT_KEYS)} (prefix with - for descending)"
+            )
+
+        with self._lock:
+            mask = np.ones(len(self.ids), dtype=bool)
+            if min_size is not None:
+                mask &= self.sizes >= min_size
+            if max_size is not None:
+                mask &= (self.sizes <= max_size) & (self.sizes != _NO_SIZE)
+            if followed is not None:
+                members = np.isin(self.ids, np.fromiter(followed, np.int64, len(followed)))
+                mask &= ~members if exclude_followed else members
+
+            # Reversing the ascending (key, id) order gives (key desc, id desc)
+            ordered = self._order(key)
+            if descending:
+                ordered = ordered[::-1]
+            if not mask.all():
+                ordered = ordered[mask[ordered]]
+            order = ordered[offset:offset + limit]
+
+            return [
+                {
+                    "id": int(self.ids[position]),
+                    "hf_id": self.hf_ids[position],
+                    "name": self.names[position],
+                    "description": self.descriptions[position],
+                    "last_modified": self.modified_at[position],
+                    "size_bytes": None if self.sizes[position] == _NO_SIZE else int(self.sizes[position]),
+                    "follower_count": int(self.followers[position]),
+                }
+                for position in order
+            ]
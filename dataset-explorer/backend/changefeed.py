@@ -0,0 +1,182 @@
+"""
+Server-pushed change feed for followed datasets.
+
+Every open /user/followed-datasets/events stream is a Subscriber with a bounded queue.
+One shared poller checks the union of the subscribers' followed datasets against
+HuggingFace every CHANGEFEED_POLL_SECONDS, so a dataset is checked once per round no
+matter how many users follow it, and fans the resulting events out to the subscribers
+that follow it. Request handlers that store upstream changes first publish them
+themselves, since the poller only announces what it finds new in the database. The poller
+runs only while someone is subscribed. A stream subscribes when
+the client starts reading it, with the datasets the user follows at that moment, and
+unsubscribes when it ends.
+
+A subscriber that can't keep up doesn't slow the poller down: when its queue is full the
+backlog is dropped and replaced by a single "resync" event, telling the client to reload
+its followed datasets.
+"""
+import asyncio
+import json
+import logging
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from backend import metrics
+
+logger = logging.getLogger(__name__)
+
+CHANGEFEED_POLL_SECONDS = float(os.environ.get("CHANGEFEED_POLL_SECONDS", "60"))
+CHANGEFEED_QUEUE_SIZE = int(os.environ.get("CHANGEFEED_QUEUE_SIZE", "100"))
+# Upstream checks in flight at once during a poll round
+CHANGEFEED_CONCURRENCY = int(os.environ.get("CHANGEFEED_CONCURRENCY", "8"))
+CHANGEFEED_KEEPALIVE_SECONDS = float(os.environ.get("CHANGEFEED_KEEPALIVE_SECONDS", "15"))
+
+# user ids -> {user_id: {dataset_id: hf_id}} for the datasets each user follows
+FollowedLoader = Callable[[Set[int]], Dict[int, Dict[int, str]]]
+# (dataset_id, hf_id) -> [(event name, payload)] for what changed upstream since the last check
+DatasetChecker = Callable[[int, str], Awaitable[List[Tuple[str, Dict[str, Any]]]]]
+
+class Event(NamedTuple):
+    id: int
+    name: str
+    data: Dict[str, Any]
+
+    def encode(self) -> str:
+        return f"id: {self.id}\nevent: {self.name}\ndata: {json.dumps(self.data)}\n\n"
+
+class Subscriber:
+    def __init__(self, user_id: int, queue_size: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        # Datasets the user followed when subscribing or at the last poll round
+        self.datasets: Set[int] = set()
+
+class ChangeFeed:
+    """Shared upstream poller with per-subscriber fan-out; used from the event loop only"""
+
+    def __init__(
+        self,
+        load_followed: FollowedLoader,
+        check: DatasetChecker,
+        interval: float = CHANGEFEED_POLL_SECONDS,
+        queue_size: int = CHANGEFEED_QUEUE_SIZE,
+        concurrency: int = CHANGEFEED_CONCURRENCY,
+    ):
+        self.load_followed = load_followed
+        self.check = check
+        self.interval = interval
+        self.queue_size = queue_size
+        self.concurrency = concurrency
+        self._subscribers: Set[Subscriber] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    async def subscribe(self, user_id: int) -> Subscriber:
+        subscriber = Subscriber(user_id, self.queue_size)
+        # Know the user's datasets now rather than at the next round, which can be a poll interval away
+        followed = await run_in_threadpool(self.load_followed, {user_id})
+        subscriber.datasets = set(followed.get(user_id, {}))
+        self._subscribers.add(subscriber)
+        metrics.CHANGEFEED_SUBSCRIBERS.inc()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        if subscriber not in self._subscribers:
+            return
+        self._subscribers.discard(subscriber)
+        metrics.CHANGEFEED_SUBSCRIBERS.dec()
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def close(self) -> None:
+        for subscriber in list(self._subscribers):
+            self.unsubscribe(subscriber)
+
+    # Fan-out
+
+    def publish(self, dataset_id: int, name: str, data: Dict[str, Any]) -> int:
+        """Queue an event for every subscriber following the dataset; returns how many got it"""
+        self._next_id += 1
+        event = Event(self._next_id, name, data)
+        metrics.CHANGEFEED_EVENTS.inc(event=name)
+        delivered = 0
+        for subscriber in self._subscribers:
+            if dataset_id in subscriber.datasets:
+                self._deliver(subscriber, event)
+                delivered += 1
+        return delivered
+
+    def _deliver(self, subscriber: Subscriber, event: Event) -> None:
+        try:
+            subscriber.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Drop the backlog rather than block the poller or grow without bound
+            dropped = subscriber.queue.qsize()
+            while not subscriber.queue.empty():
+                subscriber.queue.get_nowait()
+            metrics.CHANGEFEED_OVERFLOWS.inc()
+            subscriber.queue.put_nowait(Event(event.id, "resync", {"dropped": dropped + 1}))
+
+    # Polling
+
+    async def poll(self) -> int:
+        """Run one poll round; returns the number of datasets checked"""
+        followed = await run_in_threadpool(self.load_followed, {s.user_id for s in self._subscribers})
+        targets: Dict[int, str] = {}
+        for subscriber in self._subscribers:
+            datasets = followed.get(subscriber.user_id, {})
+            subscriber.datasets = set(datasets)
+            targets.update(datasets)
+
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def check(dataset_id: int, hf_id: str) -> None:
+            async with limit:
+                try:
+                    changes = await self.check(dataset_id, hf_id)
+                except Exception as e:
+                    metrics.CHANGEFEED_CHECKS.inc(result="error")
+                    logger.warning("Change feed check of %s failed: %s", hf_id, e)
+                    return
+            metrics.CHANGEFEED_CHECKS.inc(result="ok")
+            for name, data in changes:
+                self.publish(dataset_id, name, data)
+
+        with metrics.CHANGEFEED_POLL_LATENCY.time():
+            await asyncio.gather(*(check(dataset_id, hf_id) for dataset_id, hf_id in targets.items()))
+        return len(targets)
+
+    async def _run(self) -> None:
+        while self._subscribers:
+            try:
+                await self.poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Change feed poll failed")
+            await asyncio.sleep(self.interval)
+
+    async def stream(self, user_id: int, keepalive: float = CHANGEFEED_KEEPALIVE_SECONDS) -> AsyncIterator[str]:
+        """
+        Server-sent events for one user, with comment lines to keep idle connections open.
+        Subscribing happens on first iteration, so a response that is never sent holds nothing.
+        """
+        subscriber = await self.subscribe(user_id)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield event.encode()
+        finally:
+            self.unsubscribe(subscriber)
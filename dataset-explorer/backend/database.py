@@ -1,10 +1,94 @@
-from sqlalchemy import create_engine
+import os
+from typing import Dict, List, Sequence
+from sqlalchemy import Table, create_engine, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql import Insert
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./users.db"
+SQLALCHEMY_DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./users.db")
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL,
+    # SQLite connections are shared with the thread pool; other drivers don't take this argument
+    connect_args={"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {}
 )
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+def insert_ignoring_conflicts(dialect_name: str, table: Table, columns: Sequence[str], keys: Sequence[str]) -> Insert:
+    """
+    INSERT of `columns` (one parameter set per row) that skips rows whose `keys` already
+    exist, via ON CONFLICT DO NOTHING. Callers rely on RETURNING for the rows actually
+    inserted, so only SQLite and PostgreSQL are supported.
+    """
+    if dialect_name not in ("sqlite", "postgresql"):
+        raise ValueError(f"Conflict-ignoring inserts are supported on SQLite and PostgreSQL, not {dialect_name}")
+    dialect_insert = sqlite_insert if dialect_name == "sqlite" else postgresql_insert
+    return dialect_insert(table).on_conflict_do_nothing(index_elements=list(keys))
+
+# Triggers that keep the copies of each dataset's sort keys on its follower rows, and the
+# follower count on the dataset, in step with the rows they are copied from. Triggers see
+# every write, including raw inserts and ON DELETE CASCADE, which application code would miss.
+FOLLOW_SORT_KEY_TRIGGERS: Dict[str, List[str]] = {
+    "sqlite": [
+        """CREATE TRIGGER IF NOT EXISTS tr_dataset_followers_insert AFTER INSERT ON dataset_followers
+        BEGIN
+            UPDATE dataset_followers SET (dataset_name, dataset_size, dataset_modified) =
+                (SELECT name, coalesce(size_bytes, 0), last_modified FROM datasets WHERE id = NEW.dataset_id)
+            WHERE user_id = NEW.user_id AND dataset_id = NEW.dataset_id;
+            UPDATE datasets SET follower_count = follower_count + 1 WHERE id = NEW.dataset_id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS tr_dataset_followers_delete AFTER DELETE ON dataset_followers
+        BEGIN
+            UPDATE datasets SET follower_count = follower_count - 1 WHERE id = OLD.dataset_id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS tr_datasets_sort_keys AFTER UPDATE OF name, size_bytes, last_modified ON datasets
+        BEGIN
+            UPDATE dataset_followers
+            SET dataset_name = NEW.name, dataset_size = coalesce(NEW.size_bytes, 0), dataset_modified = NEW.last_modified
+            WHERE dataset_id = NEW.id;
+        END""",
+    ],
+    "postgresql": [
+        """CREATE OR REPLACE FUNCTION dataset_followers_sort_keys() RETURNS trigger AS $$
+        BEGIN
+            SELECT name, coalesce(size_bytes, 0), last_modified
+            INTO NEW.dataset_name, NEW.dataset_size, NEW.dataset_modified
+            FROM datasets WHERE id = NEW.dataset_id;
+            RETURN NEW;
+        END $$ LANGUAGE plpgsql""",
+        # BEFORE INSERT also fires for rows ON CONFLICT DO NOTHING then skips, so counting waits for AFTER
+        """CREATE OR REPLACE TRIGGER tr_dataset_followers_sort_keys BEFORE INSERT ON dataset_followers
+        FOR EACH ROW EXECUTE FUNCTION dataset_followers_sort_keys()""",
+        """CREATE OR REPLACE FUNCTION dataset_followers_count() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE datasets SET follower_count = follower_count + 1 WHERE id = NEW.dataset_id;
+            ELSE
+                UPDATE datasets SET follower_count = follower_count - 1 WHERE id = OLD.dataset_id;
+            END IF;
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql""",
+        """CREATE OR REPLACE TRIGGER tr_dataset_followers_count AFTER INSERT OR DELETE ON dataset_followers
+        FOR EACH ROW EXECUTE FUNCTION dataset_followers_count()""",
+        """CREATE OR REPLACE FUNCTION datasets_sort_keys() RETURNS trigger AS $$
+        BEGIN
+            UPDATE dataset_followers
+            SET dataset_name = NEW.name, dataset_size = coalesce(NEW.size_bytes, 0), dataset_modified = NEW.last_modified
+            WHERE dataset_id = NEW.id;
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql""",
+        """CREATE OR REPLACE TRIGGER tr_datasets_sort_keys AFTER UPDATE OF name, size_bytes, last_modified ON datasets
+        FOR EACH ROW EXECUTE FUNCTION datasets_sort_keys()""",
+    ],
+}
+
+def create_follow_sort_key_triggers(conn: Connection) -> None:
+    """Create the FOLLOW_SORT_KEY_TRIGGERS for the connection's database"""
+    dialect_name = conn.dialect.name
+    if dialect_name not in FOLLOW_SORT_KEY_TRIGGERS:
+        raise ValueError(f"Follower sort keys are maintained by triggers on SQLite and PostgreSQL, not {dialect_name}")
+    for statement in FOLLOW_SORT_KEY_TRIGGERS[dialect_name]:
+        conn.execute(text(statement))
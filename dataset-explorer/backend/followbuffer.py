@@ -0,0 +1,275 @@
+"""
+Write-behind buffer for follow/unfollow.
+
+Follow and unfollow requests record the desired state of a (user, dataset) pair in memory
+and return immediately with an optimistic follower count. A background thread writes the
+buffered pairs in one transaction (a group commit) every FOLLOW_FLUSH_MS milliseconds, or
+as soon as FOLLOW_FLUSH_EVENTS pairs are waiting. The writes are idempotent upserts and
+deletes, so replaying a batch is harmless.
+
+Durability: in the default "buffered" mode an acknowledged follow can be lost if the
+process dies before its group commit, i.e. within roughly FOLLOW_FLUSH_MS. A failed commit
+keeps the batch buffered and retries it on the next flush. With FOLLOW_WRITE_MODE=sync each
+request waits until its group commit has landed (up to FOLLOW_SYNC_TIMEOUT seconds), so an
+acknowledged follow is on disk while concurrent requests still share commits.
+
+Reads of a user's own follows stay consistent because listings call flush_user() first.
+Other users' counts may trail by one flush interval.
+"""
+import logging
+import os
+import time
+from threading import Condition, Lock, Thread
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, func
+from sqlalchemy.orm import Session
+
+from backend import metrics, models
+from backend.database import insert_ignoring_conflicts
+from backend.LRU import LRUCache
+
+logger = logging.getLogger(__name__)
+
+FOLLOW_WRITE_MODE = os.environ.get("FOLLOW_WRITE_MODE", "buffered")  # buffered or sync
+FOLLOW_FLUSH_SECONDS = float(os.environ.get("FOLLOW_FLUSH_MS", "5")) / 1000
+FOLLOW_FLUSH_EVENTS = int(os.environ.get("FOLLOW_FLUSH_EVENTS", "256"))
+FOLLOW_SYNC_TIMEOUT = float(os.environ.get("FOLLOW_SYNC_TIMEOUT", "5"))
+
+# Pause after a failed flush before trying again
+RETRY_SECONDS = 0.5
+
+Key = Tuple[int, int]  # (user_id, dataset_id)
+
+class _Pending(NamedTuple):
+    stored: bool  # whether the row exists in the database
+    wanted: bool  # whether it should exist once flushed
+    seq: int
+
+class FollowBuffer:
+    """In-process buffer of follow state changes, flushed in group commits by a background thread"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        flush_seconds: float = FOLLOW_FLUSH_SECONDS,
+        max_events: int = FOLLOW_FLUSH_EVENTS,
+        sync: bool = FOLLOW_WRITE_MODE == "sync",
+        count_cache_size: int = 4096,
+        count_ttl: float = 30.0,
+    ):
+        self.session_factory = session_factory
+        self.flush_seconds = flush_seconds
+        self.max_events = max_events
+        self.sync = sync
+        self._lock = Lock()
+        self._changed = Condition(self._lock)
+        # Serializes flushes with count reloads, so a count never misses or double counts a batch
+        self._flush_lock = Lock()
+        self._pending: Dict[Key, _Pending] = {}
+        self._seq = 0
+        self._flushed_seq = 0
+        # Bumped whenever pending entries are written or dropped, so _record can tell its read went stale
+        self._generation = 0
+        self._counts = LRUCache(maxsize=count_cache_size, ttl=count_ttl)
+        self._thread: Optional[Thread] = None
+        self._stopping = False
+
+    def clear(self) -> None:
+        """Drop buffered changes and cached counts without writing them"""
+        with self._flush_lock, self._lock:
+            self._pending.clear()
+            self._flushed_seq = self._seq
+            self._generation += 1
+            self._changed.notify_all()
+        self._counts.clear()
+
+    # Recording changes
+
+    def follow(self, db: Session, user_id: int, dataset_id: int) -> Tuple[bool, int]:
+        return self._record(db, user_id, dataset_id, True)
+
+    def unfollow(self, db: Session, user_id: int, dataset_id: int) -> Tuple[bool, int]:
+        return self._record(db, user_id, dataset_id, False)
+
+    def _record(self, db: Session, user_id: int, dataset_id: int, wanted: bool) -> Tuple[bool, int]:
+        """
+        Buffer the desired state of one pair. Returns (changed, seq): whether this changes
+        the user's follow state, and the sequence number to pass to wait() for durability.
+        """
+        key = (user_id, dataset_id)
+        while True:
+            with self._lock:
+                pending = self._pending.get(key)
+                generation = self._generation
+            stored = self._stored(db, key, pending)
+
+            with self._lock:
+                pending = self._pending.get(key)
+                if pending:
+                    stored, before = pending.stored, pending.wanted
+                elif self._generation != generation:
+                    # A flush landed since we looked, so `stored` may predate it; read again
+                    continue
+                else:
+                    before = stored
+                if before == wanted:
+                    # Sync mode must still wait for a pending change that already wants this state
+                    return False, pending.seq if pending else self._flushed_seq
+                self._seq += 1
+                self._pending[key] = _Pending(stored, wanted, self._seq)
+                count = self._counts.get(dataset_id)
+                if count is not None:
+                    self._counts.set(dataset_id, count + (1 if wanted else -1))
+                self._start()
+                if len(self._pending) >= self.max_events:
+                    self._changed.notify_all()
+                return True, self._seq
+
+    def _stored(self, db: Session, key: Key, pending: Optional[_Pending]) -> bool:
+        return pending.stored if pending else self._exists(db, key)
+
+    def _exists(self, db: Session, key: Key) -> bool:
+        user_id, dataset_id = key
+        return db.execute(
+            models.dataset_followers.select().where(
+                models.dataset_followers.c.user_id == user_id,
+                models.dataset_followers.c.dataset_id == dataset_id
+            )
+        ).first() is not None
+
+    # Reading
+
+    def follower_count(self, dataset_id: int) -> int:
+        """Follower count including buffered changes"""
+        count = self._counts.get(dataset_id)
+        if count is not None:
+            return count
+        with self._flush_lock:
+            db = self.session_factory()
+            try:
+                stored = db.query(func.count(models.dataset_followers.c.user_id))\
+                    .filter(models.dataset_followers.c.dataset_id == dataset_id)\
+                    .scalar()
+            finally:
+                db.close()
+            with self._lock:
+                count = stored + sum(
+                    int(pending.wanted) - int(pending.stored)
+                    for (_, pending_dataset), pending in self._pending.items() if pending_dataset == dataset_id
+                )
+                self._counts.set(dataset_id, count)
+        return count
+
+    def is_following(self, db: Session, user_id: int, dataset_id: int) -> bool:
+        """The user's follow state including buffered changes, by (user_id, dataset_id) key lookup"""
+        with self._lock:
+            pending = self._pending.get((user_id, dataset_id))
+        return pending.wanted if pending else self._exists(db, (user_id, dataset_id))
+
+    def has_pending(self, user_id: int) -> bool:
+        with self._lock:
+            return any(pending_user == user_id for pending_user, _ in self._pending)
+
+    def flush_user(self, user_id: int) -> None:
+        """Write out buffered changes before reading the user's follows from the database"""
+        if self.has_pending(user_id):
+            self.flush()
+
+    def wait(self, seq: int, timeout: float = FOLLOW_SYNC_TIMEOUT) -> None:
+        """Block until the change numbered `seq` has been committed"""
+        with self._lock:
+            if not self._changed.wait_for(lambda: self._flushed_seq >= seq, timeout=timeout):
+                raise TimeoutError(f"Follow change {seq} was not committed within {timeout}s")
+
+    # Flushing
+
+    def flush(self) -> int:
+        """Group-commit everything buffered so far; returns the number of rows written"""
+        with self._flush_lock:
+            with self._lock:
+                batch = dict(self._pending)
+                seq = self._seq
+            follows = [
+                {"user_id": user_id, "dataset_id": dataset_id}
+                for (user_id, dataset_id), pending in batch.items() if pending.wanted and not pending.stored
+            ]
+            unfollows = [
+                {"u": user_id, "d": dataset_id}
+                for (user_id, dataset_id), pending in batch.items() if pending.stored and not pending.wanted
+            ]
+
+            if follows or unfollows:
+                table = models.dataset_followers
+                db = self.session_factory()
+                try:
+                    with metrics.FOLLOW_FLUSH_LATENCY.time():
+                        if follows:
+                            db.execute(
+                                insert_ignoring_conflicts(
+                                    db.get_bind().dialect.name, table, ["user_id", "dataset_id"], ["user_id", "dataset_id"]
+                                ),
+                                follows
+                            )
+                        if unfollows:
+                            db.execute(
+                                table.delete().where(and_(
+                                    table.c.user_id == bindparam("u"), table.c.dataset_id == bindparam("d")
+                                )),
+                                unfollows
+                            )
+                        db.commit()
+                finally:
+                    db.close()
+                metrics.FOLLOW_FLUSH_SIZE.observe(len(follows) + len(unfollows))
+
+            with self._lock:
+                for key, pending in batch.items():
+                    current = self._pending.get(key)
+                    if current is pending:
+                        del self._pending[key]
+                    elif current is not None:
+                        # Changed again while we were writing; the database now holds what we wrote
+                        self._pending[key] = current._replace(stored=pending.wanted)
+                if batch:
+                    self._generation += 1
+                self._flushed_seq = max(self._flushed_seq, seq)
+                self._changed.notify_all()
+            return len(follows) + len(unfollows)
+
+    def _start(self) -> None:
+        # Called with self._lock held
+        if self._thread is None and not self._stopping:
+            self._thread = Thread(target=self._run, name="follow-flusher", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                self._changed.wait_for(lambda: self._pending or self._stopping)
+                if self._stopping and not self._pending:
+                    return
+                # Let a group gather, unless the batch is already full
+                self._changed.wait_for(
+                    lambda: len(self._pending) >= self.max_events or self._stopping, timeout=self.flush_seconds
+                )
+            try:
+                self.flush()
+            except Exception:
+                metrics.FOLLOW_FLUSH_ERRORS.inc()
+                logger.exception("Follow flush failed, keeping %d changes buffered", len(self._pending))
+                time.sleep(RETRY_SECONDS)
+                if self._stopping:
+                    return
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Flush what is buffered and stop the background thread"""
+        with self._lock:
+            self._stopping = True
+            self._changed.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        with self._lock:
+            self._thread = None
+            self._stopping = False
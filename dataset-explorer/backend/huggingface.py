@@ -1,58 +1,68 @@
 import httpx
 import asyncio
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable
 from datetime import datetime
 import numpy as np
+import time
 from sklearn.cluster import KMeans
 from sentence_transformers import SentenceTransformer
+from backend import metrics
+
+class HuggingFaceError(Exception):
+    """A HuggingFace API call answered with a status other than 200"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
 
 class HuggingFaceClient:
     """Client for interacting with the HuggingFace API"""
     
-    def __init__(self, api_token: Optional[str] = None):
-        self.base_url = "https://huggingface.co/api"
+    def __init__(self, api_token: Optional[str] = None, base_url: str = "https://huggingface.co/api"):
+        self.base_url = base_url.rstrip("/")
         self.headers = {}
         if api_token:
             self.headers["Authorization"] = f"Bearer {api_token}"
     
+    async def _get(self, method: str, url: str) -> httpx.Response:
+        """GET an API url, recording latency and status under the client method name"""
+        start = time.perf_counter()
+        status = "error"
+        try:
+            async with httpx.AsyncClient() as client:
+                response = await client.get(url, headers=self.headers)
+            status = str(response.status_code)
+            return response
+        finally:
+            metrics.HF_LATENCY.observe(time.perf_counter() - start, method=method)
+            metrics.HF_REQUESTS.inc(method=method, status=status)
+    
     async def get_datasets(self, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
         """Fetch public datasets from HuggingFace"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/datasets?limit={limit}&offset={offset}", 
-                headers=self.headers
-            )
+        response = await self._get("get_datasets", f"{self.base_url}/datasets?limit={limit}&offset={offset}")
+        
+        if response.status_code != 200:
+            raise HuggingFaceError(response.status_code, f"Failed to fetch datasets: {response.text}")
             
-            if response.status_code != 200:
-                raise Exception(f"Failed to fetch datasets: {response.text}")
-                
-            return response.json()
+        return response.json()
     
     async def get_dataset_info(self, dataset_id: str) -> Dict[str, Any]:
         """Get detailed information about a specific dataset"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/datasets/{dataset_id}", 
-                headers=self.headers
-            )
+        response = await self._get("get_dataset_info", f"{self.base_url}/datasets/{dataset_id}")
+        
+        if response.status_code != 200:
+            raise HuggingFaceError(response.status_code, f"Failed to fetch dataset info: {response.text}")
             
-            if response.status_code != 200:
-                raise Exception(f"Failed to fetch dataset info: {response.text}")
-                
-            return response.json()
+        return response.json()
     
     async def get_dataset_history(self, dataset_id: str) -> List[Dict[str, Any]]:
         """Get commit history for a dataset"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/datasets/{dataset_id}/commits", 
-                headers=self.headers
-            )
+        response = await self._get("get_dataset_history", f"{self.base_url}/datasets/{dataset_id}/commits")
+        
+        if response.status_code != 200:
+            raise HuggingFaceError(response.status_code, f"Failed to fetch dataset history: {response.text}")
             
-            if response.status_code != 200:
-                raise Exception(f"Failed to fetch dataset history: {response.text}")
-                
-            return response.json()
+        return response.json()
 
 
 class ImpactAssessor:
@@ -88,13 +98,21 @@ class ImpactAssessor:
         }
     
     @staticmethod
-    def advanced_assessment(datasets: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def advanced_assessment(
+        datasets: List[Dict[str, Any]],
+        progress: Optional[Callable[[str, float], None]] = None
+    ) -> Dict[str, Any]:
         """
         Advanced impact assessment using semantic clustering of descriptions.
+        progress, if given, is called with (stage, fraction done) as the work advances.
         """
+        report = progress or (lambda stage, fraction: None)
+
         # Load the model (should be global/singleton in production)
         if not hasattr(ImpactAssessor, '_model'):
-            ImpactAssessor._model = SentenceTransformer('all-MiniLM-L6-v2')
+            report("loading model", 0.0)
+            with metrics.ML_LATENCY.time(stage="load"):
+                ImpactAssessor._model = SentenceTransformer('all-MiniLM-L6-v2')
         model = ImpactAssessor._model
 
         descriptions = [ds.get("description", "") or "" for ds in datasets]
@@ -102,10 +120,14 @@ class ImpactAssessor:
             # Fallback: if all descriptions are empty, use naive method
             return ImpactAssessor.naive_assessment(datasets)
 
-        embeddings = model.encode(descriptions)
+        report("encoding", 0.1)
+        with metrics.ML_LATENCY.time(stage="encode"):
+            embeddings = model.encode(descriptions)
+        report("clustering", 0.8)
         n_clusters = min(len(datasets), 3)
         kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-        clusters = kmeans.fit_predict(embeddings)
+        with metrics.ML_LATENCY.time(stage="cluster"):
+            clusters = kmeans.fit_predict(embeddings)
         unique_clusters = len(set(clusters))
 
         if unique_clusters == 1:
@@ -0,0 +1,135 @@
+import hashlib
+import json
+from threading import Lock
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from sqlalchemy import delete, event, inspect, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from backend import models
+from backend.LRU import LRUCache
+
+# Fields an assessment result depends on; a change to any of them invalidates it
+VERSIONED_FIELDS = ("description", "size_bytes")
+
+def dataset_version(dataset: Dict[str, Any]) -> str:
+    """Short fingerprint of the dataset fields an assessment depends on"""
+    raw = "\x00".join(str(dataset.get(field) or "") for field in VERSIONED_FIELDS)
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+def cache_key(method: str, datasets: List[Dict[str, Any]]) -> str:
+    """Key an assessment by method, sorted dataset ids and per-dataset versions"""
+    members = sorted((ds["id"], dataset_version(ds)) for ds in datasets)
+    raw = method + "|" + ";".join(f"{dataset_id}:{version}" for dataset_id, version in members)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+class ImpactCache:
+    """
+    Two-level memo for impact assessments: an in-process LRU in front of the
+    impact_assessments table, so results survive restarts and are shared by workers.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.memory = LRUCache(maxsize=maxsize)
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+
+    def lookup(self, db: Session, method: str, datasets: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Return the cached result for these datasets, or None"""
+        result = self.peek(db, method, datasets)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def peek(self, db: Session, method: str, datasets: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Like lookup, but for opportunistic reuse: doesn't count towards the hit rate"""
+        key = cache_key(method, datasets)
+        entry = self.memory.get(key)
+        if entry is None:
+            row = db.query(models.ImpactAssessmentResult)\
+                .filter(models.ImpactAssessmentResult.cache_key == key)\
+                .first()
+            if row is not None:
+                entry = (frozenset(ds["id"] for ds in datasets), _row_result(row))
+                self.memory.set(key, entry)
+        return dict(entry[1]) if entry is not None else None
+
+    def store(self, db: Session, method: str, datasets: List[Dict[str, Any]], result: Dict[str, Any]) -> None:
+        """Remember a result in memory and persist it in its own transaction"""
+        key = cache_key(method, datasets)
+        dataset_ids = frozenset(ds["id"] for ds in datasets)
+        self.memory.set(key, (dataset_ids, dict(result)))
+
+        details = {k: v for k, v in result.items() if k not in ("level", "explanation", "method")}
+        try:
+            with db.get_bind().begin() as conn:
+                assessment_id = conn.execute(models.ImpactAssessmentResult.__table__.insert().values(
+                    cache_key=key,
+                    method=method,
+                    level=result["level"],
+                    explanation=result["explanation"],
+                    details=json.dumps(details)
+                )).inserted_primary_key[0]
+                if dataset_ids:
+                    conn.execute(models.impact_assessment_datasets.insert(), [
+                        {"assessment_id": assessment_id, "dataset_id": dataset_id} for dataset_id in dataset_ids
+                    ])
+        except IntegrityError:
+            # Another request stored the same result first
+            pass
+
+    def assess(
+        self,
+        db: Session,
+        method: str,
+        datasets: List[Dict[str, Any]],
+        assessor: Callable[[List[Dict[str, Any]]], Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Return the cached result, or run the assessor and cache what it returns"""
+        result = self.lookup(db, method, datasets)
+        if result is None:
+            result = assessor(datasets)
+            self.store(db, method, datasets, result)
+        return result
+
+    def invalidate(self, connection, dataset_ids: Iterable[int]) -> None:
+        """Drop every cached result that covers one of the given datasets"""
+        dataset_ids = frozenset(dataset_ids)
+        self.memory.pop_matching(lambda key, entry: not entry[0].isdisjoint(dataset_ids))
+
+        links = models.impact_assessment_datasets
+        assessment_ids = [
+            row[0] for row in connection.execute(
+                select(links.c.assessment_id).where(links.c.dataset_id.in_(dataset_ids)).distinct()
+            )
+        ]
+        if assessment_ids:
+            connection.execute(delete(links).where(links.c.assessment_id.in_(assessment_ids)))
+            connection.execute(delete(models.ImpactAssessmentResult.__table__)
+                               .where(models.ImpactAssessmentResult.id.in_(assessment_ids)))
+
+    def install(self) -> None:
+        """Invalidate affected results whenever a dataset's versioned fields change"""
+        def after_update(mapper, connection, target):
+            state = inspect(target)
+            if any(state.attrs[field].history.has_changes() for field in VERSIONED_FIELDS):
+                self.invalidate(connection, [target.id])
+
+        event.listen(models.Dataset, "after_update", after_update)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self.memory)
+        }
+
+def _row_result(row: models.ImpactAssessmentResult) -> Dict[str, Any]:
+    result = json.loads(row.details) if row.details else {}
+    result.update(level=row.level, explanation=row.explanation, method=row.method)
+    return result
@@ -0,0 +1,161 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from backend import models, schemas
+
+logger = logging.getLogger(__name__)
+
+# Statuses a job can be in; the first two are "active"
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+ACTIVE_STATUSES = (PENDING, RUNNING)
+
+# A running job whose row hasn't been touched for this long is taken to belong to a dead process.
+# Jobs report progress at every stage, which refreshes updated_at.
+JOB_STALE_SECONDS = float(os.environ.get("JOB_STALE_SECONDS", "600"))
+
+# Runs one job: (db session, job row, progress callback) -> assessment result dict
+JobRunner = Callable[[Session, models.AssessmentJob, Callable[[str, float], None]], Dict[str, Any]]
+
+class JobQueue:
+    """
+    Persistent queue of impact assessment jobs, processed by a bounded local
+    thread pool. Job state lives in the assessment_jobs table so it can be polled
+    from any worker and survives restarts.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        runner: JobRunner,
+        max_workers: int = 2,
+        stale_seconds: float = JOB_STALE_SECONDS
+    ):
+        self.session_factory = session_factory
+        self.runner = runner
+        self.max_workers = max_workers
+        self.stale_seconds = stale_seconds
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = Lock()
+
+    def submit(self, db: Session, user_id: int, method: str, dataset_ids: List[int], cache_key: str) -> models.AssessmentJob:
+        """Queue a job, or return the identical job the user already has pending or running"""
+        existing = db.query(models.AssessmentJob)\
+            .filter(
+                models.AssessmentJob.user_id == user_id,
+                models.AssessmentJob.cache_key == cache_key,
+                models.AssessmentJob.status.in_(ACTIVE_STATUSES)
+            ).first()
+        if existing:
+            return existing
+
+        job = models.AssessmentJob(
+            user_id=user_id,
+            method=method,
+            dataset_ids=",".join(map(str, dataset_ids)),
+            cache_key=cache_key,
+            status=PENDING
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        self._dispatch(job.id)
+        return job
+
+    def resume(self) -> int:
+        """
+        Re-queue pending jobs, and running jobs that went stale because the process running
+        them died. Jobs another live worker is running are left alone.
+        """
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            db.execute(
+                update(models.AssessmentJob)
+                .where(
+                    models.AssessmentJob.status == RUNNING,
+                    models.AssessmentJob.updated_at < now - timedelta(seconds=self.stale_seconds)
+                )
+                .values(status=PENDING, updated_at=now)
+            )
+            db.commit()
+            job_ids = [
+                job_id for (job_id,) in db.query(models.AssessmentJob.id)
+                    .filter(models.AssessmentJob.status == PENDING)
+                    .order_by(models.AssessmentJob.id)
+            ]
+        finally:
+            db.close()
+        for job_id in job_ids:
+            self._dispatch(job_id)
+        return len(job_ids)
+
+    def snapshot(self, job_id: int) -> Optional[schemas.AssessmentJob]:
+        """Read the current state of a job in a fresh session"""
+        db = self.session_factory()
+        try:
+            job = db.query(models.AssessmentJob).filter(models.AssessmentJob.id == job_id).first()
+            return to_schema(job) if job else None
+        finally:
+            db.close()
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+    def _dispatch(self, job_id: int) -> None:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="assessment")
+            self._executor.submit(self._run, job_id)
+
+    def _run(self, job_id: int) -> None:
+        db = self.session_factory()
+        try:
+            # Claim the job atomically, so a job queued by several workers runs only once
+            claimed = db.execute(
+                update(models.AssessmentJob)
+                .where(models.AssessmentJob.id == job_id, models.AssessmentJob.status == PENDING)
+                .values(status=RUNNING, stage="starting", progress=0.0, updated_at=datetime.utcnow())
+            ).rowcount
+            db.commit()
+            if not claimed:
+                return
+            job = db.query(models.AssessmentJob).filter(models.AssessmentJob.id == job_id).one()
+
+            def progress(stage: str, fraction: float) -> None:
+                job.stage, job.progress = stage, fraction
+                db.commit()
+
+            try:
+                result = self.runner(db, job, progress)
+            except Exception as e:
+                logger.exception("Assessment job %s failed", job_id)
+                db.rollback()
+                job.status, job.error = FAILED, str(e) or type(e).__name__
+            else:
+                job.status, job.stage, job.progress = DONE, "done", 1.0
+                job.level, job.explanation = result["level"], result["explanation"]
+            db.commit()
+        finally:
+            db.close()
+
+def to_schema(job: models.AssessmentJob) -> schemas.AssessmentJob:
+    return schemas.AssessmentJob(
+        id=job.id,
+        status=job.status,
+        method=job.method,
+        dataset_ids=[int(dataset_id) for dataset_id in job.dataset_ids.split(",") if dataset_id],
+        stage=job.stage,
+        progress=job.progress,
+        result=schemas.ImpactResult(level=job.level, explanation=job.explanation) if job.status == DONE else None,
+        error=job.error,
+        created_at=job.created_at,
+        updated_at=job.updated_at
+    )
@@ -1,32 +1,89 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from backend import models, schemas, security, huggingface
-from backend.database import SessionLocal, engine
-from sqlalchemy.sql import func
+from fastapi import FastAPI, Depends, HTTPException, status, Query, Response
+from sqlalchemy.orm import Session, lazyload
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from backend import models, schemas, security, huggingface, pagination, jobs, metrics, profiling, migrations, admission, snapshot
+from backend.database import SessionLocal, engine, insert_ignoring_conflicts
+from backend.LRU import LRUCache
+from backend.impact_cache import ImpactCache, cache_key
+from backend.catalog import Catalog
+from backend.followbuffer import FollowBuffer
+from backend.changefeed import ChangeFeed
+from sqlalchemy.sql import func, select
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 import os
 from pydantic import EmailStr
 from jose import jwt, JWTError
 from datetime import datetime
+import asyncio
 
-# Create tables
-models.Base.metadata.create_all(bind=engine)
+# Bring the schema up to date; with AUTO_MIGRATE=0 run `python -m backend.migrations upgrade` instead
+if os.environ.get("AUTO_MIGRATE", "1") != "0":
+    migrations.upgrade(engine)
+
+# Warm an empty catalog from a snapshot written by `python -m backend.snapshot export`
+if os.environ.get("CATALOG_SNAPSHOT"):
+    snapshot.load_if_empty(os.environ["CATALOG_SNAPSHOT"], engine)
+
+# Time every SQL statement for /metrics
+metrics.instrument_engine(engine)
 
 # Initialize HuggingFace client
 hf_client = huggingface.HuggingFaceClient(
-    api_token=os.environ.get("HUGGINGFACE_API_TOKEN")
+    api_token=os.environ.get("HUGGINGFACE_API_TOKEN"),
+    base_url=os.environ.get("HUGGINGFACE_API_URL", "https://huggingface.co/api")
+)
+
+# Upstream fan-out limits for batch lookups
+BATCH_CONCURRENCY = int(os.environ.get("HF_BATCH_CONCURRENCY", "8"))
+BATCH_ITEM_TIMEOUT = float(os.environ.get("HF_BATCH_ITEM_TIMEOUT", "10"))
+
+# Per-user dashboard cache. Entries are dropped when the user follows, unfollows,
+# creates or deletes something; the TTL bounds how stale other users' follower counts get.
+dashboard_cache = LRUCache(
+    maxsize=int(os.environ.get("DASHBOARD_CACHE_SIZE", "1024")),
+    ttl=float(os.environ.get("DASHBOARD_CACHE_TTL", "30"))
 )
 
+# Memoized impact assessments, invalidated when a member dataset's description or size changes
+impact_cache = ImpactCache(maxsize=int(os.environ.get("IMPACT_CACHE_SIZE", "4096")))
+impact_cache.install()
+
+# In-memory columnar copy of the local catalog, for sorted and filtered /datasets listings
+catalog = Catalog()
+
+# Follows and unfollows are buffered and written in group commits; see followbuffer.py for the durability trade-off
+follow_buffer = FollowBuffer(SessionLocal)
+
+metrics.REGISTRY.register_collector(metrics.cache_collector({
+    "dashboard": dashboard_cache,
+    "impact_assessment": impact_cache,
+}))
+
+# Impact assessment methods by name
+ASSESSORS = {
+    "naive": huggingface.ImpactAssessor.naive_assessment,
+    "advanced": huggingface.ImpactAssessor.advanced_assessment,
+}
+
+# How often job event streams check for progress
+JOB_EVENT_INTERVAL = float(os.environ.get("ASSESSMENT_JOB_EVENT_INTERVAL", "0.5"))
+
 app = FastAPI(title="HuggingFace Dataset Explorer")
 
+# Innermost, so shed requests still get CORS headers and show up in the request metrics
+app.add_middleware(admission.AdmissionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-DB-Query-Count", "X-DB-Time-Ms", "X-Profile-Id", "Retry-After"],
 )
+app.add_middleware(profiling.ProfilingMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
 
 # Dependency to get DB session
 def get_db():
@@ -36,6 +93,192 @@ def get_db():
     finally:
         db.close()
 
+# Dataset helpers
+def _dataset_values(dataset_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Column values for a local dataset row built from a HuggingFace API payload"""
+    return {
+        "hf_id": dataset_data["id"],
+        "name": dataset_data.get("name", dataset_data["id"]),
+        "description": dataset_data.get("description", ""),
+        "last_modified": datetime.utcnow(),
+        "size_bytes": dataset_data.get("size_bytes")
+    }
+
+def _new_dataset(dataset_data: Dict[str, Any]) -> models.Dataset:
+    """Build a local dataset row from a HuggingFace API payload"""
+    return models.Dataset(**_dataset_values(dataset_data))
+
+def _store_datasets(
+    db: Session, datasets_data: List[Dict[str, Any]]
+) -> Tuple[Dict[str, models.Dataset], List[models.Dataset]]:
+    """
+    Local rows for several upstream payloads, keyed by their upstream id, which can differ
+    from the id a caller asked for. Payloads are deduplicated by that id, known ones map to
+    the stored row, and the rest are inserted with one batched INSERT ... RETURNING that
+    skips ids a concurrent request stored first. Returns (rows by hf_id, created rows);
+    created rows are detached copies, good for building responses.
+    """
+    rows = {dataset_data["id"]: _dataset_values(dataset_data) for dataset_data in datasets_data}
+    if not rows:
+        return {}, []
+    stored = {
+        dataset.hf_id: dataset
+        for dataset in db.query(models.Dataset)
+            .options(lazyload("*"))
+            .filter(models.Dataset.hf_id.in_(list(rows)))
+    }
+    new = [row for hf_id, row in rows.items() if hf_id not in stored]
+    if not new:
+        return stored, []
+
+    table = models.Dataset.__table__
+    insert_datasets = insert_ignoring_conflicts(db.get_bind().dialect.name, table, list(new[0]), ["hf_id"])
+    ids = dict(db.execute(insert_datasets.returning(table.c.hf_id, table.c.id), new).all())
+    created = [models.Dataset(id=ids[row["hf_id"]], **row) for row in new if row["hf_id"] in ids]
+    stored.update((dataset.hf_id, dataset) for dataset in created)
+    raced = [row["hf_id"] for row in new if row["hf_id"] not in ids]
+    if raced:
+        stored.update(
+            (dataset.hf_id, dataset)
+            for dataset in db.query(models.Dataset).options(lazyload("*")).filter(models.Dataset.hf_id.in_(raced))
+        )
+    return stored, created
+
+def _refresh_dataset(dataset: models.Dataset, dataset_data: Dict[str, Any]) -> bool:
+    """Copy changed upstream metadata onto a local row, returns True if anything changed"""
+    changed = False
+    for field in ("description", "size_bytes"):
+        if field in dataset_data and getattr(dataset, field) != dataset_data[field]:
+            setattr(dataset, field, dataset_data[field])
+            changed = True
+    if changed:
+        dataset.last_modified = datetime.utcnow()
+    return changed
+
+def _store_history(
+    db: Session, dataset_id: int, history_data: List[Dict[str, Any]]
+) -> Tuple[List[models.DatasetHistory], List[models.DatasetHistory]]:
+    """
+    Match upstream commits against stored history in one query and add the new ones.
+    Returns (all commits in upstream order, newly added commits); the caller commits.
+    """
+    commit_ids = [commit["id"] for commit in history_data]
+    known = {
+        history_item.commit_id: history_item
+        for history_item in db.query(models.DatasetHistory)
+            .options(lazyload("*"))
+            .filter(
+                models.DatasetHistory.dataset_id == dataset_id,
+                models.DatasetHistory.commit_id.in_(commit_ids)
+            )
+    } if commit_ids else {}
+    new_commits = {
+        commit["id"]: {
+            "dataset_id": dataset_id,
+            "commit_id": commit["id"],
+            "commit_message": commit.get("title", ""),
+            "timestamp": datetime.fromisoformat(commit["date"].replace('Z', '+00:00'))
+        }
+        for commit in history_data if commit["id"] not in known
+    }
+    created = []
+    if new_commits:
+        table = models.DatasetHistory.__table__
+        # A concurrent refresh of the same dataset may store some of these first
+        insert_history = insert_ignoring_conflicts(
+            db.get_bind().dialect.name, table, ["dataset_id", "commit_id", "commit_message", "timestamp"],
+            ["dataset_id", "commit_id"]
+        )
+        ids = dict(db.execute(
+            insert_history.returning(table.c.commit_id, table.c.id),
+            list(new_commits.values())
+        ).all())
+        created = [models.DatasetHistory(id=ids[commit_id], **row) for commit_id, row in new_commits.items() if commit_id in ids]
+        known.update((history_item.commit_id, history_item) for history_item in created)
+        raced = [commit_id for commit_id in new_commits if commit_id not in ids]
+        if raced:
+            known.update(
+                (history_item.commit_id, history_item)
+                for history_item in db.query(models.DatasetHistory)
+                    .options(lazyload("*"))
+                    .filter(models.DatasetHistory.dataset_id == dataset_id, models.DatasetHistory.commit_id.in_(raced))
+            )
+    return [known[commit_id] for commit_id in dict.fromkeys(commit_ids)], created
+
+def _assessment_input(dataset: models.Dataset) -> Dict[str, Any]:
+    """Convert a dataset row to the dict the impact assessor expects"""
+    return {
+        "id": dataset.id,
+        "description": dataset.description,
+        "size_bytes": dataset.size_bytes or 0,  # Default to 0 if size not available
+        "last_modified": dataset.last_modified
+    }
+
+def _follower_counts(db: Session, dataset_ids: Iterable[int]) -> Dict[int, int]:
+    """Get follower counts for several datasets in a single grouped query"""
+    dataset_ids = list(dataset_ids)
+    if not dataset_ids:
+        return {}
+    rows = db.query(models.dataset_followers.c.dataset_id, func.count(models.dataset_followers.c.user_id))\
+        .filter(models.dataset_followers.c.dataset_id.in_(dataset_ids))\
+        .group_by(models.dataset_followers.c.dataset_id)\
+        .all()
+    return {dataset_id: count for dataset_id, count in rows}
+
+def _load_datasets(db: Session, dataset_ids: Iterable[int]) -> List[models.Dataset]:
+    """
+    Load datasets by id with a single IN query, preserving the requested order.
+    Raises a 404 listing every id that doesn't exist.
+    """
+    dataset_ids = list(dict.fromkeys(dataset_ids))
+    found = {
+        dataset.id: dataset
+        for dataset in db.query(models.Dataset)
+            .options(lazyload("*"))
+            .filter(models.Dataset.id.in_(dataset_ids))
+    } if dataset_ids else {}
+    missing = [dataset_id for dataset_id in dataset_ids if dataset_id not in found]
+    if len(missing) == 1:
+        raise HTTPException(status_code=404, detail=f"Dataset with ID {missing[0]} not found")
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Datasets with IDs {', '.join(map(str, missing))} not found")
+    return [found[dataset_id] for dataset_id in dataset_ids]
+
+def _combined_members(db: Session, combined_ids: List[int]) -> Dict[int, List[schemas.Dataset]]:
+    """Load the member datasets of several combined datasets in a single query"""
+    members: Dict[int, List[schemas.Dataset]] = {combined_id: [] for combined_id in combined_ids}
+    if members:
+        rows = db.query(models.dataset_combinations.c.parent_id, models.Dataset)\
+            .options(lazyload("*"))\
+            .join(models.Dataset, models.Dataset.id == models.dataset_combinations.c.dataset_id)\
+            .filter(models.dataset_combinations.c.parent_id.in_(combined_ids))\
+            .all()
+        for parent_id, dataset in rows:
+            members[parent_id].append(_dataset_response(dataset))
+    return members
+
+def _combined_response(combined: models.CombinedDataset, datasets: List[schemas.Dataset]) -> schemas.CombinedDataset:
+    return schemas.CombinedDataset(
+        id=combined.id,
+        name=combined.name,
+        description=combined.description,
+        created_at=combined.created_at,
+        created_by_id=combined.created_by_id,
+        impact_level=combined.impact_level,
+        datasets=datasets
+    )
+
+def _dataset_response(dataset: models.Dataset, follower_count: Optional[int] = None) -> schemas.Dataset:
+    return schemas.Dataset(
+        id=dataset.id,
+        hf_id=dataset.hf_id,
+        name=dataset.name,
+        description=dataset.description,
+        last_modified=dataset.last_modified,
+        size_bytes=dataset.size_bytes,
+        follower_count=follower_count
+    )
+
 # Authentication dependency
 async def get_current_user(token: str = Depends(security.oauth2_scheme), db: Session = Depends(get_db)):
     credentials_exception = HTTPException(
@@ -51,7 +294,8 @@ async def get_current_user(token: str = Depends(security.oauth2_scheme), db: Ses
     except JWTError:
         raise credentials_exception
         
-    user = db.query(models.User).filter(models.User.email == email).first()
+    # Relationships are loaded on demand; most endpoints only need the id
+    user = db.query(models.User).options(lazyload("*")).filter(models.User.email == email).first()
     if user is None:
         raise credentials_exception
     return user
@@ -69,9 +313,14 @@ async def get_optional_user(token: Optional[str] = Depends(security.optional_oau
     except:
         return None
         
-    user = db.query(models.User).filter(models.User.email == email).first()
+    user = db.query(models.User).options(lazyload("*")).filter(models.User.email == email).first()
     return user
 
+async def get_current_admin(current_user: models.User = Depends(get_current_user)):
+    if not security.is_admin(current_user.email):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
+
 # Authentication endpoints
 @app.post("/register", response_model=schemas.Token)
 def register(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
@@ -105,51 +354,194 @@ def login(user_in: schemas.UserLogin, db: Session = Depends(get_db)):
 def get_profile(current_user: models.User = Depends(get_current_user)):
     return current_user
 
+@app.get("/dashboard", response_model=schemas.Dashboard)
+def get_dashboard(
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the profile, followed datasets and combined datasets in one request"""
+    cached = dashboard_cache.get(current_user.id)
+    if cached is not None:
+        return cached
+
+    # Followed datasets with their follower counts
+    follow_buffer.flush_user(current_user.id)
+    followed = db.query(models.Dataset, models.Dataset.follower_count)\
+        .options(lazyload("*"))\
+        .join(models.dataset_followers, models.dataset_followers.c.dataset_id == models.Dataset.id)\
+        .filter(models.dataset_followers.c.user_id == current_user.id)\
+        .all()
+
+    # Combined datasets, then all of their members in one go
+    combined_datasets = db.query(models.CombinedDataset)\
+        .options(lazyload("*"))\
+        .filter(models.CombinedDataset.created_by_id == current_user.id)\
+        .order_by(models.CombinedDataset.id)\
+        .all()
+    members = _combined_members(db, [combined.id for combined in combined_datasets])
+
+    dashboard = schemas.Dashboard(
+        user=schemas.User(id=current_user.id, email=current_user.email),
+        followed_datasets=[_dataset_response(dataset, count) for dataset, count in followed],
+        combined_datasets=[_combined_response(combined, members[combined.id]) for combined in combined_datasets]
+    )
+    dashboard_cache.set(current_user.id, dashboard)
+    return dashboard
+
+def _followed_ids(db: Session, user_id: int) -> Set[int]:
+    """Ids of the datasets a user follows, with their buffered follows written out first"""
+    follow_buffer.flush_user(user_id)
+    return catalog.followed_ids(db, user_id)
+
 # Dataset endpoints
 @app.get("/datasets", response_model=List[schemas.Dataset])
 async def list_datasets(
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    sort: Optional[str] = Query(None, description="name, size, followers or date; prefix with - for descending"),
+    min_size: Optional[int] = Query(None, ge=0),
+    max_size: Optional[int] = Query(None, ge=0),
+    followed_by_me: Optional[bool] = None,
     current_user: Optional[models.User] = Depends(get_optional_user),
     db: Session = Depends(get_db)
 ):
-    """List public datasets from HuggingFace"""
+    """
+    List public datasets from HuggingFace. With sort or any filter the local catalog is
+    browsed instead, answered from the in-memory read model.
+    """
+    if sort is not None or min_size is not None or max_size is not None or followed_by_me is not None:
+        followed = None
+        if followed_by_me is not None:
+            if current_user is None:
+                raise HTTPException(status_code=401, detail="Sign in to filter by followed datasets")
+            # Flushing buffered follows and a cold followed-set lookup both block on the database
+            followed = await run_in_threadpool(_followed_ids, db, current_user.id)
+        if catalog.refresh_due():
+            # Loading or polling scans every follower row; keep that off the event loop
+            await run_in_threadpool(catalog.sync, db)
+        else:
+            catalog.sync(db)
+        rows = catalog.query(
+            sort or "name", min_size, max_size, followed,
+            exclude_followed=followed_by_me is False, offset=offset, limit=limit
+        )
+        return [schemas.Dataset(**row) for row in rows]
+
     # Always fetch 20 from HuggingFace
     datasets = await hf_client.get_datasets(limit=20, offset=0)
-    result = []
-    for dataset_data in datasets:
-        # Check if we have this dataset in our DB
-        dataset = db.query(models.Dataset).filter(models.Dataset.hf_id == dataset_data["id"]).first()
-        # If not, create a stub entry
-        if not dataset:
-            dataset = models.Dataset(
-                hf_id=dataset_data["id"],
-                name=dataset_data.get("name", dataset_data["id"]),
-                description=dataset_data.get("description", ""),
-                last_modified=datetime.utcnow(),
-                size_bytes=dataset_data.get("size_bytes")
-            )
-            db.add(dataset)
-            db.commit()
-            db.refresh(dataset)
-        # Get follower count
-        follower_count = db.query(func.count(models.dataset_followers.c.user_id))\
-            .filter(models.dataset_followers.c.dataset_id == dataset.id)\
-            .scalar()
-        # Create response object
-        dataset_response = schemas.Dataset(
-            id=dataset.id,
-            hf_id=dataset.hf_id,
-            name=dataset.name,
-            description=dataset.description,
-            last_modified=dataset.last_modified,
-            size_bytes=dataset.size_bytes,
-            follower_count=follower_count
-        )
-        result.append(dataset_response)
+    
+    # Look up the ones we already have in one query, and create stub entries for the rest
+    hf_ids = [dataset_data["id"] for dataset_data in datasets]
+    found, created = _store_datasets(db, datasets)
+    
+    follower_counts = _follower_counts(db, [dataset.id for dataset in found.values()])
+    result = [
+        _dataset_response(found[hf_id], follower_counts.get(found[hf_id].id, 0))
+        for hf_id in hf_ids
+    ]
+    if created:
+        db.commit()
+        catalog.mark_dirty(dataset.id for dataset in created)
     # Slice according to requested limit and offset
     return result[offset:offset+limit]
 
+@app.post("/datasets/batch", response_model=List[schemas.DatasetBatchItem])
+async def get_datasets_batch(
+    batch: schemas.DatasetBatchRequest,
+    current_user: Optional[models.User] = Depends(get_optional_user),
+    db: Session = Depends(get_db)
+):
+    """Get several datasets at once, fetching unknown ones from HuggingFace concurrently"""
+    hf_ids = list(dict.fromkeys(batch.hf_ids))
+
+    # Resolve everything we already know in one query
+    found = {
+        dataset.hf_id: dataset
+        for dataset in db.query(models.Dataset)
+            .options(lazyload("*"))
+            .filter(models.Dataset.hf_id.in_(hf_ids))
+    }
+    missing = [hf_id for hf_id in hf_ids if hf_id not in found]
+
+    # Fetch the rest concurrently, bounded so a large batch can't flood the upstream API
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def fetch(hf_id: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await asyncio.wait_for(hf_client.get_dataset_info(hf_id), BATCH_ITEM_TIMEOUT)
+
+    fetched = await asyncio.gather(*(fetch(hf_id) for hf_id in missing), return_exceptions=True)
+
+    errors = {}
+    fetched_ok = {}
+    for hf_id, dataset_data in zip(missing, fetched):
+        if isinstance(dataset_data, asyncio.TimeoutError):
+            errors[hf_id] = f"Timed out after {BATCH_ITEM_TIMEOUT:g}s"
+        elif isinstance(dataset_data, huggingface.HuggingFaceError) and dataset_data.status_code == 404:
+            errors[hf_id] = f"Dataset not found: {str(dataset_data)}"
+        elif isinstance(dataset_data, Exception):
+            errors[hf_id] = f"Upstream error: {str(dataset_data)}"
+        else:
+            fetched_ok[hf_id] = dataset_data
+    # Upstream may resolve a requested id to another (canonical) one, possibly one we already
+    # have or one requested under a different name, so rows are matched by the upstream id
+    stored, created = _store_datasets(db, list(fetched_ok.values()))
+    found.update((hf_id, stored[dataset_data["id"]]) for hf_id, dataset_data in fetched_ok.items())
+
+    # Build the response before committing so the rows aren't reloaded one by one
+    follower_counts = _follower_counts(db, [dataset.id for dataset in found.values()])
+    result = []
+    for hf_id in hf_ids:
+        if hf_id in errors:
+            result.append(schemas.DatasetBatchItem(hf_id=hf_id, error=errors[hf_id]))
+        else:
+            dataset = found[hf_id]
+            result.append(schemas.DatasetBatchItem(
+                hf_id=hf_id,
+                dataset=_dataset_response(dataset, follower_counts.get(dataset.id, 0))
+            ))
+    if created:
+        db.commit()
+        catalog.mark_dirty(dataset.id for dataset in created)
+    return result
+
+# The history route has to be registered before the catch-all dataset route,
+# otherwise {hf_id:path} swallows the /history suffix
+@app.get("/datasets/{hf_id:path}/history", response_model=List[schemas.DatasetHistory])
+async def get_dataset_history(
+    hf_id: str,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get commit history for a dataset"""
+    # Verify dataset exists
+    dataset = db.query(models.Dataset).options(lazyload("*")).filter(models.Dataset.hf_id == hf_id).first()
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    # Fetch history from HuggingFace API
+    try:
+        history_data = await hf_client.get_dataset_history(hf_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to fetch history: {str(e)}")
+    
+    history, created = _store_history(db, dataset.id, history_data)
+    # Announce them here; the change feed poller will find them already stored
+    events = _change_events(dataset, False, history, created)
+    
+    # Convert to our schema
+    result = [schemas.DatasetHistory(
+        id=history_item.id,
+        dataset_id=history_item.dataset_id,
+        commit_id=history_item.commit_id,
+        commit_message=history_item.commit_message,
+        timestamp=history_item.timestamp
+    ) for history_item in history]
+    if created:
+        db.commit()
+        _publish_changes(dataset.id, events)
+    return result
+
 @app.get("/datasets/{hf_id:path}", response_model=schemas.Dataset)
 async def get_dataset(
     hf_id: str, 
@@ -164,20 +556,21 @@ async def get_dataset(
         raise HTTPException(status_code=404, detail=f"Dataset not found: {str(e)}")
     
     # Check if we have this dataset in our DB
-    dataset = db.query(models.Dataset).filter(models.Dataset.hf_id == hf_id).first()
+    dataset = db.query(models.Dataset).options(lazyload("*")).filter(models.Dataset.hf_id == hf_id).first()
     
-    # If not, create it
+    # If not, create it; otherwise pick up upstream metadata changes
     if not dataset:
-        dataset = models.Dataset(
-            hf_id=dataset_data["id"],
-            name=dataset_data.get("name", dataset_data["id"]),
-            description=dataset_data.get("description", ""),
-            last_modified=datetime.utcnow(),
-            size_bytes=dataset_data.get("size_bytes")
-        )
+        dataset = _new_dataset(dataset_data)
         db.add(dataset)
         db.commit()
         db.refresh(dataset)
+        catalog.mark_dirty([dataset.id])
+    elif _refresh_dataset(dataset, dataset_data):
+        dataset_id = dataset.id
+        events = _change_events(dataset, True, [], [])
+        db.commit()
+        catalog.mark_dirty([dataset_id])
+        _publish_changes(dataset_id, events)
     
     # Get follower count
     follower_count = db.query(func.count(models.dataset_followers.c.user_id))\
@@ -192,59 +585,18 @@ async def get_dataset(
         description=dataset.description,
         last_modified=dataset.last_modified,
         size_bytes=dataset.size_bytes,
-        follower_count=follower_count
+        follower_count=follower_count,
+        is_following=follow_buffer.is_following(db, current_user.id, dataset.id) if current_user else None
     )
 
-@app.get("/datasets/{hf_id:path}/history", response_model=List[schemas.DatasetHistory])
-async def get_dataset_history(
-    hf_id: str,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Get commit history for a dataset"""
-    # Verify dataset exists
-    dataset = db.query(models.Dataset).filter(models.Dataset.hf_id == hf_id).first()
-    if not dataset:
-        raise HTTPException(status_code=404, detail="Dataset not found")
-    
-    # Fetch history from HuggingFace API
+async def _wait_for_follow_commit(seq: int) -> None:
+    """In FOLLOW_WRITE_MODE=sync, hold the response until the change is committed"""
+    if not follow_buffer.sync:
+        return
     try:
-        history_data = await hf_client.get_dataset_history(hf_id)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to fetch history: {str(e)}")
-    
-    # Convert to our schema
-    result = []
-    for commit in history_data:
-        # Check if we already have this commit
-        history_item = db.query(models.DatasetHistory)\
-            .filter(
-                models.DatasetHistory.dataset_id == dataset.id,
-                models.DatasetHistory.commit_id == commit["id"]
-            ).first()
-        
-        # If not, create it
-        if not history_item:
-            history_item = models.DatasetHistory(
-                dataset_id=dataset.id,
-                commit_id=commit["id"],
-                commit_message=commit.get("title", ""),
-                timestamp=datetime.fromisoformat(commit["date"].replace('Z', '+00:00'))
-            )
-            db.add(history_item)
-            db.commit()
-            db.refresh(history_item)
-        
-        # Add to result
-        result.append(schemas.DatasetHistory(
-            id=history_item.id,
-            dataset_id=history_item.dataset_id,
-            commit_id=history_item.commit_id,
-            commit_message=history_item.commit_message,
-            timestamp=history_item.timestamp
-        ))
-    
-    return result
+        await run_in_threadpool(follow_buffer.wait, seq)
+    except TimeoutError:
+        raise HTTPException(status_code=503, detail="Follow change not yet committed, please retry")
 
 @app.post("/datasets/{hf_id:path}/follow", response_model=schemas.Dataset)
 async def follow_dataset(
@@ -255,47 +607,28 @@ async def follow_dataset(
     """Follow a dataset"""
     try:
         # Get dataset
-        dataset = db.query(models.Dataset).filter(models.Dataset.hf_id == hf_id).first()
+        dataset = db.query(models.Dataset).options(lazyload("*")).filter(models.Dataset.hf_id == hf_id).first()
         if not dataset:
             # Fetch from API and create
             try:
                 dataset_data = await hf_client.get_dataset_info(hf_id)
-                dataset = models.Dataset(
-                    hf_id=dataset_data["id"],
-                    name=dataset_data.get("name", dataset_data["id"]),
-                    description=dataset_data.get("description", ""),
-                    last_modified=datetime.utcnow(),
-                    size_bytes=dataset_data.get("size_bytes")
-                )
+                dataset = _new_dataset(dataset_data)
                 db.add(dataset)
                 db.commit()
                 db.refresh(dataset)
+                catalog.mark_dirty([dataset.id])
             except Exception as e:
                 raise HTTPException(status_code=404, detail=f"Dataset not found: {str(e)}")
         
-        # Use a direct SQL query to check if the relationship already exists
-        existing_relation = db.execute(
-            models.dataset_followers.select().where(
-                models.dataset_followers.c.user_id == current_user.id,
-                models.dataset_followers.c.dataset_id == dataset.id
-            )
-        ).first()
+        # Buffer the relationship; it is written with the next group commit
+        changed, seq = follow_buffer.follow(db, current_user.id, dataset.id)
+        if changed:
+            dashboard_cache.pop(current_user.id)
+            catalog.follow(current_user.id, dataset.id)
+        await _wait_for_follow_commit(seq)
         
-        # If not already following, add the relationship
-        if not existing_relation:
-            # Add to followed datasets using the association table directly
-            db.execute(
-                models.dataset_followers.insert().values(
-                    user_id=current_user.id,
-                    dataset_id=dataset.id
-                )
-            )
-            db.commit()
-        
-        # Get updated follower count
-        follower_count = db.query(func.count(models.dataset_followers.c.user_id))\
-            .filter(models.dataset_followers.c.dataset_id == dataset.id)\
-            .scalar()
+        # Follower count including changes that are still buffered
+        follower_count = follow_buffer.follower_count(dataset.id)
         
         # Return dataset info
         return schemas.Dataset(
@@ -305,8 +638,11 @@ async def follow_dataset(
             description=dataset.description,
             last_modified=dataset.last_modified,
             size_bytes=dataset.size_bytes,
-            follower_count=follower_count
+            follower_count=follower_count,
+            is_following=True
         )
+    except HTTPException:
+        raise
     except Exception as e:
         # Log the error for debugging
         import logging
@@ -322,23 +658,19 @@ async def unfollow_dataset(
 ):
     """Unfollow a dataset"""
     # Get dataset
-    dataset = db.query(models.Dataset).filter(models.Dataset.hf_id == hf_id).first()
+    dataset = db.query(models.Dataset).options(lazyload("*")).filter(models.Dataset.hf_id == hf_id).first()
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
     
-    # Check if following and remove the relationship using the association table
-    db.execute(
-        models.dataset_followers.delete().where(
-            models.dataset_followers.c.user_id == current_user.id,
-            models.dataset_followers.c.dataset_id == dataset.id
-        )
-    )
-    db.commit()
+    # Buffer the removal; it is written with the next group commit
+    changed, seq = follow_buffer.unfollow(db, current_user.id, dataset.id)
+    if changed:
+        dashboard_cache.pop(current_user.id)
+        catalog.unfollow(current_user.id, dataset.id)
+    await _wait_for_follow_commit(seq)
     
-    # Get updated follower count
-    follower_count = db.query(func.count(models.dataset_followers.c.user_id))\
-        .filter(models.dataset_followers.c.dataset_id == dataset.id)\
-        .scalar()
+    # Follower count including changes that are still buffered
+    follower_count = follow_buffer.follower_count(dataset.id)
     
     # Return dataset info
     return schemas.Dataset(
@@ -348,34 +680,49 @@ async def unfollow_dataset(
         description=dataset.description,
         last_modified=dataset.last_modified,
         size_bytes=dataset.size_bytes,
-        follower_count=follower_count
+        follower_count=follower_count,
+        is_following=False
     )
 
 @app.get("/user/followed-datasets", response_model=List[schemas.Dataset])
-async def get_followed_datasets(
+def get_followed_datasets(
+    response: Response,
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: str = "name",
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get datasets followed by the current user"""
-    result = []
-    for dataset in current_user.followed_datasets:
-        # Get follower count
-        follower_count = db.query(func.count(models.dataset_followers.c.user_id))\
-            .filter(models.dataset_followers.c.dataset_id == dataset.id)\
-            .scalar()
-        
-        # Add to result
-        result.append(schemas.Dataset(
-            id=dataset.id,
-            hf_id=dataset.hf_id,
-            name=dataset.name,
-            description=dataset.description,
-            last_modified=dataset.last_modified,
-            size_bytes=dataset.size_bytes,
-            follower_count=follower_count
-        ))
-    
-    return result
+    """
+    Get datasets followed by the current user, one page at a time.
+    Sort by name, followers, size or date (prefix with - for descending); pass the
+    X-Next-Cursor response header back as `cursor` to get the next page.
+    """
+    follow_buffer.flush_user(current_user.id)
+    # Name, size and date are copied onto the follower rows, so a page is a range scan of one
+    # (user_id, key, dataset_id) index. Follower counts change with other users' follows and
+    # aren't copied; that order sorts the user's follows by the maintained count instead
+    followers = models.dataset_followers.c
+    sort_expr, descending = pagination.parse_sort(sort, {
+        "name": followers.dataset_name,
+        "followers": models.Dataset.follower_count,
+        "size": followers.dataset_size,
+        "date": followers.dataset_modified,
+    })
+    query = db.query(models.Dataset, models.Dataset.follower_count, sort_expr)\
+        .options(lazyload("*"))\
+        .join(models.dataset_followers, followers.dataset_id == models.Dataset.id)\
+        .filter(followers.user_id == current_user.id)
+    rows = pagination.keyset_query(
+        query, sort_expr, followers.dataset_id, descending,
+        pagination.decode_cursor(cursor, sort) if cursor else None, limit
+    ).all()
+
+    page, has_more = pagination.split_page(rows, limit)
+    if has_more:
+        last_dataset, _, last_value = page[-1]
+        response.headers["X-Next-Cursor"] = pagination.encode_cursor(sort, last_value, last_dataset.id)
+    return [_dataset_response(dataset, count) for dataset, count, _ in page]
 
 # Combined datasets endpoints
 @app.post("/combined-datasets", response_model=schemas.CombinedDataset)
@@ -385,83 +732,73 @@ async def create_combined_dataset(
     db: Session = Depends(get_db)
 ):
     """Create a combined dataset"""
-    # Verify all datasets exist
-    datasets = []
-    for dataset_id in dataset_in.dataset_ids:
-        dataset = db.query(models.Dataset).filter(models.Dataset.id == dataset_id).first()
-        if not dataset:
-            raise HTTPException(status_code=404, detail=f"Dataset with ID {dataset_id} not found")
-        datasets.append(dataset)
+    datasets = _load_datasets(db, dataset_in.dataset_ids)
+    
+    # Reuse a cached advanced assessment if one exists, otherwise fall back to the naive method
+    assessment_input = [_assessment_input(ds) for ds in datasets]
+    impact_result = impact_cache.peek(db, "advanced", assessment_input)\
+        or huggingface.ImpactAssessor.naive_assessment(assessment_input)
     
-    # Create combined dataset
+    # Create combined dataset and link its members in bulk
     combined = models.CombinedDataset(
         name=dataset_in.name,
         description=dataset_in.description,
-        created_by_id=current_user.id
+        created_by_id=current_user.id,
+        impact_level=impact_result["level"]
     )
-    combined.datasets = datasets
     db.add(combined)
-    db.commit()
-    db.refresh(combined)
-    
-    # Assess impact using the naive method by default
-    impact_result = huggingface.ImpactAssessor.naive_assessment([{
-        "id": ds.id,
-        "size_bytes": ds.size_bytes or 0  # Default to 0 if size not available
-    } for ds in datasets])
+    db.flush()
+    if datasets:
+        db.execute(
+            models.dataset_combinations.insert(),
+            [{"parent_id": combined.id, "dataset_id": ds.id} for ds in datasets]
+        )
     
-    # Update impact level
-    combined.impact_level = impact_result["level"]
+    # Build the response before committing so nothing has to be reloaded
+    result = _combined_response(combined, [_dataset_response(ds) for ds in datasets])
     db.commit()
-    
-    # Return combined dataset
-    return schemas.CombinedDataset(
-        id=combined.id,
-        name=combined.name,
-        description=combined.description,
-        created_at=combined.created_at,
-        created_by_id=combined.created_by_id,
-        impact_level=combined.impact_level,
-        datasets=[schemas.Dataset(
-            id=ds.id,
-            hf_id=ds.hf_id,
-            name=ds.name,
-            description=ds.description,
-            last_modified=ds.last_modified,
-            size_bytes=ds.size_bytes
-        ) for ds in combined.datasets]
-    )
+    dashboard_cache.pop(current_user.id)
+    return result
 
 @app.get("/combined-datasets", response_model=List[schemas.CombinedDataset])
 async def list_combined_datasets(
+    response: Response,
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: str = "date",
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """List combined datasets created by the current user"""
-    combined_datasets = db.query(models.CombinedDataset)\
-        .filter(models.CombinedDataset.created_by_id == current_user.id)\
-        .all()
-    
-    result = []
-    for combined in combined_datasets:
-        result.append(schemas.CombinedDataset(
-            id=combined.id,
-            name=combined.name,
-            description=combined.description,
-            created_at=combined.created_at,
-            created_by_id=combined.created_by_id,
-            impact_level=combined.impact_level,
-            datasets=[schemas.Dataset(
-                id=ds.id,
-                hf_id=ds.hf_id,
-                name=ds.name,
-                description=ds.description,
-                last_modified=ds.last_modified,
-                size_bytes=ds.size_bytes
-            ) for ds in combined.datasets]
-        ))
-    
-    return result
+    """
+    List combined datasets created by the current user, one page at a time.
+    Sort by name, size (total of the members) or date (prefix with - for descending).
+    """
+    total_size = select(func.coalesce(func.sum(models.Dataset.size_bytes), 0))\
+        .select_from(models.dataset_combinations.join(
+            models.Dataset, models.Dataset.id == models.dataset_combinations.c.dataset_id
+        ))\
+        .where(models.dataset_combinations.c.parent_id == models.CombinedDataset.id)\
+        .correlate(models.CombinedDataset)\
+        .scalar_subquery()
+    sort_expr, descending = pagination.parse_sort(sort, {
+        "name": models.CombinedDataset.name,
+        "size": total_size,
+        "date": models.CombinedDataset.created_at,
+    })
+    query = db.query(models.CombinedDataset, sort_expr)\
+        .options(lazyload("*"))\
+        .filter(models.CombinedDataset.created_by_id == current_user.id)
+    rows = pagination.keyset_query(
+        query, sort_expr, models.CombinedDataset.id, descending,
+        pagination.decode_cursor(cursor, sort) if cursor else None, limit
+    ).all()
+
+    page, has_more = pagination.split_page(rows, limit)
+    if has_more:
+        last_combined, last_value = page[-1]
+        response.headers["X-Next-Cursor"] = pagination.encode_cursor(sort, last_value, last_combined.id)
+    members = _combined_members(db, [combined.id for combined, _ in page])
+    return [_combined_response(combined, members[combined.id]) for combined, _ in page]
 
 @app.get("/combined-datasets/{combined_id}", response_model=schemas.CombinedDataset)
 async def get_combined_dataset(
@@ -471,6 +808,7 @@ async def get_combined_dataset(
 ):
     """Get a combined dataset by ID"""
     combined = db.query(models.CombinedDataset)\
+        .options(lazyload("*"))\
         .filter(models.CombinedDataset.id == combined_id)\
         .first()
     
@@ -481,22 +819,7 @@ async def get_combined_dataset(
     if combined.created_by_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to view this combined dataset")
     
-    return schemas.CombinedDataset(
-        id=combined.id,
-        name=combined.name,
-        description=combined.description,
-        created_at=combined.created_at,
-        created_by_id=combined.created_by_id,
-        impact_level=combined.impact_level,
-        datasets=[schemas.Dataset(
-            id=ds.id,
-            hf_id=ds.hf_id,
-            name=ds.name,
-            description=ds.description,
-            last_modified=ds.last_modified,
-            size_bytes=ds.size_bytes
-        ) for ds in combined.datasets]
-    )
+    return _combined_response(combined, _combined_members(db, [combined.id])[combined.id])
 
 @app.delete("/combined-datasets/{combined_id}", status_code=204)
 def delete_combined_dataset(
@@ -512,44 +835,232 @@ def delete_combined_dataset(
         raise HTTPException(status_code=403, detail="Not authorized to delete this combined dataset")
     db.delete(combined)
     db.commit()
+    dashboard_cache.pop(current_user.id)
     return
 
 # Impact assessment endpoints
+# A plain def so the models run in the threadpool instead of blocking the event loop
 @app.post("/impact-assessment", response_model=schemas.ImpactResult)
-async def assess_impact(
+def assess_impact(
     assessment: schemas.ImpactAssessment,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Assess the impact of combining datasets"""
-    # Verify all datasets exist
-    datasets = []
-    for dataset_id in assessment.dataset_ids:
-        dataset = db.query(models.Dataset).filter(models.Dataset.id == dataset_id).first()
-        if not dataset:
-            raise HTTPException(status_code=404, detail=f"Dataset with ID {dataset_id} not found")
-        
-        # Convert to dict for impact assessor
-        datasets.append({
-            "id": dataset.id,
-            "size_bytes": dataset.size_bytes or 0,  # Default to 0 if size not available
-            "last_modified": dataset.last_modified
-        })
-    
-    # Perform impact assessment
-    if assessment.method == "naive":
-        result = huggingface.ImpactAssessor.naive_assessment(datasets)
-    elif assessment.method == "advanced":
-        result = huggingface.ImpactAssessor.advanced_assessment(datasets)
-    else:
+    if assessment.method not in ASSESSORS:
         raise HTTPException(status_code=400, detail=f"Invalid assessment method: {assessment.method}")
     
+    datasets = [_assessment_input(dataset) for dataset in _load_datasets(db, assessment.dataset_ids)]
+    
+    # Perform impact assessment, reusing a previous result for the same dataset versions
+    result = impact_cache.assess(db, assessment.method, datasets, ASSESSORS[assessment.method])
+    
     return schemas.ImpactResult(
         level=result["level"],
         explanation=result["explanation"]
     )
 
+@app.get("/impact-assessment/cache", response_model=schemas.CacheStats)
+def impact_cache_stats(current_user: models.User = Depends(get_current_user)):
+    """Hit/miss statistics for the impact assessment cache"""
+    return schemas.CacheStats(**impact_cache.stats())
+
+# Background impact assessment jobs
+def _run_assessment_job(db: Session, job: models.AssessmentJob, progress) -> Dict[str, Any]:
+    dataset_ids = [int(dataset_id) for dataset_id in job.dataset_ids.split(",") if dataset_id]
+    datasets = [_assessment_input(dataset) for dataset in _load_datasets(db, dataset_ids)]
+    if job.method == "advanced":
+        assessor = lambda ds: huggingface.ImpactAssessor.advanced_assessment(ds, progress=progress)
+    else:
+        assessor = ASSESSORS[job.method]
+    return impact_cache.assess(db, job.method, datasets, assessor)
+
+job_queue = jobs.JobQueue(
+    SessionLocal,
+    _run_assessment_job,
+    max_workers=int(os.environ.get("ASSESSMENT_WORKERS", "2"))
+)
+
+@app.on_event("startup")
+def resume_assessment_jobs():
+    job_queue.resume()
+
+@app.on_event("shutdown")
+def stop_assessment_jobs():
+    job_queue.shutdown(wait=False)
+
+@app.on_event("shutdown")
+def flush_follows():
+    follow_buffer.close()
+
+def _get_owned_job(db: Session, job_id: int, user: models.User) -> models.AssessmentJob:
+    job = db.query(models.AssessmentJob).filter(models.AssessmentJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Assessment job not found")
+    if job.user_id != user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to view this assessment job")
+    return job
+
+@app.post("/impact-assessment/jobs", response_model=schemas.AssessmentJob, status_code=202)
+def submit_assessment_job(
+    assessment: schemas.ImpactAssessment,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Queue an impact assessment and return immediately; identical active jobs are reused"""
+    if assessment.method not in ASSESSORS:
+        raise HTTPException(status_code=400, detail=f"Invalid assessment method: {assessment.method}")
+    
+    datasets = [_assessment_input(dataset) for dataset in _load_datasets(db, assessment.dataset_ids)]
+    job = job_queue.submit(
+        db,
+        current_user.id,
+        assessment.method,
+        [ds["id"] for ds in datasets],
+        cache_key(assessment.method, datasets)
+    )
+    return jobs.to_schema(job)
+
+@app.get("/impact-assessment/jobs/{job_id}", response_model=schemas.AssessmentJob)
+def get_assessment_job(
+    job_id: int,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Poll the status of an impact assessment job"""
+    return jobs.to_schema(_get_owned_job(db, job_id, current_user))
+
+@app.get("/impact-assessment/jobs/{job_id}/events")
+async def stream_assessment_job(
+    job_id: int,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Server-sent events for a job: "progress" whenever its stage or progress changes,
+    then a final "result" or "error" event.
+    """
+    _get_owned_job(db, job_id, current_user)
+    # The stream polls with short-lived sessions; don't hold a pooled connection for its lifetime
+    db.close()
+
+    async def events():
+        last_state = None
+        while True:
+            job = await run_in_threadpool(job_queue.snapshot, job_id)
+            if job is None:
+                return
+            state = (job.status, job.stage, job.progress)
+            if state != last_state:
+                last_state = state
+                event = {jobs.DONE: "result", jobs.FAILED: "error"}.get(job.status, "progress")
+                yield f"event: {event}\ndata: {job.model_dump_json()}\n\n"
+            if job.status not in jobs.ACTIVE_STATUSES:
+                return
+            await asyncio.sleep(JOB_EVENT_INTERVAL)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+# Change feed for followed datasets, fed by one shared upstream poller
+def _load_followed(user_ids: Set[int]) -> Dict[int, Dict[int, str]]:
+    """Datasets followed by each of the users, as {user_id: {dataset_id: hf_id}}"""
+    for user_id in user_ids:
+        follow_buffer.flush_user(user_id)
+    db = SessionLocal()
+    try:
+        followed: Dict[int, Dict[int, str]] = {}
+        rows = db.query(models.dataset_followers.c.user_id, models.Dataset.id, models.Dataset.hf_id)\
+            .join(models.Dataset, models.Dataset.id == models.dataset_followers.c.dataset_id)\
+            .filter(models.dataset_followers.c.user_id.in_(user_ids))
+        for user_id, dataset_id, hf_id in rows:
+            followed.setdefault(user_id, {})[dataset_id] = hf_id
+        return followed
+    finally:
+        db.close()
+
+def _change_events(
+    dataset: models.Dataset, metadata_changed: bool, history: List[models.DatasetHistory], created: List[models.DatasetHistory]
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """Change feed events for upstream changes just stored, by a poll or while serving a request"""
+    events = []
+    if metadata_changed:
+        events.append(("metadata", _dataset_response(dataset).model_dump(mode="json", exclude={"follower_count", "is_following"})))
+    # Without stored history everything upstream would look new, so the first fetch only records it
+    if len(history) > len(created):
+        events.extend(
+            ("commit", {"hf_id": dataset.hf_id, **schemas.DatasetHistory.model_validate(commit).model_dump(mode="json")})
+            for commit in created
+        )
+    return events
+
+def _publish_changes(dataset_id: int, events: List[Tuple[str, Dict[str, Any]]]) -> None:
+    for name, data in events:
+        change_feed.publish(dataset_id, name, data)
+
+def _apply_upstream_changes(
+    dataset_id: int, dataset_data: Dict[str, Any], history_data: List[Dict[str, Any]]
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """Store upstream metadata and commits for a dataset, returning change feed events for what was new"""
+    db = SessionLocal()
+    try:
+        dataset = db.query(models.Dataset).options(lazyload("*")).filter(models.Dataset.id == dataset_id).first()
+        if dataset is None:
+            return []
+        metadata_changed = _refresh_dataset(dataset, dataset_data)
+        history, created = _store_history(db, dataset_id, history_data)
+        events = _change_events(dataset, metadata_changed, history, created)
+        db.commit()
+        if any(name == "metadata" for name, _ in events):
+            catalog.mark_dirty([dataset_id])
+        return events
+    finally:
+        db.close()
+
+async def _check_followed_dataset(dataset_id: int, hf_id: str) -> List[Tuple[str, Dict[str, Any]]]:
+    dataset_data = await hf_client.get_dataset_info(hf_id)
+    history_data = await hf_client.get_dataset_history(hf_id)
+    return await run_in_threadpool(_apply_upstream_changes, dataset_id, dataset_data, history_data)
+
+change_feed = ChangeFeed(_load_followed, _check_followed_dataset)
+
+@app.on_event("shutdown")
+async def stop_change_feed():
+    await change_feed.close()
+
+@app.get("/user/followed-datasets/events")
+async def stream_followed_dataset_changes(
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Server-sent events for the caller's followed datasets: "commit" for each new upstream
+    commit, "metadata" when the description or size changes, and "resync" if the client
+    fell behind and should reload its followed datasets.
+    """
+    # The stream can stay open for hours; don't hold a pooled connection for it
+    db.close()
+    return StreamingResponse(
+        change_feed.stream(current_user.id), media_type="text/event-stream", headers={"Cache-Control": "no-cache"}
+    )
+
 # Health check endpoint
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "timestamp": datetime.utcnow()}
\ No newline at end of file
+    return {"status": "healthy", "timestamp": datetime.utcnow()}
+
+# Saved request profiles, see backend/profiling.py
+@app.get("/admin/profiles", response_model=List[str])
+def list_profiles(admin: models.User = Depends(get_current_admin)):
+    return profiling.list_profiles()
+
+@app.get("/admin/profiles/{name}")
+def download_profile(name: str, admin: models.User = Depends(get_current_admin)):
+    # Only names from the listing are served, so the path can't escape the profile directory
+    if name not in profiling.list_profiles():
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(os.path.join(profiling.PROFILE_DIR, name), filename=name)
+
+# Metrics endpoint, in the Prometheus text format
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
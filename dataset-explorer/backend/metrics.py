@@ -0,0 +1,336 @@
+"""
+Minimal in-process Prometheus metrics.
+
+Everything is kept in plain dicts guarded by a lock and rendered in the
+Prometheus text exposition format at /metrics, so no client library or
+external service is needed.
+"""
+import bisect
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from starlette.routing import Match
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from sub-millisecond DB statements to slow model runs
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: (bucket counts, sum, count); bucket counts are not cumulative
+        self._values: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str):
+        """Observe the wall time of the with block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(entry[0]), entry[1], entry[2])) for key, entry in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {repr(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[_Metric]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[_Metric]]) -> None:
+        """Add a callback that builds metrics from live state when /metrics is scraped"""
+        self._collectors.append(collector)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for metric in collector():
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+# HTTP
+HTTP_REQUESTS = REGISTRY.counter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+HTTP_LATENCY = REGISTRY.histogram("http_request_duration_seconds", "HTTP request latency by route", ("method", "route"))
+HTTP_IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "HTTP requests currently being handled", ("method", "route"))
+
+# Upstream HuggingFace API
+HF_REQUESTS = REGISTRY.counter("hf_api_requests_total", "HuggingFace API calls by client method and status", ("method", "status"))
+HF_LATENCY = REGISTRY.histogram("hf_api_request_duration_seconds", "HuggingFace API call latency by client method", ("method",))
+
+# Database
+DB_STATEMENTS = REGISTRY.counter("db_statements_total", "SQL statements executed")
+DB_LATENCY = REGISTRY.histogram("db_statement_duration_seconds", "SQL statement latency")
+DB_STATEMENTS_PER_REQUEST = REGISTRY.histogram(
+    "db_statements_per_request", "SQL statements executed per HTTP request", ("route",),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, 233)
+)
+DB_TIME_PER_REQUEST = REGISTRY.histogram("db_time_per_request_seconds", "Time spent in SQL per HTTP request", ("route",))
+
+# Impact assessment model
+ML_LATENCY = REGISTRY.histogram("ml_stage_duration_seconds", "Impact assessment model time by stage", ("stage",))
+
+# Request profiling
+PROFILES = REGISTRY.counter("profiles_total", "Request profiles by mode, trigger and outcome", ("mode", "trigger", "result"))
+
+# Write-behind follow buffer
+FOLLOW_FLUSH_SIZE = REGISTRY.histogram(
+    "follow_flush_batch_size", "Follow/unfollow rows written per group commit",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+)
+FOLLOW_FLUSH_LATENCY = REGISTRY.histogram("follow_flush_duration_seconds", "Time to write one group commit of follows")
+FOLLOW_FLUSH_ERRORS = REGISTRY.counter("follow_flush_errors_total", "Group commits of follows that failed and were retried")
+
+# Followed dataset change feed
+CHANGEFEED_SUBSCRIBERS = REGISTRY.gauge("changefeed_subscribers", "Open followed-dataset event streams")
+CHANGEFEED_CHECKS = REGISTRY.counter("changefeed_checks_total", "Upstream dataset checks by the change feed poller", ("result",))
+CHANGEFEED_EVENTS = REGISTRY.counter("changefeed_events_total", "Change feed events published", ("event",))
+CHANGEFEED_OVERFLOWS = REGISTRY.counter("changefeed_overflows_total", "Subscriber queues that overflowed and were told to resync")
+CHANGEFEED_POLL_LATENCY = REGISTRY.histogram("changefeed_poll_duration_seconds", "Time to check every followed dataset once")
+
+# Admission control
+ADMISSION_LIMIT = REGISTRY.gauge("admission_limit", "Configured admission limits by route class", ("route_class", "limit"))
+ADMISSION_IN_FLIGHT = REGISTRY.gauge("admission_in_flight", "Admitted requests being handled by route class", ("route_class",))
+ADMISSION_QUEUED = REGISTRY.gauge("admission_queued", "Requests waiting for admission by route class", ("route_class",))
+ADMISSION_REJECTED = REGISTRY.counter("admission_rejected_total", "Requests turned away by route class and reason", ("route_class", "reason"))
+ADMISSION_WAIT = REGISTRY.histogram("admission_wait_seconds", "Time queued requests waited for admission", ("route_class",))
+
+# Per-request query tracking: statements at least this slow are logged with their route,
+# and a statement repeated this many times in one request is reported as a likely N+1
+SLOW_QUERY_SECONDS = float(os.environ.get("SLOW_QUERY_MS", "100")) / 1000
+N_PLUS_ONE_THRESHOLD = int(os.environ.get("N_PLUS_ONE_THRESHOLD", "10"))
+QUERY_STATS_HEADERS = os.environ.get("QUERY_STATS_HEADERS", "1") != "0"
+
+class RequestStats:
+    """Per-request accumulator, reachable from any code running for the request"""
+    __slots__ = ("route", "statements", "db_seconds", "shapes")
+
+    def __init__(self, route: str = "background"):
+        self.route = route
+        self.statements = 0
+        self.db_seconds = 0.0
+        # Statement text -> times executed; bound values are placeholders, so this is the query shape
+        self.shapes: Dict[str, int] = {}
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.statements += 1
+        self.db_seconds += elapsed
+        self.shapes[statement] = self.shapes.get(statement, 0) + 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statements executed at least threshold times, most repeated first"""
+        return sorted(
+            ((statement, count) for statement, count in self.shapes.items() if count >= threshold),
+            key=lambda item: -item[1]
+        )
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+def _shorten(statement: str, limit: int = 300) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + "..."
+
+def instrument_engine(engine) -> None:
+    """Time every SQL statement, attribute it to the current request and log slow ones"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        DB_STATEMENTS.inc()
+        DB_LATENCY.observe(elapsed)
+        stats = current_request.get()
+        if stats is not None:
+            stats.record(statement, elapsed)
+        if elapsed >= SLOW_QUERY_SECONDS:
+            logger.warning(
+                "Slow query (%.1f ms) on %s: %s",
+                elapsed * 1000, stats.route if stats else "background", _shorten(statement)
+            )
+
+def cache_collector(caches: Dict[str, object]) -> Callable[[], Iterable[_Metric]]:
+    """Expose hit/miss counters of caches that keep `hits` and `misses` attributes"""
+    def collect():
+        requests = Counter("cache_requests_total", "Cache lookups by cache and result", ("cache", "result"))
+        for name, cache in caches.items():
+            requests.inc(cache.hits, cache=name, result="hit")
+            requests.inc(cache.misses, cache=name, result="miss")
+        return [requests]
+    return collect
+
+def route_template(scope) -> str:
+    """Path template of the route that will handle the request, e.g. /datasets/{hf_id:path}"""
+    app = scope.get("app")
+    for route in getattr(getattr(app, "router", None), "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched")
+    return "unmatched"
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency, status, in-flight requests and DB usage.
+    Also reports the request's SQL statement count and time in X-DB-Query-Count and
+    X-DB-Time-Ms response headers, and logs statements repeated often enough to be an N+1.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        route = route_template(scope)
+        stats = RequestStats(route)
+        token = current_request.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if QUERY_STATS_HEADERS:
+                    # Work done while streaming the body happens after this and isn't included
+                    message = dict(message)
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-db-query-count", str(stats.statements).encode()),
+                        (b"x-db-time-ms", f"{stats.db_seconds * 1000:.2f}".encode()),
+                    ]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc(method=method, route=route)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec(method=method, route=route)
+            HTTP_REQUESTS.inc(method=method, route=route, status=str(status_code))
+            HTTP_LATENCY.observe(elapsed, method=method, route=route)
+            DB_STATEMENTS_PER_REQUEST.observe(stats.statements, route=route)
+            DB_TIME_PER_REQUEST.observe(stats.db_seconds, route=route)
+            for statement, count in stats.repeated(N_PLUS_ONE_THRESHOLD):
+                logger.warning(
+                    "Possible N+1 on %s %s: statement ran %d times: %s",
+                    method, route, count, _shorten(statement)
+                )
+            current_request.reset(token)
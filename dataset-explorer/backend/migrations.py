@@ -0,0 +1,260 @@
+"""
+Versioned schema migrations.
+
+Each migration has an increasing version number and is recorded in the schema_version
+table once applied, so existing databases pick up new indexes, constraints and columns
+that `create_all` would never add to a table that already exists. Migrations run at
+startup (unless AUTO_MIGRATE=0) and from the command line:
+
+    python -m backend.migrations status
+    python -m backend.migrations upgrade [--to VERSION]
+
+Every migration is idempotent, so two processes racing to apply the same one is harmless:
+the loser's version insert fails and its transaction is rolled back.
+"""
+import argparse
+import logging
+import sys
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import (
+    Column, DateTime, Float, ForeignKey, Index, Integer, MetaData, String, Table, Text, inspect, text
+)
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+
+from backend.database import create_follow_sort_key_triggers, engine as default_engine
+
+logger = logging.getLogger(__name__)
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+
+MIGRATIONS: List[Migration] = []
+
+def migration(version: int, name: str):
+    """Register the decorated function as the migration to `version`"""
+    def register(apply: Callable[[Connection], None]):
+        MIGRATIONS.append(Migration(version, name, apply))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return apply
+    return register
+
+def create_index(conn: Connection, name: str, table: str, columns: Sequence[str], unique: bool = False) -> None:
+    conn.execute(text(
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+    ))
+
+def add_column(conn: Connection, table: str, column_ddl: str) -> None:
+    """ALTER TABLE ... ADD COLUMN, skipped when the column is already there (e.g. a fresh database)"""
+    column = column_ddl.split()[0]
+    if column not in {existing["name"] for existing in inspect(conn).get_columns(table)}:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column_ddl}"))
+
+# The schema as it stood before versioned migrations, frozen here so that version 1 keeps
+# creating the same tables however the models change later. Changes go in new migrations.
+INITIAL_SCHEMA = MetaData()
+
+Table(
+    "users", INITIAL_SCHEMA,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("email", String, unique=True, index=True, nullable=False),
+    Column("hashed_password", String, nullable=False),
+)
+Table(
+    "datasets", INITIAL_SCHEMA,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("hf_id", String, unique=True, index=True, nullable=False),
+    Column("name", String, nullable=False),
+    Column("description", String),
+    Column("last_modified", DateTime),
+    Column("size_bytes", Integer),
+)
+Table(
+    "dataset_followers", INITIAL_SCHEMA,
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+    Column("dataset_id", Integer, ForeignKey("datasets.id", ondelete="CASCADE"), primary_key=True),
+)
+Table(
+    "dataset_history", INITIAL_SCHEMA,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("dataset_id", Integer, ForeignKey("datasets.id", ondelete="CASCADE")),
+    Column("commit_id", String, nullable=False),
+    Column("commit_message", String),
+    Column("timestamp", DateTime),
+)
+Table(
+    "combined_datasets", INITIAL_SCHEMA,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, nullable=False),
+    Column("description", String),
+    Column("created_at", DateTime),
+    Column("created_by_id", Integer, ForeignKey("users.id", ondelete="CASCADE")),
+    Column("impact_level", String),
+)
+Table(
+    "dataset_combinations", INITIAL_SCHEMA,
+    Column("parent_id", Integer, ForeignKey("combined_datasets.id", ondelete="CASCADE"), primary_key=True),
+    Column("dataset_id", Integer, ForeignKey("datasets.id", ondelete="CASCADE"), primary_key=True),
+)
+Table(
+    "impact_assessments", INITIAL_SCHEMA,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("cache_key", String, unique=True, index=True, nullable=False),
+    Column("method", String, nullable=False),
+    Column("level", String, nullable=False),
+    Column("explanation", String, nullable=False),
+    Column("details", Text),
+    Column("created_at", DateTime),
+)
+Table(
+    "impact_assessment_datasets", INITIAL_SCHEMA,
+    Column("assessment_id", Integer, ForeignKey("impact_assessments.id", ondelete="CASCADE"), primary_key=True),
+    Column("dataset_id", Integer, ForeignKey("datasets.id", ondelete="CASCADE"), primary_key=True, index=True),
+)
+Table(
+    "assessment_jobs", INITIAL_SCHEMA,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    Column("method", String, nullable=False),
+    Column("dataset_ids", String, nullable=False),
+    Column("cache_key", String, nullable=False),
+    Column("status", String, nullable=False),
+    Column("stage", String),
+    Column("progress", Float, nullable=False),
+    Column("level", String),
+    Column("explanation", String),
+    Column("error", String),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+    Index("ix_assessment_jobs_dedupe", "user_id", "cache_key", "status"),
+)
+
+@migration(1, "initial schema")
+def initial_schema(conn: Connection) -> None:
+    # Creates whichever tables are missing, with their indexes
+    INITIAL_SCHEMA.create_all(bind=conn)
+
+# (name, table, columns, unique) for the indexes the queries in main.py rely on.
+# They are declared on the models as well.
+QUERY_INDEXES: List[Tuple[str, str, Tuple[str, ...], bool]] = [
+    # Follower counts, dashboard joins and keyset pages of followed datasets
+    ("ix_dataset_followers_dataset_user", "dataset_followers", ("dataset_id", "user_id"), False),
+    # History lookups by (dataset, commit), one row per commit
+    ("uq_dataset_history_dataset_commit", "dataset_history", ("dataset_id", "commit_id"), True),
+    # Per-owner combined dataset listings
+    ("ix_combined_datasets_owner_created_at_id", "combined_datasets", ("created_by_id", "created_at", "id"), False),
+    ("ix_combined_datasets_owner_name_id", "combined_datasets", ("created_by_id", "name", "id"), False),
+    # Combinations a dataset belongs to, e.g. when it is deleted
+    ("ix_dataset_combinations_dataset_parent", "dataset_combinations", ("dataset_id", "parent_id"), False),
+]
+
+@migration(2, "indexes for query patterns")
+def query_pattern_indexes(conn: Connection) -> None:
+    # Keep the first copy of any commit stored more than once so the unique index can be built
+    conn.execute(text(
+        "DELETE FROM dataset_history WHERE id NOT IN "
+        "(SELECT MIN(id) FROM dataset_history GROUP BY dataset_id, commit_id)"
+    ))
+    for name, table, columns, unique in QUERY_INDEXES:
+        create_index(conn, name, table, columns, unique)
+    # Refresh planner statistics so the new indexes are actually chosen
+    conn.execute(text("ANALYZE"))
+
+# Per-user orderings of followed datasets, over sort keys copied onto the follower rows
+FOLLOW_SORT_INDEXES: List[Tuple[str, str, Tuple[str, ...], bool]] = [
+    ("ix_dataset_followers_user_name", "dataset_followers", ("user_id", "dataset_name", "dataset_id"), False),
+    ("ix_dataset_followers_user_size", "dataset_followers", ("user_id", "dataset_size", "dataset_id"), False),
+    ("ix_dataset_followers_user_modified", "dataset_followers", ("user_id", "dataset_modified", "dataset_id"), False),
+]
+
+@migration(3, "sort keys for followed datasets")
+def follow_sort_keys(conn: Connection) -> None:
+    add_column(conn, "datasets", "follower_count INTEGER NOT NULL DEFAULT 0")
+    add_column(conn, "dataset_followers", "dataset_name VARCHAR")
+    add_column(conn, "dataset_followers", "dataset_size INTEGER NOT NULL DEFAULT 0")
+    add_column(conn, "dataset_followers", "dataset_modified TIMESTAMP")
+    conn.execute(text(
+        "UPDATE datasets SET follower_count = "
+        "(SELECT count(*) FROM dataset_followers WHERE dataset_followers.dataset_id = datasets.id)"
+    ))
+    conn.execute(text(
+        "UPDATE dataset_followers SET "
+        "dataset_name = (SELECT name FROM datasets WHERE datasets.id = dataset_followers.dataset_id), "
+        "dataset_size = (SELECT coalesce(size_bytes, 0) FROM datasets WHERE datasets.id = dataset_followers.dataset_id), "
+        "dataset_modified = (SELECT last_modified FROM datasets WHERE datasets.id = dataset_followers.dataset_id)"
+    ))
+    create_follow_sort_key_triggers(conn)
+    for name, table, columns, unique in FOLLOW_SORT_INDEXES:
+        create_index(conn, name, table, columns, unique)
+    # Version 2's (sort column, id) indexes on datasets: the catalog is sorted in memory and
+    # followed datasets now page off the indexes above, so nothing reads them
+    for name in ("ix_datasets_name_id", "ix_datasets_size_bytes_id", "ix_datasets_last_modified_id"):
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    conn.execute(text("ANALYZE"))
+
+def _ensure_version_table(conn: Connection) -> None:
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        "version INTEGER PRIMARY KEY, name VARCHAR NOT NULL, applied_at TIMESTAMP NOT NULL)"
+    ))
+
+def applied_versions(conn: Connection) -> dict:
+    """version -> applied_at for every migration recorded in the database"""
+    _ensure_version_table(conn)
+    return dict(conn.execute(text("SELECT version, applied_at FROM schema_version")).all())
+
+def current_version(engine: Optional[Engine] = None) -> int:
+    with (engine or default_engine).begin() as conn:
+        return max(applied_versions(conn), default=0)
+
+def upgrade(engine: Optional[Engine] = None, target: Optional[int] = None) -> List[int]:
+    """Apply pending migrations up to `target` (default: all), each in its own transaction"""
+    engine = engine or default_engine
+    applied = []
+    for step in MIGRATIONS:
+        if target is not None and step.version > target:
+            break
+        try:
+            with engine.begin() as conn:
+                if step.version in applied_versions(conn):
+                    continue
+                logger.info("Applying migration %d: %s", step.version, step.name)
+                step.apply(conn)
+                conn.execute(
+                    text("INSERT INTO schema_version (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+                    {"version": step.version, "name": step.name, "applied_at": datetime.utcnow()}
+                )
+        except IntegrityError:
+            # Another process applied it between our check and insert
+            continue
+        applied.append(step.version)
+    return applied
+
+def status(engine: Optional[Engine] = None) -> List[Tuple[int, str, Optional[str]]]:
+    """(version, name, applied_at or None) for every known migration"""
+    with (engine or default_engine).begin() as conn:
+        done = applied_versions(conn)
+    return [(step.version, step.name, done.get(step.version)) for step in MIGRATIONS]
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m backend.migrations", description="Manage the database schema")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("status", help="list migrations and whether they are applied")
+    upgrade_parser = commands.add_parser("upgrade", help="apply pending migrations")
+    upgrade_parser.add_argument("--to", type=int, help="stop after this version")
+    args = parser.parse_args(argv)
+
+    if args.command == "upgrade":
+        applied = upgrade(target=args.to)
+        print(f"Applied migrations: {', '.join(map(str, applied))}" if applied else "Schema is up to date")
+    else:
+        for version, name, applied_at in status():
+            print(f"{version:>4}  {'applied ' + str(applied_at) if applied_at else 'pending':<36}  {name}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,24 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, Table, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, Table, DateTime, Index, Text, Float, event
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from .database import Base
+from .database import Base, create_follow_sort_key_triggers
 
 # Association table for user-followed datasets
 dataset_followers = Table(
     "dataset_followers",
     Base.metadata,
     Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
-    Column("dataset_id", Integer, ForeignKey("datasets.id", ondelete="CASCADE"), primary_key=True)
+    Column("dataset_id", Integer, ForeignKey("datasets.id", ondelete="CASCADE"), primary_key=True),
+    # Copies of the dataset's sort keys, kept current by triggers, so that a user's followed
+    # datasets can be paged in any order straight off the indexes below
+    Column("dataset_name", String, nullable=True),
+    Column("dataset_size", Integer, nullable=False, server_default="0"),
+    Column("dataset_modified", DateTime, nullable=True),
+    # The primary key leads with user_id; follower counts and joins go by dataset_id
+    Index("ix_dataset_followers_dataset_user", "dataset_id", "user_id"),
+    Index("ix_dataset_followers_user_name", "user_id", "dataset_name", "dataset_id"),
+    Index("ix_dataset_followers_user_size", "user_id", "dataset_size", "dataset_id"),
+    Index("ix_dataset_followers_user_modified", "user_id", "dataset_modified", "dataset_id"),
 )
 
 # Association table for combined datasets
@@ -16,7 +26,8 @@ dataset_combinations = Table(
     "dataset_combinations",
     Base.metadata,
     Column("parent_id", Integer, ForeignKey("combined_datasets.id", ondelete="CASCADE"), primary_key=True),
-    Column("dataset_id", Integer, ForeignKey("datasets.id", ondelete="CASCADE"), primary_key=True)
+    Column("dataset_id", Integer, ForeignKey("datasets.id", ondelete="CASCADE"), primary_key=True),
+    Index("ix_dataset_combinations_dataset_parent", "dataset_id", "parent_id")
 )
 
 class User(Base):
@@ -46,6 +57,8 @@ class Dataset(Base):
     description = Column(String, nullable=True)
     last_modified = Column(DateTime, default=datetime.utcnow)
     size_bytes = Column(Integer, nullable=True)  # For impact assessment
+    # Maintained by triggers on dataset_followers; pending buffered follows aren't counted yet
+    follower_count = Column(Integer, nullable=False, server_default="0")
     
     # Relationships
     followers = relationship(
@@ -68,6 +81,10 @@ class Dataset(Base):
 
 class DatasetHistory(Base):
     __tablename__ = "dataset_history"
+    __table_args__ = (
+        # History is looked up by dataset and commit, and a commit is stored once per dataset
+        Index("uq_dataset_history_dataset_commit", "dataset_id", "commit_id", unique=True),
+    )
     id = Column(Integer, primary_key=True, index=True)
     dataset_id = Column(Integer, ForeignKey("datasets.id", ondelete="CASCADE"))
     commit_id = Column(String, nullable=False)
@@ -79,6 +96,11 @@ class DatasetHistory(Base):
 
 class CombinedDataset(Base):
     __tablename__ = "combined_datasets"
+    __table_args__ = (
+        # Per-user listings, paginated by (sort column, id)
+        Index("ix_combined_datasets_owner_created_at_id", "created_by_id", "created_at", "id"),
+        Index("ix_combined_datasets_owner_name_id", "created_by_id", "name", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     description = Column(String, nullable=True)
@@ -93,4 +115,47 @@ class CombinedDataset(Base):
         secondary=dataset_combinations, 
         back_populates="in_combinations",
         lazy="joined"
-    )
\ No newline at end of file
+    )
+
+# Association table linking cached assessments to the datasets they cover
+impact_assessment_datasets = Table(
+    "impact_assessment_datasets",
+    Base.metadata,
+    Column("assessment_id", Integer, ForeignKey("impact_assessments.id", ondelete="CASCADE"), primary_key=True),
+    Column("dataset_id", Integer, ForeignKey("datasets.id", ondelete="CASCADE"), primary_key=True, index=True)
+)
+
+class ImpactAssessmentResult(Base):
+    """Memoized impact assessment, keyed by method, dataset ids and dataset versions"""
+    __tablename__ = "impact_assessments"
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String, unique=True, index=True, nullable=False)
+    method = Column(String, nullable=False)
+    level = Column(String, nullable=False)
+    explanation = Column(String, nullable=False)
+    details = Column(Text, nullable=True)  # JSON encoded extras, e.g. cluster_count
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class AssessmentJob(Base):
+    """Impact assessment queued for background processing"""
+    __tablename__ = "assessment_jobs"
+    __table_args__ = (
+        # Finding an identical job that is still pending or running
+        Index("ix_assessment_jobs_dedupe", "user_id", "cache_key", "status"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    method = Column(String, nullable=False)
+    dataset_ids = Column(String, nullable=False)  # comma separated
+    cache_key = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending, running, done, failed
+    stage = Column(String, nullable=True)
+    progress = Column(Float, nullable=False, default=0.0)
+    level = Column(String, nullable=True)
+    explanation = Column(String, nullable=True)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# create_all builds the tables without migrations (tests, scripts); give it the triggers too
+event.listen(Base.metadata, "after_create", lambda target, connection, **kw: create_follow_sort_key_triggers(connection))
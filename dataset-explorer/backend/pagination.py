@@ -0,0 +1,64 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+# Page size bounds for cursor-paginated listings
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def parse_sort(sort: str, columns: Dict[str, Any]) -> Tuple[Any, bool]:
+    """
+    Resolve a sort parameter like "name" or "-followers" against the allowed columns.
+    Returns (SQL expression, descending)
+    """
+    descending = sort.startswith("-")
+    key = sort.lstrip("-")
+    if key not in columns:
+        allowed = ", ".join(sorted(columns))
+        raise HTTPException(status_code=400, detail=f"Invalid sort '{sort}', expected one of: {allowed} (prefix with - for descending)")
+    return columns[key], descending
+
+def encode_cursor(sort: str, value: Any, row_id: int) -> str:
+    """Encode the sort value and id of the last row on a page into an opaque cursor"""
+    if isinstance(value, datetime):
+        value = {"dt": value.isoformat()}
+    payload = json.dumps({"s": sort, "k": [value, row_id]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Any, int]:
+    """Decode a cursor produced by encode_cursor for the same sort order"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value, row_id = payload["k"]
+        if payload["s"] != sort or not isinstance(row_id, int):
+            raise ValueError("cursor was issued for a different sort")
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["dt"])
+        return value, row_id
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset_query(query, sort_expr, id_column, descending: bool, cursor: Optional[Tuple[Any, int]], limit: int):
+    """
+    Order the query by (sort_expr, id) and start after the cursor position.
+    Fetches one extra row so the caller can tell whether another page exists.
+    """
+    if cursor is not None:
+        value, row_id = cursor
+        if descending:
+            query = query.filter(or_(sort_expr < value, and_(sort_expr == value, id_column < row_id)))
+        else:
+            query = query.filter(or_(sort_expr > value, and_(sort_expr == value, id_column > row_id)))
+    if descending:
+        query = query.order_by(sort_expr.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_expr.asc(), id_column.asc())
+    return query.limit(limit + 1)
+
+def split_page(rows: List[Any], limit: int) -> Tuple[List[Any], bool]:
+    """Split the limit + 1 rows returned by keyset_query into (page, has_more)"""
+    return rows[:limit], len(rows) > limit
@@ -0,0 +1,288 @@
+"""
+Opt-in request profiling.
+
+An admin (an email listed in ADMIN_EMAILS) can profile a single request by sending
+`X-Profile: sampling` or `X-Profile: cprofile` with a valid bearer token, and operators
+can profile a random share of all requests with PROFILE_SAMPLE_RATE. Sampling profiles
+are written to PROFILE_DIR as collapsed stacks (for flamegraph.pl and friends) and
+speedscope JSON; cProfile runs are written as pstats `.prof` files.
+
+Overhead is bounded so this can be left on briefly under real load: at most
+PROFILE_MAX_CONCURRENT profiles run at once (other requests go through unprofiled),
+the sampler stops after PROFILE_MAX_SECONDS, and only the newest PROFILE_MAX_FILES
+files are kept. Profiles cover whole threads, so requests running concurrently on the
+event loop show up in them too.
+
+cProfile runs one profiler per request, and from Python 3.12 (where it is built on
+sys.monitoring) that profiler sees every thread, including the thread pool that runs sync
+routes and dependencies. A process can only have one such profiler active, so a second
+cProfile request is answered unprofiled as busy. Before 3.12 cProfile only sees the event
+loop thread; use sampling mode to profile sync routes there.
+"""
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from backend import metrics, security
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "./profiles")
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DEFAULT_MODE = os.environ.get("PROFILE_MODE", "sampling")
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL_MS", "5")) / 1000
+PROFILE_MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", "30"))
+PROFILE_MAX_CONCURRENT = int(os.environ.get("PROFILE_MAX_CONCURRENT", "1"))
+PROFILE_MAX_FILES = int(os.environ.get("PROFILE_MAX_FILES", "200"))
+
+MODES = ("sampling", "cprofile")
+
+# Leaf frames in these modules mean the thread is parked, not working
+_IDLE_MODULES = ("selectors.py", "threading.py", "queue.py")
+
+_slots = threading.BoundedSemaphore(PROFILE_MAX_CONCURRENT)
+# Only one cProfile profiler can be enabled in the process at a time on Python 3.12+
+_cprofile_slot = threading.Lock()
+
+Frame = Tuple[str, str, int]
+
+def _frame_key(frame) -> Frame:
+    code = frame.f_code
+    return (code.co_name, code.co_filename, code.co_firstlineno)
+
+def _stack(frame) -> Tuple[Frame, ...]:
+    """Frames from the thread's root down to the currently running function"""
+    frames = []
+    while frame is not None:
+        frames.append(_frame_key(frame))
+        frame = frame.f_back
+    return tuple(reversed(frames))
+
+class Sampler:
+    """Wall-clock stack sampler built on sys._current_frames()"""
+
+    def __init__(self, interval: float = PROFILE_INTERVAL, max_seconds: float = PROFILE_MAX_SECONDS):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.samples: Counter = Counter()
+        self.started_at = 0.0
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.elapsed = time.perf_counter() - self.started_at
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        deadline = self.started_at + self.max_seconds
+        while not self._stop.wait(self.interval) and time.perf_counter() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = _stack(frame)
+                if os.path.basename(stack[-1][1]) in _IDLE_MODULES:
+                    continue
+                self.samples[(names.get(ident, str(ident)), stack)] += 1
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed format: `thread;root;...;leaf count` per line"""
+        lines = []
+        for (thread, stack), count in sorted(self.samples.items()):
+            labels = [thread] + [f"{name} ({os.path.basename(filename)}:{line})" for name, filename, line in stack]
+            lines.append(f"{';'.join(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, name: str) -> Dict:
+        """Speedscope file with one sampled profile per thread"""
+        frames: List[Frame] = []
+        index: Dict[Frame, int] = {}
+        by_thread: Dict[str, List[Tuple[List[int], int]]] = {}
+        for (thread, stack), count in self.samples.items():
+            ids = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append(frame)
+                ids.append(index[frame])
+            by_thread.setdefault(thread, []).append((ids, count))
+
+        interval_ms = self.interval * 1000
+        profiles = []
+        for thread, samples in sorted(by_thread.items()):
+            weights = [count * interval_ms for _, count in samples]
+            profiles.append({
+                "type": "sampled",
+                "name": thread,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": [ids for ids, _ in samples],
+                "weights": weights,
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "dataset-explorer",
+            "shared": {"frames": [{"name": n, "file": f, "line": line} for n, f, line in frames]},
+            "profiles": profiles,
+        }
+
+class RequestProfile:
+    """One profiling run, named after the request it was started for"""
+
+    def __init__(self, mode: str, method: str, path: str):
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", path).strip("-") or "root"
+        self.id = f"{time.strftime('%Y%m%dT%H%M%S')}-{method.lower()}-{slug[:60]}-{uuid.uuid4().hex[:6]}"
+        self.mode = mode
+        self.title = f"{method} {path}"
+        self._sampler = Sampler() if mode == "sampling" else None
+        self._profiler = cProfile.Profile() if mode == "cprofile" else None
+
+    def start(self) -> None:
+        if self._sampler:
+            self._sampler.start()
+        else:
+            self._profiler.enable()
+
+    def stop(self) -> None:
+        if self._sampler:
+            self._sampler.stop()
+        else:
+            self._profiler.disable()
+
+    def save(self, directory: Optional[str] = None) -> List[str]:
+        directory = directory or PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, self.id)
+        if self._profiler:
+            self._profiler.dump_stats(base + ".prof")
+            paths = [base + ".prof"]
+        else:
+            with open(base + ".collapsed.txt", "w") as collapsed:
+                collapsed.write(self._sampler.collapsed())
+            with open(base + ".speedscope.json", "w") as speedscope:
+                json.dump(self._sampler.speedscope(self.title), speedscope)
+            paths = [base + ".collapsed.txt", base + ".speedscope.json"]
+        prune(directory)
+        return paths
+
+def _newest_first(directory: str) -> List[os.DirEntry]:
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        (entry for entry in os.scandir(directory) if entry.is_file()),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True
+    )
+
+def prune(directory: Optional[str] = None) -> None:
+    """Delete the oldest profile files beyond PROFILE_MAX_FILES"""
+    for entry in _newest_first(directory or PROFILE_DIR)[PROFILE_MAX_FILES:]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+def list_profiles(directory: Optional[str] = None) -> List[str]:
+    """Saved profile file names, newest first"""
+    return [entry.name for entry in _newest_first(directory or PROFILE_DIR)]
+
+def _bearer_email(headers: Dict[bytes, bytes]) -> Optional[str]:
+    scheme, _, token = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return security.decode_access_token(token).get("sub")
+    except Exception:
+        return None
+
+def requested_mode(scope) -> Tuple[Optional[str], str]:
+    """Profiling mode for this request and what triggered it, or (None, "") to skip"""
+    headers = dict(scope.get("headers", ()))
+    requested = headers.get(b"x-profile")
+    if requested is not None:
+        # The header is silently ignored for anyone but an admin
+        if security.is_admin(_bearer_email(headers)):
+            mode = requested.decode("latin-1").strip().lower()
+            return (mode if mode in MODES else PROFILE_DEFAULT_MODE), "header"
+        return None, ""
+    if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        return PROFILE_DEFAULT_MODE, "sampled"
+    return None, ""
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling requests selected by requested_mode().
+    Profiled responses carry the profile id in an X-Profile-Id header; requests that asked
+    for a profile while the concurrency limit was reached get `X-Profile-Id: busy`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        mode, trigger = requested_mode(scope)
+        if mode is None:
+            return await self.app(scope, receive, send)
+
+        busy = not _slots.acquire(blocking=False)
+        if not busy and mode == "cprofile" and not _cprofile_slot.acquire(blocking=False):
+            _slots.release()
+            busy = True
+        if busy:
+            metrics.PROFILES.inc(mode=mode, trigger=trigger, result="busy")
+            return await self.app(scope, receive, _with_header(send, "busy" if trigger == "header" else None))
+
+        profile = RequestProfile(mode, scope["method"], scope["path"])
+        try:
+            profile.start()
+            try:
+                await self.app(scope, receive, _with_header(send, profile.id if trigger == "header" else None))
+            finally:
+                profile.stop()
+        finally:
+            if mode == "cprofile":
+                _cprofile_slot.release()
+            _slots.release()
+        try:
+            await run_in_threadpool(profile.save)
+        except OSError:
+            logger.exception("Could not save profile %s", profile.id)
+            metrics.PROFILES.inc(mode=mode, trigger=trigger, result="failed")
+            return
+        metrics.PROFILES.inc(mode=mode, trigger=trigger, result="saved")
+
+def _with_header(send, profile_id: Optional[str]):
+    if profile_id is None:
+        return send
+
+    async def send_wrapper(message):
+        if message["type"] == "http.response.start":
+            message = dict(message)
+            message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+        await send(message)
+    return send_wrapper
@@ -47,10 +47,23 @@ class Dataset(DatasetBase):
     last_modified: datetime
     size_bytes: Optional[int] = None
     follower_count: Optional[int] = None
+    # Whether the requesting user follows the dataset; only set on single-dataset responses
+    is_following: Optional[bool] = None
     
     class Config:
         from_attributes = True  # Changed from orm_mode=True for Pydantic v2
 
+# Batch dataset lookup schemas
+BATCH_MAX_IDS = 50
+
+class DatasetBatchRequest(BaseModel):
+    hf_ids: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_IDS)
+
+class DatasetBatchItem(BaseModel):
+    hf_id: str
+    dataset: Optional[Dataset] = None
+    error: Optional[str] = None
+
 # Dataset history schemas
 class DatasetHistoryBase(BaseModel):
     commit_id: str
@@ -82,6 +95,12 @@ class CombinedDataset(BaseModel):
     class Config:
         from_attributes = True  # Changed from orm_mode=True for Pydantic v2
 
+# Dashboard schemas
+class Dashboard(BaseModel):
+    user: User
+    followed_datasets: List[Dataset] = []
+    combined_datasets: List[CombinedDataset] = []
+
 # Impact assessment schemas
 class ImpactAssessment(BaseModel):
     dataset_ids: List[int]
@@ -89,4 +108,22 @@ class ImpactAssessment(BaseModel):
 
 class ImpactResult(BaseModel):
     level: str  # "low", "medium", "high"
-    explanation: str
\ No newline at end of file
+    explanation: str
+
+class CacheStats(BaseModel):
+    hits: int
+    misses: int
+    hit_rate: float
+    entries: int
+
+class AssessmentJob(BaseModel):
+    id: int
+    status: str  # "pending", "running", "done", "failed"
+    method: str
+    dataset_ids: List[int]
+    stage: Optional[str] = None
+    progress: float = 0.0
+    result: Optional[ImpactResult] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
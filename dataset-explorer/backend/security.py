@@ -14,6 +14,11 @@ SECRET_KEY = os.environ.get("JWT_SECRET_KEY", "replace-me-with-a-random-32-char-
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
 
+# Accounts allowed to use admin-only tooling such as request profiling
+ADMIN_EMAILS = {
+    email.strip().lower() for email in os.environ.get("ADMIN_EMAILS", "").split(",") if email.strip()
+}
+
 # OAuth2 scheme for token extraction
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login", auto_error=True)
 
@@ -52,4 +57,8 @@ def decode_access_token(token: str) -> dict:
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token",
             headers={"WWW-Authenticate": "Bearer"},
-        )
\ No newline at end of file
+        )
+
+def is_admin(email: Optional[str]) -> bool:
+    """Whether the account may use admin-only tooling"""
+    return bool(email) and email.lower() in ADMIN_EMAILS
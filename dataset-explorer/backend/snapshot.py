@@ -0,0 +1,268 @@
+"""
+Columnar snapshots of the local catalog, for warming new databases.
+
+A snapshot is a NumPy .npz archive with one array per column of datasets and
+dataset_history (plus impact_assessments and the datasets each covers with
+--with-assessments, the memoized model results). Strings are stored Arrow-style as one UTF-8 byte buffer with int64 offsets and
+nullable columns get a boolean null mask. Timestamps are strings too, copied exactly as
+SQLite stores them, which saves parsing and re-formatting millions of them. Members
+written with --no-compress are memory-mapped on import instead of read into memory.
+
+    python -m backend.snapshot export catalog.npz
+    python -m backend.snapshot import catalog.npz
+
+Import only loads into a database without datasets, at the schema version the snapshot
+was exported from. Both directions use SQLite-specific SQL and refuse other databases. Set CATALOG_SNAPSHOT to a snapshot
+path to have the app do this at startup.
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+import zipfile
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from backend import migrations
+from backend.database import engine as default_engine
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+# Rows inserted per executemany call on import
+CHUNK_ROWS = 50_000
+
+# Column kinds: int or str, with a trailing ? when nullable
+TABLES: Dict[str, List[Tuple[str, str]]] = {
+    "datasets": [
+        ("id", "int"), ("hf_id", "str"), ("name", "str"), ("description", "str?"),
+        ("last_modified", "str?"), ("size_bytes", "int?"),
+    ],
+    "dataset_history": [
+        ("id", "int"), ("dataset_id", "int"), ("commit_id", "str"), ("commit_message", "str?"),
+        ("timestamp", "str?"),
+    ],
+    "impact_assessments": [
+        ("id", "int"), ("cache_key", "str"), ("method", "str"), ("level", "str"), ("explanation", "str"),
+        ("details", "str?"), ("created_at", "str?"),
+    ],
+    "impact_assessment_datasets": [("assessment_id", "int"), ("dataset_id", "int")],
+}
+OPTIONAL_TABLES = {"impact_assessments", "impact_assessment_datasets"}
+# Row order on export; tables not listed are ordered by id
+ORDER_BY = {"impact_assessment_datasets": "assessment_id, dataset_id"}
+
+# Encoding
+
+def _encode_column(prefix: str, kind: str, values: Sequence[Any]) -> Dict[str, np.ndarray]:
+    base, nullable = kind.rstrip("?"), kind.endswith("?")
+    arrays = {}
+    if nullable:
+        arrays[f"{prefix}.null"] = np.fromiter((value is None for value in values), bool, len(values))
+    if base == "int":
+        arrays[prefix] = np.fromiter((0 if value is None else value for value in values), np.int64, len(values))
+    else:
+        encoded = [b"" if value is None else value.encode() for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        arrays[f"{prefix}.offsets"] = offsets
+        arrays[f"{prefix}.data"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return arrays
+
+def _decode_column(arrays, prefix: str, kind: str, start: int, stop: int) -> List[Any]:
+    base, nullable = kind.rstrip("?"), kind.endswith("?")
+    if base == "int":
+        values = arrays[prefix][start:stop].tolist()
+    else:
+        offsets = arrays[f"{prefix}.offsets"][start:stop + 1]
+        data = arrays[f"{prefix}.data"][offsets[0]:offsets[-1]].tobytes()
+        bounds = (offsets - offsets[0]).tolist()
+        values = [data[begin:end].decode() for begin, end in zip(bounds, bounds[1:])]
+    if nullable:
+        nulls = arrays[f"{prefix}.null"][start:stop]
+        if nulls.any():
+            values = [None if null else value for value, null in zip(values, nulls.tolist())]
+    return values
+
+# Reading archives
+
+def _member_offset(handle, info: zipfile.ZipInfo) -> int:
+    """Where a stored member's bytes start: after its local header, whose extra field can differ from the central one"""
+    handle.seek(info.header_offset)
+    header = handle.read(zipfile.sizeFileHeader)
+    name_length = int.from_bytes(header[26:28], "little")
+    extra_length = int.from_bytes(header[28:30], "little")
+    return info.header_offset + zipfile.sizeFileHeader + name_length + extra_length
+
+def open_arrays(path: str) -> Dict[str, np.ndarray]:
+    """
+    Load every array in an .npz archive. Uncompressed members are memory-mapped in
+    place, so only the pages actually read come off disk; compressed ones are inflated.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as handle:
+        for info in archive.infolist():
+            name = info.filename[:-len(".npy")]
+            if info.compress_type != zipfile.ZIP_STORED:
+                with archive.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member)
+                continue
+            handle.seek(_member_offset(handle, info))
+            major, _ = np.lib.format.read_magic(handle)
+            read_header = np.lib.format.read_array_header_1_0 if major == 1 else np.lib.format.read_array_header_2_0
+            shape, fortran_order, dtype = read_header(handle)
+            if not shape or 0 in shape:
+                arrays[name] = np.empty(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(
+                    path, dtype=dtype, mode="r", offset=handle.tell(), shape=shape,
+                    order="F" if fortran_order else "C"
+                )
+    return arrays
+
+def read_meta(arrays: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    if "meta" not in arrays:
+        raise ValueError("Not a catalog snapshot: no meta entry")
+    meta = json.loads(arrays["meta"].tobytes())
+    if meta.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format {meta.get('format')}, expected {FORMAT_VERSION}")
+    return meta
+
+# Export
+
+def _rows(conn: Connection, table: str, columns: List[Tuple[str, str]]) -> List[tuple]:
+    names = ", ".join(name for name, _ in columns)
+    return conn.exec_driver_sql(f"SELECT {names} FROM {table} ORDER BY {ORDER_BY.get(table, 'id')}").all()
+
+def _require_sqlite(engine: Engine) -> None:
+    if engine.dialect.name != "sqlite":
+        raise ValueError(f"Catalog snapshots only work with SQLite databases, not {engine.dialect.name}")
+
+def export_snapshot(
+    path: str, engine: Optional[Engine] = None, with_assessments: bool = False, compress: bool = True
+) -> Dict[str, int]:
+    """Write the catalog to `path`; returns the number of rows per table"""
+    engine = engine or default_engine
+    _require_sqlite(engine)
+    tables = [table for table in TABLES if with_assessments or table not in OPTIONAL_TABLES]
+    arrays: Dict[str, np.ndarray] = {}
+    counts = {}
+    with engine.begin() as conn:
+        # pysqlite only opens a transaction before writes; read everything from one snapshot
+        # so history never refers to a dataset missing from the export
+        conn.exec_driver_sql("BEGIN")
+        schema_version = max(migrations.applied_versions(conn), default=0)
+        for table in tables:
+            rows = _rows(conn, table, TABLES[table])
+            counts[table] = len(rows)
+            for position, (name, kind) in enumerate(TABLES[table]):
+                arrays.update(_encode_column(f"{table}.{name}", kind, [row[position] for row in rows]))
+
+    meta = {
+        "format": FORMAT_VERSION,
+        "created_at": datetime.utcnow().isoformat(),
+        "schema_version": schema_version,
+        "counts": counts,
+    }
+    arrays["meta"] = np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8)
+    (np.savez_compressed if compress else np.savez)(path, **arrays)
+    return counts
+
+# Import
+
+def _insert(conn: Connection, table: str, columns: List[Tuple[str, str]], arrays, count: int) -> None:
+    names = ", ".join(name for name, _ in columns)
+    statement = f"INSERT INTO {table} ({names}) VALUES ({', '.join('?' for _ in columns)})"
+    for start in range(0, count, CHUNK_ROWS):
+        stop = min(count, start + CHUNK_ROWS)
+        values = [_decode_column(arrays, f"{table}.{name}", kind, start, stop) for name, kind in columns]
+        conn.exec_driver_sql(statement, list(zip(*values)))
+
+def _drop_indexes(conn: Connection, table: str) -> List[str]:
+    """Drop the table's indexes, returning the statements that recreate them"""
+    indexes = conn.exec_driver_sql(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,)
+    ).all()
+    for name, _ in indexes:
+        conn.exec_driver_sql(f"DROP INDEX {name}")
+    return [sql for _, sql in indexes]
+
+def import_snapshot(path: str, engine: Optional[Engine] = None) -> Dict[str, int]:
+    """
+    Bulk-load a snapshot into a database that has no datasets yet, in one transaction.
+    Raises ValueError if the database isn't SQLite or already has a catalog, or if its
+    schema version differs from the snapshot's.
+    """
+    engine = engine or default_engine
+    _require_sqlite(engine)
+    arrays = open_arrays(path)
+    meta = read_meta(arrays)
+    migrations.upgrade(engine)
+    with engine.begin() as conn:
+        # Take the write lock before checking, so two workers booting together can't both load
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        # Column lists are those of the current schema; rows from another version wouldn't fit
+        schema_version = max(migrations.applied_versions(conn), default=0)
+        if meta.get("schema_version") != schema_version:
+            raise ValueError(
+                f"Snapshot has schema version {meta.get('schema_version')}, the database has {schema_version}; "
+                "export a new snapshot from this version"
+            )
+        if conn.execute(text("SELECT 1 FROM datasets LIMIT 1")).first() is not None:
+            raise ValueError("The database already has datasets; snapshots only load into an empty catalog")
+        for table, count in meta["counts"].items():
+            # Building indexes once after the load is cheaper than maintaining them row by row
+            recreate = _drop_indexes(conn, table)
+            _insert(conn, table, TABLES[table], arrays, count)
+            for statement in recreate:
+                conn.exec_driver_sql(statement)
+    return meta["counts"]
+
+def load_if_empty(path: str, engine: Optional[Engine] = None) -> bool:
+    """Import at startup; a failed or skipped import is logged and leaves the app to warm up lazily"""
+    started = time.perf_counter()
+    try:
+        counts = import_snapshot(path, engine)
+    except ValueError as e:
+        logger.info("Catalog snapshot %s not loaded: %s", path, e)
+        return False
+    except (IntegrityError, OperationalError, OSError, zipfile.BadZipFile) as e:
+        # Another worker may be loading the same snapshot
+        logger.warning("Catalog snapshot %s not loaded: %s", path, e)
+        return False
+    logger.info("Loaded catalog snapshot %s in %.1fs: %s", path, time.perf_counter() - started, counts)
+    return True
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m backend.snapshot", description="Export or import catalog snapshots")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="write datasets and their history to a snapshot")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--with-assessments", action="store_true", help="include memoized impact assessments and the datasets they cover")
+    export_parser.add_argument("--no-compress", action="store_true", help="store arrays uncompressed so import can mmap them")
+    import_parser = commands.add_parser("import", help="bulk-load a snapshot into an empty database")
+    import_parser.add_argument("path")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    try:
+        if args.command == "export":
+            counts = export_snapshot(args.path, with_assessments=args.with_assessments, compress=not args.no_compress)
+        else:
+            counts = import_snapshot(args.path)
+    except (ValueError, zipfile.BadZipFile) as e:
+        print(e, file=sys.stderr)
+        return 1
+    summary = ", ".join(f"{count:,} {table}" for table, count in counts.items())
+    print(f"{args.command.capitalize()}ed {summary} in {time.perf_counter() - started:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+import asyncio
+import os
+import tempfile
+from contextlib import contextmanager
+
+# Point the app at a throwaway database before backend.database is imported
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db"))
+
+import pytest
+from sqlalchemy import event
+from fastapi.testclient import TestClient
+from backend import huggingface, main, models, security
+from backend.database import SessionLocal, engine
+
+
+class FakeHuggingFace:
+    """In-memory stand-in for HuggingFaceClient so tests never hit huggingface.co"""
+
+    def __init__(self):
+        self.datasets = {}
+        self.commits = {}
+        self.delays = {}
+        self.failures = {}
+        self.calls = []
+
+    def add(self, hf_id, description="", size_bytes=None, commits=()):
+        self.datasets[hf_id] = {"id": hf_id, "description": description, "size_bytes": size_bytes}
+        self.commits[hf_id] = list(commits)
+
+    async def get_datasets(self, limit=20, offset=0):
+        self.calls.append(("list", None))
+        return list(self.datasets.values())[offset:offset + limit]
+
+    async def get_dataset_info(self, dataset_id):
+        self.calls.append(("info", dataset_id))
+        if dataset_id in self.delays:
+            await asyncio.sleep(self.delays[dataset_id])
+        if dataset_id in self.failures:
+            raise huggingface.HuggingFaceError(self.failures[dataset_id], f"Failed to fetch dataset info: {dataset_id} failed")
+        if dataset_id not in self.datasets:
+            raise huggingface.HuggingFaceError(404, f"Failed to fetch dataset info: {dataset_id} not found")
+        return dict(self.datasets[dataset_id])
+
+    async def get_dataset_history(self, dataset_id):
+        self.calls.append(("history", dataset_id))
+        if dataset_id not in self.datasets:
+            raise huggingface.HuggingFaceError(404, f"Failed to fetch dataset history: {dataset_id} not found")
+        return list(self.commits[dataset_id])
+
+
+@pytest.fixture
+def fake_hf(monkeypatch):
+    fake = FakeHuggingFace()
+    monkeypatch.setattr(main, "hf_client", fake)
+    return fake
+
+
+@pytest.fixture
+def db_session():
+    # Drop buffered follows first so the flusher can't write into the new schema
+    main.follow_buffer.clear()
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    # In-process caches would otherwise outlive the database they were filled from
+    main.dashboard_cache.clear()
+    main.impact_cache.memory.clear()
+    main.catalog.reset()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def statements():
+    """Collects every SQL statement sent to the database while the test runs"""
+    seen = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seen.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield seen
+    event.remove(engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def query_budget(statements):
+    """
+    Fails the test if the with block runs more SQL statements than allowed:
+
+        with query_budget(3):
+            client.get("/dashboard", headers=auth_headers)
+    """
+    @contextmanager
+    def budget(limit):
+        start = len(statements)
+        yield
+        used = statements[start:]
+        assert len(used) <= limit, f"{len(used)} SQL statements, budget is {limit}:\n" + "\n".join(used)
+
+    return budget
+
+
+@pytest.fixture
+def client(db_session, fake_hf):
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def user(db_session):
+    # Skip bcrypt, the tests authenticate with a token minted directly
+    user = models.User(email="test@example.com", hashed_password="not-a-real-hash")
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+@pytest.fixture
+def auth_headers(user):
+    token = security.create_access_token({"sub": user.email})
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def open_asgi_stream(path, headers):
+    """Drive the ASGI app directly so the endless stream can be read incrementally and then dropped"""
+    messages = asyncio.Queue()
+    disconnected = asyncio.Event()
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+        "client": ("testclient", 50000), "server": ("testserver", 80),
+    }
+    task = asyncio.create_task(main.app(scope, receive, messages.put))
+    return messages, disconnected, task
+
+
+@pytest.fixture
+def open_stream(db_session, fake_hf):
+    # TestClient buffers whole responses, so endless streams are read through the ASGI app
+    return open_asgi_stream
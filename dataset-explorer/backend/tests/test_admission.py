@@ -0,0 +1,116 @@
+import asyncio
+import pytest
+from backend import admission, main, metrics, security
+from backend.admission import Limiter, Limits, Rejected
+
+
+def test_limiter_queues_then_sheds():
+    async def scenario():
+        limiter = Limiter("test", Limits(concurrency=1, queue=1, per_user=0), queue_timeout=5)
+        await limiter.acquire("a")
+        queued = asyncio.create_task(limiter.acquire("b"))
+        await asyncio.sleep(0)
+        assert limiter.queued == 1
+
+        with pytest.raises(Rejected) as rejected:
+            await limiter.acquire("c")
+        assert (rejected.value.status_code, rejected.value.reason) == (503, "queue_full")
+        assert rejected.value.retry_after >= 1
+
+        # Releasing hands the slot straight to the queued request
+        limiter.release("a")
+        await asyncio.wait_for(queued, 1)
+        assert (limiter.in_flight, limiter.queued) == (1, 0)
+        limiter.release("b")
+        assert limiter.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_limiter_times_out_queued_requests():
+    async def scenario():
+        limiter = Limiter("test", Limits(concurrency=1, queue=4, per_user=0), queue_timeout=0.01)
+        await limiter.acquire("a")
+        with pytest.raises(Rejected) as rejected:
+            await limiter.acquire("b")
+        assert rejected.value.reason == "queue_timeout"
+        limiter.release("a")
+        assert (limiter.in_flight, limiter.queued) == (0, 0)
+
+    asyncio.run(scenario())
+
+
+def test_limiter_passes_on_a_slot_handed_over_at_the_deadline(monkeypatch):
+    async def scenario():
+        limiter = Limiter("test", Limits(concurrency=1, queue=4, per_user=0), queue_timeout=5)
+        await limiter.acquire("a")
+
+        async def resolved_at_deadline(waiter, timeout):
+            limiter.release("a")
+            assert waiter.done()
+            raise asyncio.TimeoutError
+
+        monkeypatch.setattr(admission.asyncio, "wait_for", resolved_at_deadline)
+        with pytest.raises(Rejected) as rejected:
+            await limiter.acquire("b")
+        assert rejected.value.reason == "queue_timeout"
+        assert (limiter.in_flight, limiter.queued) == (0, 0)
+
+    asyncio.run(scenario())
+
+
+def test_limiter_caps_each_users_share():
+    async def scenario():
+        limiter = Limiter("test", Limits(concurrency=4, queue=4, per_user=2))
+        await limiter.acquire("greedy")
+        await limiter.acquire("greedy")
+        with pytest.raises(Rejected) as rejected:
+            await limiter.acquire("greedy")
+        assert rejected.value.status_code == 429
+        # Everyone else still gets in
+        await limiter.acquire("polite")
+        limiter.release("greedy")
+        await limiter.acquire("greedy")
+
+    asyncio.run(scenario())
+
+
+def test_requests_are_charged_to_the_token_subject():
+    token = security.create_access_token({"sub": "someone@example.com"})
+    scope = {"headers": [(b"authorization", f"Bearer {token}".encode())], "client": ("10.0.0.1", 1234)}
+    assert admission._client_key(scope) == "user:someone@example.com"
+    scope["headers"] = [(b"authorization", b"Bearer forged")]
+    assert admission._client_key(scope) == "addr:10.0.0.1"
+
+
+@pytest.fixture
+def middleware(client):
+    client.get("/health")  # builds the middleware stack
+    layer = main.app.middleware_stack
+    while not isinstance(layer, admission.AdmissionMiddleware):
+        layer = layer.app
+    return layer
+
+
+def test_full_routes_are_shed_while_others_are_served(client, middleware, fake_hf, monkeypatch):
+    fake_hf.add("org/a", description="a", size_bytes=1)
+    monkeypatch.setitem(middleware.limiters, "upstream", Limiter("upstream", Limits(concurrency=0, queue=0, per_user=0)))
+    before = metrics.ADMISSION_REJECTED.value(route_class="upstream", reason="queue_full")
+
+    response = client.get("/datasets/org/a")
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert fake_hf.calls == []
+    assert metrics.ADMISSION_REJECTED.value(route_class="upstream", reason="queue_full") == before + 1
+
+    assert client.get("/health").status_code == 200
+    assert client.get("/datasets", params={"sort": "name"}).status_code == 503
+    assert 'admission_limit{route_class="model",limit="concurrency"}' in client.get("/metrics").text
+
+
+def test_admitted_requests_release_their_slot(client, middleware, fake_hf):
+    fake_hf.add("org/a", description="a", size_bytes=1)
+    for _ in range(3):
+        assert client.get("/datasets/org/a").status_code == 200
+    assert client.get("/datasets/org/missing").status_code == 404
+    assert middleware.limiters["upstream"].in_flight == 0
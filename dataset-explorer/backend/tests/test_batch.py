@@ -0,0 +1,65 @@
+from backend import main, models
+
+
+def test_batch_returns_items_in_request_order(client, fake_hf, db_session):
+    fake_hf.add("org/a", description="first", size_bytes=10)
+    fake_hf.add("org/b", description="second", size_bytes=20)
+    db_session.add(models.Dataset(hf_id="org/local", name="org/local"))
+    db_session.commit()
+
+    response = client.post("/datasets/batch", json={"hf_ids": ["org/b", "org/local", "org/a", "org/b"]})
+    assert response.status_code == 200
+    items = response.json()
+    assert [item["hf_id"] for item in items] == ["org/b", "org/local", "org/a"]
+    assert all(item["error"] is None for item in items)
+    assert items[0]["dataset"]["size_bytes"] == 20
+    assert items[1]["dataset"]["follower_count"] == 0
+
+    # Only the unknown datasets went upstream
+    assert sorted(call[1] for call in fake_hf.calls) == ["org/a", "org/b"]
+    assert db_session.query(models.Dataset).count() == 3
+
+
+def test_batch_reports_per_item_errors(client, fake_hf, monkeypatch):
+    monkeypatch.setattr(main, "BATCH_ITEM_TIMEOUT", 0.05)
+    fake_hf.add("org/ok")
+    fake_hf.add("org/slow")
+    fake_hf.delays["org/slow"] = 1
+    fake_hf.add("org/flaky")
+    fake_hf.failures["org/flaky"] = 503
+
+    response = client.post("/datasets/batch", json={"hf_ids": ["org/ok", "org/slow", "org/missing", "org/flaky"]})
+    assert response.status_code == 200
+    items = {item["hf_id"]: item for item in response.json()}
+    assert items["org/ok"]["dataset"]["hf_id"] == "org/ok"
+    assert "Timed out" in items["org/slow"]["error"]
+    assert items["org/missing"]["error"].startswith("Dataset not found")
+    # Only an upstream 404 means the dataset doesn't exist
+    assert items["org/flaky"]["error"].startswith("Upstream error")
+
+
+def test_batch_rejects_oversized_requests(client):
+    hf_ids = [f"org/{i}" for i in range(51)]
+    assert client.post("/datasets/batch", json={"hf_ids": hf_ids}).status_code == 422
+    assert client.post("/datasets/batch", json={"hf_ids": []}).status_code == 422
+
+
+def test_batch_maps_aliases_to_the_canonical_dataset(client, fake_hf, db_session):
+    # Upstream resolves both names to its canonical id, which we already store
+    fake_hf.add("org/canonical", description="same", size_bytes=5)
+    fake_hf.datasets["old-name"] = fake_hf.datasets["Org/Canonical"] = fake_hf.datasets["org/canonical"]
+    db_session.add(models.Dataset(hf_id="org/canonical", name="org/canonical"))
+    fake_hf.add("org/new")
+    fake_hf.datasets["org/new-alias"] = fake_hf.datasets["org/new"]
+    db_session.commit()
+
+    response = client.post(
+        "/datasets/batch", json={"hf_ids": ["old-name", "Org/Canonical", "org/new", "org/new-alias"]}
+    )
+    assert response.status_code == 200, response.text
+    items = response.json()
+    assert all(item["error"] is None for item in items)
+    assert {item["dataset"]["hf_id"] for item in items} == {"org/canonical", "org/new"}
+    assert items[0]["dataset"]["id"] == items[1]["dataset"]["id"]
+    assert items[2]["dataset"]["id"] == items[3]["dataset"]["id"]
+    assert db_session.query(models.Dataset).count() == 2
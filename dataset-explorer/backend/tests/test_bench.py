@@ -0,0 +1,56 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.bench import runner
+from backend.bench.__main__ import main as bench_main
+from backend.bench.simulator import SimulatorConfig, create_app
+
+
+def test_simulator_serves_the_endpoints_the_client_uses():
+    client = TestClient(create_app(SimulatorConfig(datasets=3, commits=2, latency_ms=0, jitter_ms=0)))
+
+    listed = client.get("/api/datasets", params={"limit": 2}).json()
+    assert [dataset["id"] for dataset in listed] == ["bench/dataset-00000", "bench/dataset-00001"]
+
+    info = client.get("/api/datasets/bench/dataset-00002").json()
+    assert info["id"] == "bench/dataset-00002"
+    assert len(client.get("/api/datasets/bench/dataset-00002/commits").json()) == 2
+    assert client.get("/api/datasets/bench/missing").status_code == 404
+
+
+def test_simulator_injects_errors():
+    client = TestClient(create_app(SimulatorConfig(datasets=1, latency_ms=0, jitter_ms=0, error_rate=1.0)))
+
+    assert client.get("/api/datasets").status_code == 503
+
+
+def test_compare_flags_latency_and_throughput_regressions():
+    def results(p95, rps):
+        return {"levels": [{"concurrency": 4, "latency_ms": {"p95": p95}, "throughput_rps": rps}]}
+
+    assert runner.compare(results(110, 95), results(100, 100), tolerance=0.2) == []
+    assert runner.compare(results(130, 70), results(100, 100), tolerance=0.2) == [
+        "concurrency 4: p95 100 ms -> 130 ms",
+        "concurrency 4: throughput 100 -> 70 req/s",
+    ]
+
+
+def test_percentiles_use_nearest_rank():
+    summary = runner.summarize([i / 1000 for i in range(1, 101)])
+
+    assert (summary["p50"], summary["p95"], summary["p99"], summary["max"]) == (50.0, 95.0, 99.0, 100.0)
+
+
+def test_every_mix_uses_known_operations():
+    for mix in runner.MIXES.values():
+        assert set(mix) <= set(runner.OPERATIONS)
+
+
+def test_cli_refuses_to_overwrite_its_baseline(tmp_path, monkeypatch):
+    def never(**kwargs):
+        raise AssertionError("should not run")
+
+    monkeypatch.setattr(runner, "run", never)
+    path = str(tmp_path / "results.json")
+    with pytest.raises(SystemExit):
+        bench_main(["--baseline", path, "--output", path])
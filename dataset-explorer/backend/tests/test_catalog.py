@@ -0,0 +1,153 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+import pytest
+from backend import main, models
+from backend.catalog import Catalog
+
+
+@pytest.fixture
+def datasets(db_session, user):
+    other = models.User(email="other@example.com", hashed_password="x")
+    base = datetime(2024, 1, 1)
+    rows = [
+        models.Dataset(
+            hf_id=f"org/{i}",
+            name=f"ds{i % 4}",  # duplicate names exercise the id tie-break
+            size_bytes=None if i % 5 == 0 else i * 10,
+            last_modified=base + timedelta(days=i % 3),
+        )
+        for i in range(23)
+    ]
+    db_session.add_all([other] + rows)
+    db_session.flush()
+    for dataset in rows[::2]:
+        db_session.execute(models.dataset_followers.insert().values(user_id=user.id, dataset_id=dataset.id))
+    for dataset in rows[:7]:
+        db_session.execute(models.dataset_followers.insert().values(user_id=other.id, dataset_id=dataset.id))
+    db_session.commit()
+    return rows
+
+
+def hf_ids(response):
+    assert response.status_code == 200, response.text
+    return [dataset["hf_id"] for dataset in response.json()]
+
+
+@pytest.mark.parametrize("sort", ["name", "-name", "size", "-size", "followers", "-followers", "date", "-date"])
+def test_sorting_matches_the_database_order(client, auth_headers, datasets, sort):
+    expected = []
+    cursor = None
+    while True:
+        params = {"sort": sort, "limit": 5, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/user/followed-datasets", params=params, headers=auth_headers)
+        expected += hf_ids(response)
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    response = client.get("/datasets", params={"sort": sort, "followed_by_me": True, "limit": 100}, headers=auth_headers)
+
+    assert hf_ids(response) == expected
+
+
+def test_size_and_followed_filters(client, auth_headers, datasets):
+    response = client.get("/datasets", params={"min_size": 50, "max_size": 120, "sort": "size"})
+    assert [d["size_bytes"] for d in response.json()] == [60, 70, 80, 90, 110, 120]
+
+    not_followed = hf_ids(client.get("/datasets", params={"followed_by_me": False, "limit": 100}, headers=auth_headers))
+    assert sorted(not_followed) == sorted(f"org/{i}" for i in range(1, 23, 2))
+
+    assert client.get("/datasets", params={"followed_by_me": True}).status_code == 401
+    assert client.get("/datasets", params={"sort": "popularity"}).status_code == 400
+
+
+def test_offset_and_limit_page_through_results(client, datasets):
+    everything = hf_ids(client.get("/datasets", params={"sort": "-followers", "limit": 100}))
+    page = hf_ids(client.get("/datasets", params={"sort": "-followers", "offset": 5, "limit": 5}))
+
+    assert len(everything) == 23
+    assert page == everything[5:10]
+
+
+def test_repeat_queries_run_no_sql(client, datasets, statements):
+    client.get("/datasets", params={"sort": "size"})
+    before = len(statements)
+
+    client.get("/datasets", params={"sort": "-date", "min_size": 10})
+
+    assert statements[before:] == []
+
+
+def test_local_writes_are_reflected_incrementally(client, auth_headers, datasets, fake_hf, statements):
+    client.get("/datasets", params={"sort": "name"})
+
+    client.post("/datasets/org/21/follow", headers=auth_headers)
+    fake_hf.add("org/new", description="new", size_bytes=10**9)
+    client.get("/datasets/org/new")
+    fake_hf.add("org/3", description="resized", size_bytes=5)
+    client.get("/datasets/org/3")
+
+    before = len(statements)
+    by_id = {d["hf_id"]: d for d in client.get("/datasets", params={"sort": "name", "limit": 100}).json()}
+    # One query for the changed rows and one for their follower counts
+    assert len(statements) - before == 2
+    assert by_id["org/21"]["follower_count"] == 1
+    assert by_id["org/new"]["size_bytes"] == 10**9
+    assert by_id["org/3"]["size_bytes"] == 5
+
+    client.post("/datasets/org/21/unfollow", headers=auth_headers)
+    by_id = {d["hf_id"]: d for d in client.get("/datasets", params={"sort": "name", "limit": 100}).json()}
+    assert by_id["org/21"]["follower_count"] == 0
+
+
+def test_poll_picks_up_changes_from_other_processes(client, db_session, datasets, monkeypatch):
+    client.get("/datasets", params={"sort": "name"})
+    db_session.add(models.Dataset(hf_id="org/elsewhere", name="elsewhere", size_bytes=1))
+    db_session.execute(models.dataset_followers.delete())
+    db_session.commit()
+
+    assert "org/elsewhere" not in hf_ids(client.get("/datasets", params={"sort": "name", "limit": 100}))
+
+    monkeypatch.setattr(main.catalog, "refresh_seconds", 0)
+    response = client.get("/datasets", params={"sort": "-followers", "limit": 100})
+    assert "org/elsewhere" in hf_ids(response)
+    assert {d["follower_count"] for d in response.json()} == {0}
+
+
+def test_polls_run_off_the_event_loop(client, datasets, monkeypatch):
+    on_loop = []
+    sync = main.catalog.sync
+
+    def recording_sync(db):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        sync(db)
+
+    monkeypatch.setattr(main.catalog, "sync", recording_sync)
+    client.get("/datasets", params={"sort": "name"})  # first load
+    monkeypatch.setattr(main.catalog, "refresh_seconds", 0)
+    client.get("/datasets", params={"sort": "name"})  # poll
+    assert on_loop == [False, False]
+
+
+def test_reads_are_not_blocked_by_a_sync_in_progress(db_session, datasets):
+    catalog = Catalog()
+    catalog.sync(db_session)
+    catalog.mark_dirty([datasets[0].id])
+    load = catalog._load
+    pages = []
+
+    def slow_load(*args):
+        # Another thread can still read while this sync is running SQL
+        reader = threading.Thread(target=lambda: pages.append(catalog.query("name", limit=3)))
+        reader.start()
+        reader.join(5)
+        return load(*args)
+
+    catalog._load = slow_load
+    catalog.sync(db_session)
+    assert len(pages) == 1 and len(pages[0]) == 3
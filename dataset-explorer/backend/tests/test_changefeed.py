@@ -0,0 +1,148 @@
+import asyncio
+import json
+import pytest
+from backend import main, models
+from backend.changefeed import ChangeFeed, Subscriber
+
+
+def commit(commit_id):
+    return {"id": commit_id, "title": f"commit {commit_id}", "date": "2024-01-01T00:00:00Z"}
+
+
+def test_each_followed_dataset_is_checked_once_per_round():
+    followed = {1: {10: "org/shared", 11: "org/own"}, 2: {10: "org/shared"}, 3: {}}
+    checked = []
+
+    async def check(dataset_id, hf_id):
+        checked.append(hf_id)
+        return [("commit", {"hf_id": hf_id})]
+
+    async def scenario():
+        feed = ChangeFeed(lambda user_ids: {u: followed[u] for u in user_ids}, check, interval=3600)
+        feed._run = lambda: asyncio.sleep(0)  # poll rounds are driven by hand
+        subscribers = [await feed.subscribe(user_id) for user_id in (1, 1, 2, 3)]
+        assert await feed.poll() == 2
+        received = [[s.queue.get_nowait().data["hf_id"] for _ in range(s.queue.qsize())] for s in subscribers]
+        await feed.close()
+        return received
+
+    received = asyncio.run(scenario())
+    assert sorted(checked) == ["org/own", "org/shared"]
+    assert [sorted(r) for r in received] == [["org/own", "org/shared"]] * 2 + [["org/shared"], []]
+
+
+def test_slow_subscribers_are_told_to_resync():
+    async def scenario():
+        feed = ChangeFeed(lambda user_ids: {}, None, interval=3600, queue_size=3)
+        feed._run = lambda: asyncio.sleep(0)  # poll rounds are driven by hand
+        slow, fast = await feed.subscribe(1), await feed.subscribe(2)
+        slow.datasets = fast.datasets = {10}
+        for n in range(5):
+            feed.publish(10, "commit", {"n": n})
+            if fast.queue.qsize():
+                fast.queue.get_nowait()
+        events = [slow.queue.get_nowait() for _ in range(slow.queue.qsize())]
+        await feed.close()
+        return events
+
+    events = asyncio.run(scenario())
+    assert [event.name for event in events] == ["resync", "commit"]
+    assert events[-1].data == {"n": 4}
+
+
+def test_new_subscribers_get_events_before_the_next_round():
+    async def scenario():
+        feed = ChangeFeed(lambda user_ids: {u: {10: "org/a"} for u in user_ids}, None, interval=3600)
+        feed._run = lambda: asyncio.sleep(0)  # poll rounds are driven by hand
+        subscriber = await feed.subscribe(1)
+        assert feed.publish(10, "commit", {"hf_id": "org/a"}) == 1
+        event = subscriber.queue.get_nowait()
+        await feed.close()
+        return event
+
+    assert asyncio.run(scenario()).name == "commit"
+
+
+def test_unread_streams_never_subscribe():
+    async def scenario():
+        feed = ChangeFeed(lambda user_ids: {}, None, interval=3600)
+        feed._run = lambda: asyncio.sleep(0)  # poll rounds are driven by hand
+        stream = feed.stream(1)
+        await stream.aclose()
+        return len(feed), feed._task
+
+    assert asyncio.run(scenario()) == (0, None)
+
+
+async def _next_event(messages):
+    buffered = ""
+    while "\n\n" not in buffered:
+        message = await messages.get()
+        buffered += message.get("body", b"").decode()
+    fields = dict(line.split(": ", 1) for line in buffered.strip().splitlines())
+    return fields["event"], json.loads(fields["data"])
+
+
+def test_stream_pushes_new_commits_and_metadata(db_session, user, auth_headers, fake_hf, open_stream, monkeypatch):
+    fake_hf.add("org/a", description="a", size_bytes=1, commits=[commit("c1")])
+    dataset = models.Dataset(hf_id="org/a", name="org/a", description="a", size_bytes=1)
+    db_session.add(dataset)
+    db_session.flush()
+    db_session.execute(models.dataset_followers.insert().values(user_id=user.id, dataset_id=dataset.id))
+    db_session.commit()
+    monkeypatch.setattr(main.change_feed, "interval", 3600)
+
+    def stored_commits():
+        db_session.expire_all()
+        return db_session.query(models.DatasetHistory).filter_by(dataset_id=dataset.id).count()
+
+    async def scenario():
+        messages, disconnected, task = await open_stream("/user/followed-datasets/events", auth_headers)
+        start = await messages.get()
+        assert start["status"] == 200
+        assert dict(start["headers"])[b"content-type"].startswith(b"text/event-stream")
+
+        # The first round records the existing history without announcing it
+        while stored_commits() == 0:
+            await asyncio.sleep(0.01)
+        assert messages.empty()
+
+        fake_hf.add("org/a", description="changed", size_bytes=1, commits=[commit("c2"), commit("c1")])
+        assert await main.change_feed.poll() == 1
+        events = [await _next_event(messages), await _next_event(messages)]
+
+        disconnected.set()
+        await asyncio.wait_for(task, 5)
+        return events
+
+    events = asyncio.run(asyncio.wait_for(scenario(), 10))
+    assert events[0][0] == "metadata" and events[0][1]["description"] == "changed"
+    assert events[1][0] == "commit" and events[1][1]["hf_id"] == "org/a" and events[1][1]["commit_id"] == "c2"
+    assert len(main.change_feed) == 0
+
+
+def test_stream_requires_authentication(client):
+    assert client.get("/user/followed-datasets/events").status_code == 401
+
+
+def test_changes_stored_by_requests_are_announced(client, db_session, user, auth_headers, fake_hf, monkeypatch):
+    fake_hf.add("org/a", description="a", size_bytes=1, commits=[commit("c1")])
+    dataset = models.Dataset(hf_id="org/a", name="org/a", description="a", size_bytes=1)
+    db_session.add(dataset)
+    db_session.flush()
+    db_session.add(models.DatasetHistory(dataset_id=dataset.id, commit_id="c1", commit_message="commit c1"))
+    db_session.commit()
+    subscriber = Subscriber(user.id, queue_size=10)
+    subscriber.datasets = {dataset.id}
+    monkeypatch.setattr(main.change_feed, "_subscribers", {subscriber})
+
+    # Upstream changes, and a user opens the dataset before the poller gets to it
+    fake_hf.add("org/a", description="changed", size_bytes=1, commits=[commit("c2"), commit("c1")])
+    assert client.get("/datasets/org/a/history", headers=auth_headers).status_code == 200
+    assert client.get("/datasets/org/a", headers=auth_headers).status_code == 200
+
+    events = [subscriber.queue.get_nowait() for _ in range(subscriber.queue.qsize())]
+    assert [(event.name, event.data.get("commit_id")) for event in events] == [("commit", "c2"), ("metadata", None)]
+    assert events[1].data["description"] == "changed"
+    # The poller then has nothing left to announce
+    assert asyncio.run(main._check_followed_dataset(dataset.id, "org/a")) == []
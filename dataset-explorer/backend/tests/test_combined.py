@@ -0,0 +1,45 @@
+import pytest
+from backend import models
+
+
+@pytest.fixture
+def datasets(db_session):
+    rows = [models.Dataset(hf_id=f"org/{i}", name=f"ds{i}", size_bytes=1_000_000) for i in range(500)]
+    db_session.add_all(rows)
+    db_session.commit()
+    return [row.id for row in rows]
+
+
+def test_create_combined_dataset_in_bulk(client, auth_headers, datasets, db_session, statements):
+    statements.clear()
+    response = client.post("/combined-datasets", headers=auth_headers, json={
+        "name": "everything",
+        "dataset_ids": datasets + datasets[:3],
+    })
+    assert response.status_code == 200
+    data = response.json()
+    assert [ds["id"] for ds in data["datasets"]] == datasets
+    assert data["impact_level"] == "medium"
+    assert len(statements) <= 6
+
+    stored = db_session.query(models.dataset_combinations).filter_by(parent_id=data["id"]).count()
+    assert stored == 500
+
+
+def test_missing_ids_are_reported_together(client, auth_headers, datasets):
+    for url, body in [
+        ("/combined-datasets", {"name": "broken", "dataset_ids": [datasets[0], 9998, 9999]}),
+        ("/impact-assessment", {"dataset_ids": [9998, datasets[0], 9999]}),
+    ]:
+        response = client.post(url, headers=auth_headers, json=body)
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Datasets with IDs 9998, 9999 not found"
+
+
+def test_assess_impact_uses_one_lookup(client, auth_headers, datasets, statements):
+    statements.clear()
+    response = client.post("/impact-assessment", headers=auth_headers, json={"dataset_ids": datasets[:20]})
+    assert response.status_code == 200
+    assert response.json()["level"] == "medium"
+    # auth, datasets, cache lookup, then storing the result and its members
+    assert len(statements) == 5
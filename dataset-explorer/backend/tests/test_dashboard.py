@@ -0,0 +1,49 @@
+from backend import models
+
+
+def seed(db_session, user):
+    other = models.User(email="other@example.com", hashed_password="x")
+    datasets = [models.Dataset(hf_id=f"org/{i}", name=f"ds{i}", size_bytes=i) for i in range(5)]
+    db_session.add_all([other] + datasets)
+    db_session.flush()
+    for dataset in datasets[:3]:
+        db_session.execute(models.dataset_followers.insert().values(user_id=user.id, dataset_id=dataset.id))
+    db_session.execute(models.dataset_followers.insert().values(user_id=other.id, dataset_id=datasets[0].id))
+    for n in range(2):
+        combined = models.CombinedDataset(name=f"combo{n}", created_by_id=user.id)
+        combined.datasets = datasets[n:n + 3]
+        db_session.add(combined)
+    db_session.commit()
+
+
+def test_dashboard_aggregates_user_data(client, db_session, user, auth_headers, statements):
+    seed(db_session, user)
+    statements.clear()
+
+    response = client.get("/dashboard", headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["user"]["email"] == "test@example.com"
+    counts = {ds["hf_id"]: ds["follower_count"] for ds in data["followed_datasets"]}
+    assert counts == {"org/0": 2, "org/1": 1, "org/2": 1}
+    assert [len(c["datasets"]) for c in data["combined_datasets"]] == [3, 3]
+    # Auth + followed + combined + members, regardless of how much the user owns
+    assert len(statements) <= 4
+
+
+def test_dashboard_is_cached_and_invalidated(client, fake_hf, db_session, user, auth_headers, statements):
+    seed(db_session, user)
+    client.get("/dashboard", headers=auth_headers)
+
+    statements.clear()
+    client.get("/dashboard", headers=auth_headers)
+    assert len(statements) == 1  # only the auth lookup
+
+    client.post("/datasets/org/3/follow", headers=auth_headers)
+    data = client.get("/dashboard", headers=auth_headers).json()
+    assert len(data["followed_datasets"]) == 4
+
+    combined_id = data["combined_datasets"][0]["id"]
+    client.delete(f"/combined-datasets/{combined_id}", headers=auth_headers)
+    data = client.get("/dashboard", headers=auth_headers).json()
+    assert len(data["combined_datasets"]) == 1
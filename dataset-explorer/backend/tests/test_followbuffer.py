@@ -0,0 +1,185 @@
+import asyncio
+import pytest
+from backend import main, models
+from backend.database import SessionLocal
+from backend.followbuffer import FollowBuffer
+
+
+@pytest.fixture
+def buffer(db_session):
+    # A long interval keeps the background flusher out of the way unless a test flushes
+    buffer = FollowBuffer(SessionLocal, flush_seconds=60)
+    yield buffer
+    buffer.clear()
+    buffer.close()
+
+
+@pytest.fixture
+def people(db_session):
+    users = [models.User(email=f"user{i}@example.com", hashed_password="x") for i in range(5)]
+    dataset = models.Dataset(hf_id="org/popular", name="popular")
+    db_session.add_all(users + [dataset])
+    db_session.commit()
+    return users, dataset
+
+
+def stored_followers(db_session, dataset):
+    db_session.expire_all()
+    return sorted(
+        user_id for (user_id,) in db_session.query(models.dataset_followers.c.user_id)
+            .filter(models.dataset_followers.c.dataset_id == dataset.id)
+    )
+
+
+def test_counts_are_optimistic_until_a_group_commit(db_session, buffer, people, statements):
+    users, dataset = people
+    for user in users:
+        assert buffer.follow(db_session, user.id, dataset.id)[0]
+    assert buffer.follow(db_session, users[0].id, dataset.id)[0] is False
+
+    assert buffer.follower_count(dataset.id) == 5
+    assert stored_followers(db_session, dataset) == []
+
+    before = len(statements)
+    assert buffer.flush() == 5
+    assert [s for s in statements[before:] if s.startswith("INSERT")] == [
+        "INSERT INTO dataset_followers (user_id, dataset_id) VALUES (?, ?) ON CONFLICT (user_id, dataset_id) DO NOTHING"
+    ]
+    assert stored_followers(db_session, dataset) == sorted(user.id for user in users)
+
+    buffer.unfollow(db_session, users[0].id, dataset.id)
+    buffer.unfollow(db_session, users[1].id, dataset.id)
+    assert buffer.follower_count(dataset.id) == 3
+    buffer.flush()
+    assert stored_followers(db_session, dataset) == sorted(user.id for user in users[2:])
+
+
+def test_changes_that_cancel_out_write_nothing(db_session, buffer, people, statements):
+    users, dataset = people
+    buffer.follow(db_session, users[0].id, dataset.id)
+    buffer.unfollow(db_session, users[0].id, dataset.id)
+    assert buffer.follower_count(dataset.id) == 0
+
+    before = len(statements)
+    assert buffer.flush() == 0
+    assert statements[before:] == []
+
+
+def test_failed_flush_keeps_changes_buffered(db_session, buffer, people):
+    users, dataset = people
+    _, seq = buffer.follow(db_session, users[0].id, dataset.id)
+
+    def broken():
+        raise RuntimeError("database is locked")
+
+    buffer.session_factory = broken
+    with pytest.raises(RuntimeError):
+        buffer.flush()
+    with pytest.raises(TimeoutError):
+        buffer.wait(seq, timeout=0.01)
+    assert buffer.has_pending(users[0].id)
+
+    buffer.session_factory = SessionLocal
+    buffer.flush()
+    buffer.wait(seq, timeout=0.01)
+    assert stored_followers(db_session, dataset) == [users[0].id]
+
+
+def test_flush_between_reading_and_recording_is_not_lost(db_session, buffer, people, monkeypatch):
+    users, dataset = people
+    buffer.follow(db_session, users[0].id, dataset.id)
+    read_stored = buffer._stored
+
+    def flush_then_read(db, key, pending):
+        # The flusher commits the pending follow right after _record looked at it
+        buffer.flush()
+        return read_stored(db, key, pending)
+
+    monkeypatch.setattr(buffer, "_stored", flush_then_read)
+    assert buffer.unfollow(db_session, users[0].id, dataset.id)[0] is True
+    assert buffer.follower_count(dataset.id) == 0
+    buffer.flush()
+    assert stored_followers(db_session, dataset) == []
+
+    # A repeated follow in the same window doesn't count the user twice
+    buffer.follow(db_session, users[1].id, dataset.id)
+    assert buffer.follow(db_session, users[1].id, dataset.id)[0] is False
+    assert buffer.follower_count(dataset.id) == 1
+
+
+def test_repeated_change_waits_for_the_pending_commit(db_session, buffer, people):
+    users, dataset = people
+    _, seq = buffer.follow(db_session, users[0].id, dataset.id)
+    changed, again = buffer.follow(db_session, users[0].id, dataset.id)
+    assert (changed, again) == (False, seq)
+    with pytest.raises(TimeoutError):
+        buffer.wait(again, timeout=0.01)
+
+
+def test_background_flusher_commits_within_the_interval(db_session, people):
+    users, dataset = people
+    buffer = FollowBuffer(SessionLocal, flush_seconds=0.005)
+    try:
+        _, seq = buffer.follow(db_session, users[0].id, dataset.id)
+        buffer.wait(seq, timeout=5)
+        assert stored_followers(db_session, dataset) == [users[0].id]
+
+        # close() writes whatever is still buffered
+        buffer.flush_seconds = 60
+        buffer.follow(db_session, users[1].id, dataset.id)
+    finally:
+        buffer.close()
+    assert stored_followers(db_session, dataset) == [users[0].id, users[1].id]
+
+
+def test_endpoints_read_their_own_writes(client, auth_headers, user, fake_hf):
+    fake_hf.add("org/a", description="a", size_bytes=10)
+    response = client.post("/datasets/org/a/follow", headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["follower_count"] == 1
+
+    followed = client.get("/user/followed-datasets", headers=auth_headers).json()
+    assert [d["hf_id"] for d in followed] == ["org/a"]
+    assert client.get("/dashboard", headers=auth_headers).json()["followed_datasets"][0]["follower_count"] == 1
+
+    assert client.post("/datasets/org/a/unfollow", headers=auth_headers).json()["follower_count"] == 0
+    assert client.get("/user/followed-datasets", headers=auth_headers).json() == []
+
+
+def test_sync_mode_reports_uncommitted_follows(client, auth_headers, fake_hf, monkeypatch):
+    fake_hf.add("org/a", description="a", size_bytes=10)
+
+    def timeout(seq, timeout=None):
+        raise TimeoutError()
+
+    monkeypatch.setattr(main.follow_buffer, "sync", True)
+    monkeypatch.setattr(main.follow_buffer, "wait", timeout)
+    response = client.post("/datasets/org/a/follow", headers=auth_headers)
+    assert response.status_code == 503
+
+
+def test_dataset_detail_reports_the_callers_follow_state(client, auth_headers, user, fake_hf):
+    fake_hf.add("org/a", description="a", size_bytes=10)
+    assert client.get("/datasets/org/a").json()["is_following"] is None
+    assert client.get("/datasets/org/a", headers=auth_headers).json()["is_following"] is False
+
+    assert client.post("/datasets/org/a/follow", headers=auth_headers).json()["is_following"] is True
+    # Still buffered, but the caller sees their own follow
+    assert client.get("/datasets/org/a", headers=auth_headers).json()["is_following"] is True
+    assert client.post("/datasets/org/a/unfollow", headers=auth_headers).json()["is_following"] is False
+
+
+def test_reads_flush_buffered_follows_off_the_event_loop(client, auth_headers, fake_hf, monkeypatch):
+    on_loop = []
+
+    def flush_user(user_id):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+
+    monkeypatch.setattr(main.follow_buffer, "flush_user", flush_user)
+    for url in ("/datasets?followed_by_me=true", "/user/followed-datasets", "/dashboard"):
+        assert client.get(url, headers=auth_headers).status_code == 200
+    assert on_loop == [False, False, False]
@@ -0,0 +1,69 @@
+import pytest
+from backend import main, models
+from backend.impact_cache import ImpactCache
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    cache = ImpactCache(maxsize=16)
+    monkeypatch.setattr(main, "impact_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def datasets(db_session):
+    rows = [models.Dataset(hf_id=f"org/{i}", name=f"ds{i}", description=f"about {i}", size_bytes=100) for i in range(4)]
+    db_session.add_all(rows)
+    db_session.commit()
+    return [row.id for row in rows]
+
+
+def assess(client, headers, dataset_ids, method="naive"):
+    response = client.post("/impact-assessment", headers=headers, json={"dataset_ids": dataset_ids, "method": method})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_results_are_memoized_and_persisted(client, auth_headers, datasets, fresh_cache, monkeypatch):
+    calls = []
+    naive = main.ASSESSORS["naive"]
+    monkeypatch.setitem(main.ASSESSORS, "naive", lambda ds: calls.append(ds) or naive(ds))
+
+    first = assess(client, auth_headers, datasets[:2])
+    # Order doesn't matter for the key
+    assert assess(client, auth_headers, datasets[1::-1]) == first
+    fresh_cache.memory.clear()
+    assert assess(client, auth_headers, datasets[:2]) == first
+
+    assert len(calls) == 1
+    stats = client.get("/impact-assessment/cache", headers=auth_headers).json()
+    assert stats["hits"] == 2 and stats["misses"] == 1
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
+
+
+def test_dataset_change_invalidates_only_affected_entries(client, auth_headers, datasets, fake_hf, db_session):
+    assess(client, auth_headers, datasets[:2])
+    assess(client, auth_headers, datasets[2:])
+    assert db_session.query(models.ImpactAssessmentResult).count() == 2
+
+    # Upstream description changed for org/0
+    fake_hf.add("org/0", description="rewritten", size_bytes=100)
+    assert client.get("/datasets/org/0").json()["description"] == "rewritten"
+
+    remaining = db_session.query(models.impact_assessment_datasets.c.dataset_id).all()
+    assert sorted(row[0] for row in remaining) == datasets[2:]
+
+
+def test_combined_dataset_reuses_cached_advanced_result(client, auth_headers, datasets, fresh_cache, db_session):
+    fresh_cache.store(db_session, "advanced", [main._assessment_input(ds) for ds in db_session.query(models.Dataset)], {
+        "level": "high", "explanation": "diverse", "method": "advanced", "cluster_count": 3
+    })
+    response = client.post("/combined-datasets", headers=auth_headers, json={"name": "all", "dataset_ids": datasets})
+    assert response.json()["impact_level"] == "high"
+
+    # Without a cached advanced result the naive method is used
+    response = client.post("/combined-datasets", headers=auth_headers, json={"name": "some", "dataset_ids": datasets[:2]})
+    assert response.json()["impact_level"] == "low"
+    # Reuse is opportunistic, so neither lookup counts towards the hit rate
+    stats = client.get("/impact-assessment/cache", headers=auth_headers).json()
+    assert (stats["hits"], stats["misses"]) == (0, 0)
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+import pytest
+from backend import jobs, main, models
+from backend.database import SessionLocal, engine
+
+
+@pytest.fixture
+def datasets(db_session):
+    rows = [models.Dataset(hf_id=f"org/{i}", name=f"ds{i}", description=f"about {i}", size_bytes=100) for i in range(3)]
+    db_session.add_all(rows)
+    db_session.commit()
+    return [row.id for row in rows]
+
+
+@pytest.fixture
+def gate(monkeypatch):
+    """Holds every advanced assessment until the test releases it"""
+    release = threading.Event()
+
+    def advanced(datasets, progress=None):
+        progress("encoding", 0.1)
+        release.wait(5)
+        progress("clustering", 0.8)
+        return {"level": "medium", "explanation": "two clusters", "method": "advanced", "cluster_count": 2}
+
+    monkeypatch.setattr(main.huggingface.ImpactAssessor, "advanced_assessment", advanced)
+    yield release
+    release.set()
+
+
+def wait_for(client, headers, job_id, status, stage=None):
+    for _ in range(100):
+        job = client.get(f"/impact-assessment/jobs/{job_id}", headers=headers).json()
+        if job["status"] == status and stage in (None, job["stage"]):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} never reached {status}: {job}")
+
+
+def test_job_runs_in_background_and_is_deduplicated(client, auth_headers, datasets, gate):
+    body = {"dataset_ids": datasets, "method": "advanced"}
+    response = client.post("/impact-assessment/jobs", headers=auth_headers, json=body)
+    assert response.status_code == 202
+    job = response.json()
+    assert job["status"] in ("pending", "running")
+
+    running = wait_for(client, auth_headers, job["id"], "running", stage="encoding")
+    assert running["progress"] == 0.1
+    # Same datasets in another order reuse the active job
+    duplicate = client.post("/impact-assessment/jobs", headers=auth_headers, json={**body, "dataset_ids": datasets[::-1]})
+    assert duplicate.json()["id"] == job["id"]
+
+    gate.set()
+    done = wait_for(client, auth_headers, job["id"], "done")
+    assert done["result"] == {"level": "medium", "explanation": "two clusters"}
+    assert done["progress"] == 1.0
+
+    # Finished jobs are not reused, but the result now comes from the impact cache
+    again = client.post("/impact-assessment/jobs", headers=auth_headers, json=body).json()
+    assert again["id"] != job["id"]
+    assert wait_for(client, auth_headers, again["id"], "done")["result"]["level"] == "medium"
+
+
+def test_job_events_stream_progress_then_result(client, auth_headers, datasets, gate, monkeypatch):
+    monkeypatch.setattr(main, "JOB_EVENT_INTERVAL", 0.01)
+    job = client.post("/impact-assessment/jobs", headers=auth_headers, json={"dataset_ids": datasets, "method": "advanced"}).json()
+    threading.Timer(0.2, gate.set).start()
+
+    events = []
+    with client.stream("GET", f"/impact-assessment/jobs/{job['id']}/events", headers=auth_headers) as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        for line in response.iter_lines():
+            if line.startswith("event: "):
+                events.append(line[len("event: "):])
+            elif line.startswith("data: "):
+                payload = json.loads(line[len("data: "):])
+    assert events[0] == "progress"
+    assert events[-1] == "result"
+    assert payload["result"]["level"] == "medium"
+
+
+def test_job_streams_do_not_hold_a_pooled_connection(client, auth_headers, datasets, gate, open_stream):
+    job = client.post("/impact-assessment/jobs", headers=auth_headers, json={"dataset_ids": datasets, "method": "advanced"}).json()
+    wait_for(client, auth_headers, job["id"], "running", "encoding")
+    idle = engine.pool.checkedout()
+
+    async def scenario():
+        messages, disconnected, task = await open_stream(f"/impact-assessment/jobs/{job['id']}/events", auth_headers)
+        assert (await messages.get())["status"] == 200
+        assert b"event: progress" in (await messages.get())["body"]
+        checked_out = engine.pool.checkedout()
+        disconnected.set()
+        await asyncio.wait_for(task, 5)
+        return checked_out
+
+    assert asyncio.run(scenario()) == idle
+
+
+def test_failed_job_and_ownership(client, auth_headers, datasets, db_session, monkeypatch):
+    def broken(datasets):
+        raise RuntimeError("model unavailable")
+
+    monkeypatch.setitem(main.ASSESSORS, "naive", broken)
+    job = client.post("/impact-assessment/jobs", headers=auth_headers, json={"dataset_ids": datasets}).json()
+    failed = wait_for(client, auth_headers, job["id"], "failed")
+    assert failed["error"] == "model unavailable"
+
+    other = models.User(email="other@example.com", hashed_password="x")
+    db_session.add(other)
+    db_session.commit()
+    token = main.security.create_access_token({"sub": other.email})
+    response = client.get(f"/impact-assessment/jobs/{job['id']}", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 403
+
+
+def test_jobs_are_claimed_once_and_only_stale_runs_resume(db_session, user, datasets):
+    ran = []
+
+    def runner(db, job, progress):
+        ran.append(job.id)
+        return {"level": "low", "explanation": "ok"}
+
+    queue = jobs.JobQueue(SessionLocal, runner, stale_seconds=60)
+    old = datetime.utcnow() - timedelta(minutes=5)
+    pending, live, stale = [
+        models.AssessmentJob(user_id=user.id, method="naive", dataset_ids="1", cache_key=str(i), status=status,
+                             updated_at=updated_at)
+        for i, (status, updated_at) in enumerate([("pending", old), ("running", datetime.utcnow()), ("running", old)])
+    ]
+    db_session.add_all([pending, live, stale])
+    db_session.commit()
+
+    assert queue.resume() == 2
+    queue._dispatch(pending.id)  # a second worker queueing the same job
+    queue.shutdown()
+
+    assert sorted(ran) == sorted([pending.id, stale.id])
+    db_session.expire_all()
+    assert [job.status for job in (pending, live, stale)] == ["done", "running", "done"]
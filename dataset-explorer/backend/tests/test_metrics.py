@@ -0,0 +1,62 @@
+import asyncio
+import httpx
+from backend import huggingface, metrics, models
+
+
+def sample(text, line_prefix):
+    for line in text.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+def test_histogram_renders_cumulative_buckets():
+    hist = metrics.Histogram("demo_seconds", "Demo", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3):
+        hist.observe(value, stage="x")
+    lines = hist.render()
+    assert 'demo_seconds_bucket{stage="x",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{stage="x",le="1"} 3' in lines
+    assert 'demo_seconds_bucket{stage="x",le="+Inf"} 4' in lines
+    assert 'demo_seconds_count{stage="x"} 4' in lines
+
+
+def test_metrics_endpoint_reports_routes_db_and_caches(client, db_session, auth_headers):
+    db_session.add(models.Dataset(hf_id="org/a", name="a"))
+    db_session.commit()
+    route = 'route="/user/followed-datasets"'
+    before = client.get("/metrics").text
+
+    client.get("/user/followed-datasets", headers=auth_headers)
+    client.get("/dashboard", headers=auth_headers)
+    client.get("/dashboard", headers=auth_headers)
+    text = client.get("/metrics").text
+
+    requests_before = sample(before, f'http_requests_total{{method="GET",{route},status="200"}}') or 0
+    assert sample(text, f'http_requests_total{{method="GET",{route},status="200"}}') == requests_before + 1
+    assert sample(text, f'http_request_duration_seconds_count{{method="GET",{route}}}') >= 1
+    assert sample(text, f'http_requests_in_flight{{method="GET",{route}}}') == 0
+    assert sample(text, f'db_statements_per_request_sum{{{route}}}') >= 2
+    assert sample(text, 'db_statements_total') > 0
+    assert sample(text, 'cache_requests_total{cache="dashboard",result="hit"}') >= 1
+
+
+def test_hf_client_calls_are_timed_by_method_and_status(monkeypatch):
+    def handler(request):
+        return httpx.Response(404 if request.url.path.endswith("missing") else 200, json={"id": "org/a"})
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(huggingface.httpx, "AsyncClient", lambda: real_client(transport=httpx.MockTransport(handler)))
+    hf = huggingface.HuggingFaceClient()
+    ok_before = metrics.HF_REQUESTS.value(method="get_dataset_info", status="200")
+    missing_before = metrics.HF_REQUESTS.value(method="get_dataset_info", status="404")
+
+    asyncio.run(hf.get_dataset_info("org/a"))
+    try:
+        asyncio.run(hf.get_dataset_info("org/missing"))
+    except Exception:
+        pass
+
+    assert metrics.HF_REQUESTS.value(method="get_dataset_info", status="200") == ok_before + 1
+    assert metrics.HF_REQUESTS.value(method="get_dataset_info", status="404") == missing_before + 1
+    assert metrics.HF_LATENCY.count(method="get_dataset_info") >= 2
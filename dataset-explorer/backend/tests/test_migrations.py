@@ -0,0 +1,147 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from backend import main, migrations, models
+from backend.database import insert_ignoring_conflicts
+
+
+def index_names(engine, table):
+    return {index["name"] for index in inspect(engine).get_indexes(table)}
+
+
+def test_fresh_database_is_migrated_to_the_latest_version(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+
+    assert migrations.upgrade(engine) == [step.version for step in migrations.MIGRATIONS]
+    assert migrations.upgrade(engine) == []
+    assert migrations.current_version(engine) == migrations.MIGRATIONS[-1].version
+    assert all(applied_at for _, _, applied_at in migrations.status(engine))
+    assert "ix_dataset_followers_dataset_user" in index_names(engine, "dataset_followers")
+
+
+def test_legacy_database_gets_indexes_and_duplicate_history_is_removed(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        # Roll the schema back to what create_all produced before the migrations existed
+        for name, *_ in migrations.QUERY_INDEXES:
+            conn.execute(text(f"DROP INDEX {name}"))
+        conn.execute(text("INSERT INTO datasets (id, hf_id, name) VALUES (1, 'org/a', 'a')"))
+        conn.execute(text(
+            "INSERT INTO dataset_history (dataset_id, commit_id) VALUES (1, 'c1'), (1, 'c1'), (1, 'c2')"
+        ))
+
+    migrations.upgrade(engine)
+
+    for name, table, *_ in migrations.QUERY_INDEXES:
+        assert name in index_names(engine, table)
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT id, commit_id FROM dataset_history ORDER BY id")).all()
+    assert rows == [(1, "c1"), (3, "c2")]
+
+
+def test_upgrade_stops_at_target(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'partial.db'}")
+
+    assert migrations.upgrade(engine, target=1) == [1]
+    assert [applied_at is not None for _, _, applied_at in migrations.status(engine)][:2] == [True, False]
+
+
+def test_follow_sort_keys_are_backfilled_and_kept_current(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'v2.db'}")
+    migrations.upgrade(engine, target=2)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, email, hashed_password) VALUES (1, 'a', 'x'), (2, 'b', 'x')"))
+        conn.execute(text("INSERT INTO datasets (id, hf_id, name, size_bytes) VALUES (1, 'org/a', 'a', NULL), (2, 'org/b', 'b', 5)"))
+        conn.execute(text("INSERT INTO dataset_followers (user_id, dataset_id) VALUES (1, 1), (1, 2), (2, 2)"))
+
+    migrations.upgrade(engine)
+
+    assert not {"ix_datasets_name_id", "ix_datasets_size_bytes_id"} & index_names(engine, "datasets")
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO dataset_followers (user_id, dataset_id) VALUES (2, 1)"))
+        conn.execute(text("DELETE FROM dataset_followers WHERE user_id = 1 AND dataset_id = 2"))
+        conn.execute(text("UPDATE datasets SET size_bytes = 7 WHERE id = 2"))
+        counts = conn.execute(text("SELECT id, follower_count FROM datasets ORDER BY id")).all()
+        keys = conn.execute(text(
+            "SELECT user_id, dataset_id, dataset_name, dataset_size FROM dataset_followers ORDER BY user_id, dataset_id"
+        )).all()
+    assert counts == [(1, 2), (2, 1)]
+    assert keys == [(1, 1, "a", 0), (2, 1, "a", 0), (2, 2, "b", 7)]
+
+
+def test_add_column_is_skipped_when_present(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'columns.db'}")
+    migrations.upgrade(engine)
+
+    with engine.begin() as conn:
+        migrations.add_column(conn, "datasets", "downloads INTEGER")
+        migrations.add_column(conn, "datasets", "downloads INTEGER")
+
+    assert "downloads" in {column["name"] for column in inspect(engine).get_columns("datasets")}
+
+
+def test_history_refresh_tolerates_commits_stored_concurrently(db_session):
+    dataset = models.Dataset(hf_id="org/a", name="a")
+    db_session.add(dataset)
+    db_session.commit()
+    commits = [
+        {"id": "c1", "title": "first", "date": "2024-01-01T00:00:00Z"},
+        {"id": "c2", "title": "second", "date": "2024-01-02T00:00:00Z"},
+    ]
+    # Another request stored c1 after this one read the known commits
+    db_session.add(models.DatasetHistory(dataset_id=dataset.id, commit_id="c1", commit_message="first"))
+    db_session.flush()
+    original_query = db_session.query
+
+    def query_without_existing(*entities):
+        result = original_query(*entities)
+        if entities == (models.DatasetHistory,) and not hasattr(query_without_existing, "done"):
+            query_without_existing.done = True
+            return result.filter(False)
+        return result
+
+    db_session.query = query_without_existing
+    history, created = main._store_history(db_session, dataset.id, commits)
+
+    assert [item.commit_id for item in history] == ["c1", "c2"]
+    assert [item.commit_id for item in created] == ["c2"]
+
+
+def test_migrated_schema_matches_the_models(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    migrations.upgrade(engine)
+
+    inspector = inspect(engine)
+    for table in models.Base.metadata.sorted_tables:
+        assert {column["name"] for column in inspector.get_columns(table.name)} == set(table.columns.keys())
+        assert index_names(engine, table.name) == {index.name for index in table.indexes}
+
+
+def test_version_one_is_the_schema_before_query_indexes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'v1.db'}")
+    migrations.upgrade(engine, target=1)
+
+    for name, table, *_ in migrations.QUERY_INDEXES:
+        assert name not in index_names(engine, table)
+
+
+def test_insert_ignoring_conflicts_skips_existing_keys(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'insert.db'}")
+    migrations.upgrade(engine)
+    table = models.dataset_followers
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, email, hashed_password) VALUES (1, 'a', 'x'), (2, 'b', 'x')"))
+        conn.execute(text("INSERT INTO datasets (id, hf_id, name) VALUES (1, 'org/a', 'a')"))
+        conn.execute(text("INSERT INTO dataset_followers (user_id, dataset_id) VALUES (1, 1)"))
+        conn.execute(
+            insert_ignoring_conflicts("sqlite", table, ["user_id", "dataset_id"], ["user_id", "dataset_id"]),
+            [{"user_id": 1, "dataset_id": 1}, {"user_id": 2, "dataset_id": 1}]
+        )
+        rows = conn.execute(text("SELECT user_id, dataset_id FROM dataset_followers ORDER BY user_id")).all()
+    assert rows == [(1, 1), (2, 1)]
+
+
+def test_insert_ignoring_conflicts_refuses_other_databases():
+    with pytest.raises(ValueError, match="SQLite and PostgreSQL"):
+        insert_ignoring_conflicts("mysql", models.dataset_followers, ["user_id", "dataset_id"], ["user_id", "dataset_id"])
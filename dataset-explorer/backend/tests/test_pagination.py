@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event
+from backend import models
+from backend.database import engine
+
+
+@pytest.fixture
+def followed(db_session, user):
+    other = models.User(email="other@example.com", hashed_password="x")
+    base = datetime(2024, 1, 1)
+    datasets = [
+        models.Dataset(
+            hf_id=f"org/{i}",
+            name=f"ds{i % 4}",  # duplicate names exercise the id tie-break
+            size_bytes=None if i % 5 == 0 else i * 10,
+            last_modified=base + timedelta(days=i % 3),
+        )
+        for i in range(23)
+    ]
+    db_session.add_all([other] + datasets)
+    db_session.flush()
+    for dataset in datasets:
+        db_session.execute(models.dataset_followers.insert().values(user_id=user.id, dataset_id=dataset.id))
+    for dataset in datasets[:7]:
+        db_session.execute(models.dataset_followers.insert().values(user_id=other.id, dataset_id=dataset.id))
+    db_session.commit()
+    return datasets
+
+
+def walk(client, url, headers, limit, sort):
+    pages, cursor = [], None
+    while True:
+        params = {"limit": limit, "sort": sort}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(url, params=params, headers=headers)
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+
+
+@pytest.mark.parametrize("sort,key", [
+    ("name", lambda d: (d["name"], d["id"])),
+    ("-followers", lambda d: (-d["follower_count"], -d["id"])),
+    ("size", lambda d: (d["size_bytes"] or 0, d["id"])),
+    ("-date", lambda d: (-datetime.fromisoformat(d["last_modified"]).timestamp(), -d["id"])),
+])
+def test_followed_pages_cover_everything_in_order(client, auth_headers, followed, sort, key):
+    pages = walk(client, "/user/followed-datasets", auth_headers, limit=5, sort=sort)
+    assert [len(page) for page in pages] == [5, 5, 5, 5, 3]
+    items = [item for page in pages for item in page]
+    assert items == sorted(items, key=key)
+    assert len({item["id"] for item in items}) == 23
+
+
+@pytest.mark.parametrize("sort,index", [
+    ("name", "ix_dataset_followers_user_name"),
+    ("-size", "ix_dataset_followers_user_size"),
+    ("date", "ix_dataset_followers_user_modified"),
+])
+def test_followed_pages_are_read_off_a_per_user_index(client, auth_headers, followed, sort, index):
+    seen = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM datasets JOIN dataset_followers" in statement:
+            seen.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        cursor = client.get(f"/user/followed-datasets?limit=5&sort={sort}", headers=auth_headers).headers["X-Next-Cursor"]
+        client.get(f"/user/followed-datasets?limit=5&sort={sort}&cursor={cursor}", headers=auth_headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert len(seen) == 2
+    with engine.connect() as conn:
+        for statement, parameters in seen:
+            plan = " / ".join(row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters))
+            assert index in plan
+            assert "TEMP B-TREE" not in plan
+
+
+def test_followed_pages_track_dataset_and_follower_changes(client, db_session, auth_headers, user, followed):
+    followed[3].size_bytes = 10**6
+    db_session.execute(models.dataset_followers.delete().where(models.dataset_followers.c.user_id != user.id))
+    db_session.commit()
+
+    items = walk(client, "/user/followed-datasets", auth_headers, limit=50, sort="-size")[0]
+    assert items[0]["id"] == followed[3].id
+    assert {item["follower_count"] for item in items} == {1}
+
+
+def test_followed_rejects_bad_sort_and_cursor(client, auth_headers, followed):
+    assert client.get("/user/followed-datasets?sort=bogus", headers=auth_headers).status_code == 400
+    assert client.get("/user/followed-datasets?cursor=garbage", headers=auth_headers).status_code == 400
+
+    cursor = client.get("/user/followed-datasets?limit=2", headers=auth_headers).headers["X-Next-Cursor"]
+    response = client.get(f"/user/followed-datasets?sort=size&cursor={cursor}", headers=auth_headers)
+    assert response.status_code == 400
+
+
+def test_combined_pages_sorted_by_total_size(client, db_session, auth_headers, user, followed):
+    for n in range(7):
+        combined = models.CombinedDataset(name=f"combo{n}", created_by_id=user.id)
+        combined.datasets = followed[n:n + 2 + n % 3]
+        db_session.add(combined)
+    db_session.commit()
+
+    pages = walk(client, "/combined-datasets", auth_headers, limit=3, sort="-size")
+    assert [len(page) for page in pages] == [3, 3, 1]
+    totals = [sum(ds["size_bytes"] or 0 for ds in item["datasets"]) for page in pages for item in page]
+    assert totals == sorted(totals, reverse=True)
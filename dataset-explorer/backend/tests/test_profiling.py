@@ -0,0 +1,141 @@
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+
+import pytest
+from backend import models, profiling, security
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def admin(monkeypatch, user):
+    monkeypatch.setattr(security, "ADMIN_EMAILS", {"test@example.com"})
+    return user
+
+
+def test_admin_can_profile_a_request(client, auth_headers, admin, profile_dir):
+    response = client.get("/user/followed-datasets", headers={**auth_headers, "X-Profile": "sampling"})
+
+    profile_id = response.headers["X-Profile-Id"]
+    assert sorted(p.name for p in profile_dir.iterdir()) == [
+        f"{profile_id}.collapsed.txt", f"{profile_id}.speedscope.json"
+    ]
+    speedscope = json.loads((profile_dir / f"{profile_id}.speedscope.json").read_text())
+    assert speedscope["name"] == "GET /user/followed-datasets"
+
+    listed = client.get("/admin/profiles", headers=auth_headers).json()
+    assert set(listed) == {f"{profile_id}.collapsed.txt", f"{profile_id}.speedscope.json"}
+    download = client.get(f"/admin/profiles/{profile_id}.speedscope.json", headers=auth_headers)
+    assert download.json() == speedscope
+
+
+def test_cprofile_mode_writes_pstats(client, auth_headers, admin, profile_dir):
+    response = client.get("/dashboard", headers={**auth_headers, "X-Profile": "cprofile"})
+
+    path = profile_dir / f"{response.headers['X-Profile-Id']}.prof"
+    assert pstats.Stats(str(path)).total_calls > 0
+
+
+@pytest.mark.skipif(sys.version_info < (3, 12), reason="cProfile follows other threads from Python 3.12")
+def test_cprofile_covers_sync_routes_run_on_the_thread_pool(client, auth_headers, admin, profile_dir, db_session):
+    dataset = models.Dataset(hf_id="org/a", name="a", size_bytes=10)
+    db_session.add(dataset)
+    db_session.commit()
+    response = client.post(
+        "/impact-assessment", headers={**auth_headers, "X-Profile": "cprofile"},
+        json={"dataset_ids": [dataset.id], "method": "naive"}
+    )
+    assert response.status_code == 200, response.text
+
+    stats = pstats.Stats(str(profile_dir / f"{response.headers['X-Profile-Id']}.prof"))
+    assert "naive_assessment" in {name for _, _, name in stats.stats}
+
+
+def test_profile_header_is_ignored_for_non_admins(client, auth_headers, profile_dir):
+    response = client.get("/dashboard", headers={**auth_headers, "X-Profile": "sampling"})
+
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+    assert list(profile_dir.iterdir()) == []
+    assert client.get("/admin/profiles", headers=auth_headers).status_code == 403
+
+
+def test_only_one_profile_runs_at_a_time(client, auth_headers, admin, profile_dir):
+    assert profiling._slots.acquire(blocking=False)
+    try:
+        response = client.get("/dashboard", headers={**auth_headers, "X-Profile": "sampling"})
+    finally:
+        profiling._slots.release()
+
+    assert response.status_code == 200
+    assert response.headers["X-Profile-Id"] == "busy"
+    assert list(profile_dir.iterdir()) == []
+
+
+def test_only_one_cprofile_runs_at_a_time(client, auth_headers, admin, profile_dir, monkeypatch):
+    monkeypatch.setattr(profiling, "_slots", threading.BoundedSemaphore(2))
+    assert profiling._cprofile_slot.acquire(blocking=False)
+    try:
+        busy = client.get("/dashboard", headers={**auth_headers, "X-Profile": "cprofile"})
+        sampled = client.get("/dashboard", headers={**auth_headers, "X-Profile": "sampling"})
+    finally:
+        profiling._cprofile_slot.release()
+
+    assert busy.headers["X-Profile-Id"] == "busy"
+    assert sampled.headers["X-Profile-Id"] != "busy"
+    assert profiling._slots.acquire(blocking=False) and profiling._slots.acquire(blocking=False)
+
+
+def test_sampled_requests_are_profiled_without_telling_the_client(client, profile_dir, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 1.0)
+
+    response = client.get("/health")
+
+    assert "X-Profile-Id" not in response.headers
+    assert len(list(profile_dir.glob("*.collapsed.txt"))) == 1
+
+
+def test_sampler_records_busy_threads_and_stops_at_its_deadline():
+    stop = threading.Event()
+
+    def spin():
+        while not stop.is_set():
+            sum(range(1000))
+
+    worker = threading.Thread(target=spin, name="spinner")
+    worker.start()
+    sampler = profiling.Sampler(interval=0.001, max_seconds=0.1)
+    try:
+        sampler.start()
+        time.sleep(0.3)
+        sampler.stop()
+    finally:
+        stop.set()
+        worker.join()
+
+    assert sampler.samples
+    assert any(line.startswith("spinner;") and "spin (test_profiling.py" in line
+               for line in sampler.collapsed().splitlines())
+    # Stopped by its own deadline, well before stop() was called
+    assert sum(sampler.samples.values()) < 0.3 / 0.001 / 2
+
+
+def test_prune_keeps_newest_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_MAX_FILES", 2)
+    for age, name in enumerate(["c", "b", "a"]):
+        path = tmp_path / name
+        path.write_text("")
+        mtime = time.time() - age * 10
+        os.utime(path, (mtime, mtime))
+
+    profiling.prune(str(tmp_path))
+
+    assert profiling.list_profiles(str(tmp_path)) == ["c", "b"]
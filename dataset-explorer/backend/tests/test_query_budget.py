@@ -0,0 +1,73 @@
+import logging
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from backend import metrics, models
+from backend.database import SessionLocal
+
+
+@pytest.fixture
+def catalog(db_session, user, fake_hf):
+    """20 upstream datasets (half already known locally), each with commits, all followed by the user"""
+    for i in range(20):
+        fake_hf.add(f"org/{i}", description=f"about {i}", size_bytes=i, commits=[
+            {"id": f"c{i}-{n}", "title": f"commit {n}", "date": "2024-01-01T00:00:00Z"} for n in range(10)
+        ])
+    known = [models.Dataset(hf_id=f"org/{i}", name=f"org/{i}", description=f"about {i}", size_bytes=i) for i in range(10)]
+    db_session.add_all(known)
+    db_session.flush()
+    for dataset in known:
+        db_session.execute(models.dataset_followers.insert().values(user_id=user.id, dataset_id=dataset.id))
+    combined = models.CombinedDataset(name="combo", created_by_id=user.id)
+    combined.datasets = known[:5]
+    db_session.add(combined)
+    db_session.commit()
+    return combined.id
+
+
+# Statement budgets per endpoint; they must not grow with the number of datasets or commits
+BUDGETS = [
+    ("GET", "/datasets", None, 5),
+    ("GET", "/datasets/org/3", None, 4),  # includes the caller's follow state
+    ("GET", "/datasets/org/3/history", None, 5),
+    ("GET", "/user/followed-datasets", None, 2),
+    ("GET", "/combined-datasets", None, 3),
+    ("GET", "/combined-datasets/{combined}", None, 3),
+    ("GET", "/dashboard", None, 4),
+    ("POST", "/datasets/batch", {"hf_ids": [f"org/{i}" for i in range(20)]}, 5),
+    ("POST", "/impact-assessment", {"dataset_ids": list(range(1, 11))}, 5),
+]
+
+
+@pytest.mark.parametrize("method,url,body,limit", BUDGETS)
+def test_endpoint_query_budget(client, auth_headers, catalog, query_budget, method, url, body, limit):
+    with query_budget(limit):
+        response = client.request(method, url.format(combined=catalog), json=body, headers=auth_headers)
+    assert response.status_code == 200, response.text
+
+
+def test_query_count_headers(client, auth_headers, catalog):
+    response = client.get("/dashboard", headers=auth_headers)
+    assert int(response.headers["X-DB-Query-Count"]) == 4
+    assert float(response.headers["X-DB-Time-Ms"]) >= 0
+
+
+def test_repeated_statements_are_logged_as_n_plus_one(db_session, caplog):
+    app = FastAPI()
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/items")
+    def items():
+        db = SessionLocal()
+        try:
+            for i in range(metrics.N_PLUS_ONE_THRESHOLD):
+                db.execute(text("SELECT :i"), {"i": i})
+        finally:
+            db.close()
+        return []
+
+    with caplog.at_level(logging.WARNING, logger="backend.metrics"):
+        response = TestClient(app).get("/items")
+    assert response.headers["X-DB-Query-Count"] == str(metrics.N_PLUS_ONE_THRESHOLD)
+    assert any("Possible N+1 on GET /items" in record.getMessage() for record in caplog.records)
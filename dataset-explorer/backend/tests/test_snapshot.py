@@ -0,0 +1,128 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, create_mock_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import migrations, models, snapshot
+
+
+@pytest.fixture
+def source(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'source.db'}")
+    migrations.upgrade(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        models.Dataset(id=1, hf_id="org/a", name="a", description="héllo ✓", size_bytes=10,
+                       last_modified=datetime(2024, 1, 2, 3, 4, 5, 6789)),
+        models.Dataset(id=7, hf_id="org/b", name="b", description=None, size_bytes=None, last_modified=None),
+        models.DatasetHistory(id=3, dataset_id=1, commit_id="c1", commit_message="", timestamp=datetime(2024, 1, 1)),
+        models.DatasetHistory(id=4, dataset_id=1, commit_id="c2", commit_message=None, timestamp=datetime(2024, 1, 2)),
+        models.ImpactAssessmentResult(id=5, cache_key="k", method="naive", level="low", explanation="small"),
+    ])
+    session.flush()
+    session.execute(models.impact_assessment_datasets.insert(), [
+        {"assessment_id": 5, "dataset_id": 7}, {"assessment_id": 5, "dataset_id": 1},
+    ])
+    session.commit()
+    session.close()
+    return engine
+
+
+def dump(engine):
+    with engine.connect() as conn:
+        return {
+            table: conn.exec_driver_sql(f"SELECT * FROM {table} ORDER BY {snapshot.ORDER_BY.get(table, 'id')}").all()
+            for table in snapshot.TABLES
+        }
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_round_trip_preserves_every_value(source, tmp_path, compress):
+    path = str(tmp_path / "catalog.npz")
+    assert snapshot.export_snapshot(path, source, compress=compress) == {"datasets": 2, "dataset_history": 2}
+
+    target = create_engine(f"sqlite:///{tmp_path / 'target.db'}")
+    assert snapshot.import_snapshot(path, target) == {"datasets": 2, "dataset_history": 2}
+
+    copied, original = dump(target), dump(source)
+    assert copied["datasets"] == original["datasets"]
+    assert copied["dataset_history"] == original["dataset_history"]
+    assert copied["impact_assessments"] == copied["impact_assessment_datasets"] == []
+
+    session = sessionmaker(bind=target)()
+    dataset = session.query(models.Dataset).filter_by(hf_id="org/a").one()
+    assert dataset.last_modified == datetime(2024, 1, 2, 3, 4, 5, 6789)
+    assert [commit.commit_id for commit in dataset.history] == ["c1", "c2"]
+    session.close()
+
+
+def test_uncompressed_snapshots_are_memory_mapped(source, tmp_path):
+    path = str(tmp_path / "catalog.npz")
+    snapshot.export_snapshot(path, source, compress=False)
+
+    arrays = snapshot.open_arrays(path)
+    assert isinstance(arrays["datasets.id"], np.memmap)
+    assert arrays["datasets.id"].tolist() == [1, 7]
+    assert snapshot.read_meta(arrays)["schema_version"] == migrations.MIGRATIONS[-1].version
+
+
+def test_assessments_are_optional(source, tmp_path):
+    path = str(tmp_path / "catalog.npz")
+    snapshot.export_snapshot(path, source, with_assessments=True)
+    target = create_engine(f"sqlite:///{tmp_path / 'target.db'}")
+    snapshot.import_snapshot(path, target)
+    assert dump(target)["impact_assessments"] == dump(source)["impact_assessments"]
+    assert dump(target)["impact_assessment_datasets"] == [(5, 1), (5, 7)]
+
+
+def test_import_refuses_a_database_with_a_catalog(source, tmp_path):
+    path = str(tmp_path / "catalog.npz")
+    snapshot.export_snapshot(path, source)
+
+    with pytest.raises(ValueError):
+        snapshot.import_snapshot(path, source)
+    assert snapshot.load_if_empty(path, source) is False
+    assert len(dump(source)["datasets"]) == 2
+
+
+def test_cli_exports_and_imports(source, tmp_path, monkeypatch, capsys):
+    path = str(tmp_path / "catalog.npz")
+    monkeypatch.setattr(snapshot, "default_engine", source)
+    assert snapshot.main(["export", path, "--no-compress"]) == 0
+    assert "Exported 2 datasets, 2 dataset_history" in capsys.readouterr().out
+    assert snapshot.main(["import", path]) == 1
+
+
+def test_import_refuses_another_schema_version(source, tmp_path):
+    path = str(tmp_path / "catalog.npz")
+    snapshot.export_snapshot(path, source)
+
+    # A database already migrated past the snapshot's schema
+    target = create_engine(f"sqlite:///{tmp_path / 'target.db'}")
+    migrations.upgrade(target)
+    newer = migrations.MIGRATIONS[-1].version + 1
+    with target.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO schema_version VALUES (?, 'from the future', CURRENT_TIMESTAMP)", (newer,))
+
+    with pytest.raises(ValueError, match=f"the database has {newer}"):
+        snapshot.import_snapshot(path, target)
+    assert dump(target)["datasets"] == []
+
+
+def test_other_databases_are_refused(source, tmp_path):
+    path = str(tmp_path / "catalog.npz")
+    snapshot.export_snapshot(path, source)
+    target = create_mock_engine("postgresql://", executor=None)
+
+    with pytest.raises(ValueError, match="only work with SQLite"):
+        snapshot.export_snapshot(path, target)
+    assert snapshot.load_if_empty(path, target) is False
+
+
+def test_corrupt_snapshot_is_skipped_at_startup(tmp_path):
+    path = tmp_path / "catalog.npz"
+    path.write_bytes(b"not a zip archive")
+    target = create_engine(f"sqlite:///{tmp_path / 'target.db'}")
+    assert snapshot.load_if_empty(str(path), target) is False
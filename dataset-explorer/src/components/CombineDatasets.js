@@ -58,17 +58,40 @@ export default function CombineDatasets() {
     
     try {
       const token = localStorage.getItem('token');
-      const res = await fetch('/impact-assessment', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-          'Authorization': `Bearer ${token}`
-        },
-        body: JSON.stringify({
-          dataset_ids: selectedDatasets.map(d => d.id),
-          method: impactMethod
-        })
+      const body = JSON.stringify({
+        dataset_ids: selectedDatasets.map(d => d.id),
+        method: impactMethod
       });
+      const headers = {
+        'Content-Type': 'application/json',
+        'Authorization': `Bearer ${token}`
+      };
+      
+      if (impactMethod === 'advanced') {
+        // Advanced assessments can take a while, so they run as a background job we poll
+        const jobRes = await fetch('/impact-assessment/jobs', { method: 'POST', headers, body });
+        if (!jobRes.ok) {
+          throw new Error('Failed to assess impact');
+        }
+        
+        let job = await jobRes.json();
+        while (job.status === 'pending' || job.status === 'running') {
+          await new Promise(resolve => setTimeout(resolve, 1000));
+          const pollRes = await fetch(`/impact-assessment/jobs/${job.id}`, { headers });
+          if (!pollRes.ok) {
+            throw new Error('Failed to assess impact');
+          }
+          job = await pollRes.json();
+        }
+        
+        if (job.status === 'failed') {
+          throw new Error(job.error || 'Failed to assess impact');
+        }
+        setImpactAssessment(job.result);
+        return;
+      }
+      
+      const res = await fetch('/impact-assessment', { method: 'POST', headers, body });
       
       if (!res.ok) {
         throw new Error('Failed to assess impact');
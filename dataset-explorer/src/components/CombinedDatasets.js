@@ -7,6 +7,7 @@ export default function CombinedDatasets() {
   const [combinations, setCombinations] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
 
   useEffect(() => {
     // Check if user is logged in
@@ -19,11 +20,14 @@ export default function CombinedDatasets() {
     fetchCombinedDatasets();
   }, [navigate]);
 
-  const fetchCombinedDatasets = async () => {
+  const fetchCombinedDatasets = async (cursor = null) => {
     setLoading(true);
     try {
       const token = localStorage.getItem('token');
-      const res = await fetch('/combined-datasets', {
+      const url = cursor
+        ? `/combined-datasets?cursor=${encodeURIComponent(cursor)}`
+        : '/combined-datasets';
+      const res = await fetch(url, {
         headers: {
           'Authorization': `Bearer ${token}`
         }
@@ -34,7 +38,9 @@ export default function CombinedDatasets() {
       }
       
       const data = await res.json();
-      setCombinations(data);
+      // Results are paginated; the next page is requested with the returned cursor
+      setCombinations(prev => (cursor ? [...prev, ...data] : data));
+      setNextCursor(res.headers.get('X-Next-Cursor'));
     } catch (err) {
       setError('Error loading combined datasets: ' + err.message);
     } finally {
@@ -78,7 +84,7 @@ export default function CombinedDatasets() {
     }
   };
 
-  if (loading) {
+  if (loading && combinations.length === 0) {
     return <div className="loading-container">Loading combined datasets...</div>;
   }
 
@@ -158,6 +164,16 @@ export default function CombinedDatasets() {
           ))}
         </div>
       )}
+
+      {nextCursor && (
+        <button
+          onClick={() => fetchCombinedDatasets(nextCursor)}
+          className="primary-btn"
+          disabled={loading}
+        >
+          {loading ? 'Loading...' : 'Load More'}
+        </button>
+      )}
     </div>
   );
 }
\ No newline at end of file
@@ -38,34 +38,16 @@ export default function Dashboard() {
     try {
       const token = localStorage.getItem('token');
       
-      // Fetch user profile
-      const profileRes = await fetch('/profile', {
+      // Profile, followed and combined datasets come back in a single request
+      const res = await fetch('/dashboard', {
         headers: { 'Authorization': `Bearer ${token}` }
       });
       
-      if (profileRes.ok) {
-        const profileData = await profileRes.json();
-        setUserEmail(profileData.email);
-      }
-      
-      // Fetch followed datasets
-      const followedRes = await fetch('/user/followed-datasets', {
-        headers: { 'Authorization': `Bearer ${token}` }
-      });
-      
-      if (followedRes.ok) {
-        const followedData = await followedRes.json();
-        setFollowedDatasets(followedData);
-      }
-      
-      // Fetch combined datasets
-      const combinedRes = await fetch('/combined-datasets', {
-        headers: { 'Authorization': `Bearer ${token}` }
-      });
-      
-      if (combinedRes.ok) {
-        const combinedData = await combinedRes.json();
-        setCombinedDatasets(combinedData);
+      if (res.ok) {
+        const data = await res.json();
+        setUserEmail(data.user.email);
+        setFollowedDatasets(data.followed_datasets);
+        setCombinedDatasets(data.combined_datasets);
       }
       
       setError(null);
@@ -34,17 +34,8 @@ export default function DatasetDetail() {
       const data = await res.json();
       setDataset(data);
       
-      // Check if user follows this dataset
-      if (isLoggedIn) {
-        const followedRes = await fetch('/user/followed-datasets', {
-          headers: { 'Authorization': `Bearer ${token}` }
-        });
-        
-        if (followedRes.ok) {
-          const followedData = await followedRes.json();
-          setIsFollowing(followedData.some(d => d.id === data.id));
-        }
-      }
+      // The detail response says whether the logged-in user follows this dataset
+      setIsFollowing(!!data.is_following);
       
       // Add to selected datasets for potential combination
       if (localStorage.getItem('selectedDatasets')) {
@@ -58,7 +49,7 @@ export default function DatasetDetail() {
     } finally {
       setLoading(false);
     }
-  }, [hfId, isLoggedIn]);
+  }, [hfId]);
 
   useEffect(() => {
     const token = localStorage.getItem('token');
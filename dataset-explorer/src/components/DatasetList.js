@@ -11,6 +11,7 @@ export default function DatasetList() {
   const [followingStatus, setFollowingStatus] = useState({});
   const [page, setPage] = useState(0);
   const [searchTerm, setSearchTerm] = useState('');
+  const [sort, setSort] = useState('');
   const [isLoggedIn, setIsLoggedIn] = useState(false);
   const [hasMorePages, setHasMorePages] = useState(false);
 
@@ -26,6 +27,10 @@ export default function DatasetList() {
         if (searchTerm) {
           url += `&search=${encodeURIComponent(searchTerm)}`;
         }
+        // Sorting browses the local catalog instead of HuggingFace's order
+        if (sort) {
+          url += `&sort=${encodeURIComponent(sort)}`;
+        }
         const res = await fetch(url, { headers });
         if (!res.ok) throw new Error('Failed to fetch datasets');
         const data = await res.json();
@@ -41,7 +46,7 @@ export default function DatasetList() {
     const token = localStorage.getItem('token');
     setIsLoggedIn(!!token);
     fetchDatasets();
-  }, [page, searchTerm]);
+  }, [page, searchTerm, sort]);
 
   // Remove local filtering and slicing, since backend now paginates
   const datasetsToShow = allDatasets;
@@ -139,6 +144,13 @@ export default function DatasetList() {
             />
             <button type="submit">Search</button>
           </form>
+          <select value={sort} onChange={e => { setSort(e.target.value); setPage(0); }}>
+            <option value="">HuggingFace order</option>
+            <option value="name">Name</option>
+            <option value="-followers">Most followed</option>
+            <option value="-size">Largest</option>
+            <option value="-date">Recently updated</option>
+          </select>
         </div>
       </div>
 
@@ -7,6 +7,8 @@ export default function FollowedDatasets() {
   const [datasets, setDatasets] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [newCommits, setNewCommits] = useState({});
 
   useEffect(() => {
     // Check if user is logged in
@@ -19,11 +21,72 @@ export default function FollowedDatasets() {
     fetchFollowedDatasets();
   }, []);
 
-  const fetchFollowedDatasets = async () => {
+  // Live updates for followed datasets: new commits and metadata changes are pushed by the server
+  useEffect(() => {
+    const token = localStorage.getItem('token');
+    if (!token || typeof window.ReadableStream === 'undefined') {
+      return;
+    }
+    const controller = new AbortController();
+
+    const handleEvent = (event, data) => {
+      if (event === 'commit') {
+        setNewCommits(prev => ({ ...prev, [data.hf_id]: (prev[data.hf_id] || 0) + 1 }));
+      } else if (event === 'metadata') {
+        setDatasets(prev => prev.map(ds => (ds.id === data.id ? { ...ds, ...data } : ds)));
+      } else if (event === 'resync') {
+        fetchFollowedDatasets();
+      }
+    };
+
+    const listen = async () => {
+      const res = await fetch('/user/followed-datasets/events', {
+        headers: { 'Authorization': `Bearer ${token}` },
+        signal: controller.signal
+      });
+      if (!res.ok || !res.body) {
+        return;
+      }
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffered = '';
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) {
+          return;
+        }
+        buffered += decoder.decode(value, { stream: true });
+        const blocks = buffered.split('\n\n');
+        buffered = blocks.pop();
+        blocks.forEach(block => {
+          const fields = {};
+          block.split('\n').forEach(line => {
+            const separator = line.indexOf(': ');
+            if (separator > 0) {
+              fields[line.slice(0, separator)] = line.slice(separator + 2);
+            }
+          });
+          if (fields.event && fields.data) {
+            handleEvent(fields.event, JSON.parse(fields.data));
+          }
+        });
+      }
+    };
+
+    listen().catch(() => {
+      // Live updates are best effort; the list still works without them
+    });
+    return () => controller.abort();
+  }, []);
+
+  const fetchFollowedDatasets = async (cursor = null) => {
     setLoading(true);
     try {
       const token = localStorage.getItem('token');
-      const res = await fetch('/user/followed-datasets', {
+      const url = cursor
+        ? `/user/followed-datasets?cursor=${encodeURIComponent(cursor)}`
+        : '/user/followed-datasets';
+      const res = await fetch(url, {
         headers: {
           'Authorization': `Bearer ${token}`
         }
@@ -34,7 +97,9 @@ export default function FollowedDatasets() {
       }
       
       const data = await res.json();
-      setDatasets(data);
+      // Results are paginated; the next page is requested with the returned cursor
+      setDatasets(prev => (cursor ? [...prev, ...data] : data));
+      setNextCursor(res.headers.get('X-Next-Cursor'));
     } catch (err) {
       setError('Error loading followed datasets: ' + err.message);
     } finally {
@@ -63,7 +128,7 @@ export default function FollowedDatasets() {
     }
   };
 
-  if (loading) {
+  if (loading && datasets.length === 0) {
     return <div className="loading-container">Loading followed datasets...</div>;
   }
 
@@ -93,6 +158,11 @@ export default function FollowedDatasets() {
               <div onClick={() => navigate(`/datasets/${dataset.hf_id}`)} className="dataset-click-area">
                 <h3 className="dataset-name">{dataset.name}</h3>
                 <div className="dataset-id">{dataset.hf_id}</div>
+                {newCommits[dataset.hf_id] > 0 && (
+                  <div className="new-commits">
+                    {newCommits[dataset.hf_id]} new commit{newCommits[dataset.hf_id] === 1 ? '' : 's'}
+                  </div>
+                )}
                 {dataset.description && (
                   <p className="dataset-description">
                     {dataset.description.length > 100
@@ -122,6 +192,16 @@ export default function FollowedDatasets() {
           ))}
         </div>
       )}
+
+      {nextCursor && (
+        <button
+          onClick={() => fetchFollowedDatasets(nextCursor)}
+          className="primary-btn"
+          disabled={loading}
+        >
+          {loading ? 'Loading...' : 'Load More'}
+        </button>
+      )}
     </div>
   );
 }
\ No newline at end of file